@@ -1,33 +1,89 @@
-from typing import TypedDict, Annotated, Sequence
+from typing import TypedDict, Annotated, List, Sequence
+from dataclasses import dataclass
+from functools import partial
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage, BaseMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.tools import tool
+from langchain_core.tools import InjectedToolCallId, tool
+from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
+from langgraph.prebuilt import InjectedState
+from langgraph.types import Command, interrupt
 from dotenv import load_dotenv
+from checkpoint_store import get_checkpointer
+from document_buffer import PatchError, PieceTable, apply_edits, prompt_view, split_lines
+from fake_llm import drafter_script
+from llm_cache import format_cache_stats
+from model_provider import get_chat_model
 
 load_dotenv()
 
-# This is a global variable to hold the conversation history
-document_content = ""
+GREETING = "Hello, I'm ready to help you with a document.  What would you like to create?"
+HUMAN_PROMPT = "What would you like to do with the document?"
+# Recent tool calls kept in the state's tool_calls list; the full record is in the messages
+MAX_RECORDED_TOOL_CALLS = 20
+
+# The document is part of each thread's state, so every drafting session has its own
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    document_content: str
+    document_focus: List[int]
     tools: Annotated[Sequence[str], "List of available tools"]
     tool_calls: Annotated[Sequence[str], "List of tool calls made"]
     tool_results: Annotated[Sequence[str], "List of results from tool calls"]
-    
+
+@tool
+def update(content: str, tool_call_id: Annotated[str, InjectedToolCallId]) -> Command:
+    """Replace the whole document. Use only to create a new document or rewrite it completely."""
+    lines = PieceTable(content).line_count()
+    # The content is not echoed back: the tool message stays in the history sent on every turn
+    return Command(update={
+        "document_content": content,
+        "document_focus": [],
+        "messages": [ToolMessage(content=f"Document updated ({lines} lines).",
+                                 name="update", tool_call_id=tool_call_id)],
+    })
+
+@tool
+def edit(operations: List[dict], tool_call_id: Annotated[str, InjectedToolCallId],
+         state: Annotated[dict, InjectedState]) -> Command:
+    """Change part of the document without rewriting the rest.
+
+    Args:
+        operations (list): Edits whose line numbers refer to the document before this call, each one of
+            {"op": "replace", "start_line": 3, "end_line": 5, "text": "new lines"},
+            {"op": "insert", "after_line": 7, "text": "new lines"} (after_line 0 inserts at the top),
+            {"op": "delete", "start_line": 3, "end_line": 4} or
+            {"op": "diff", "patch": "unified diff hunks (@@ -3,2 +3,2 @@ ...)"}.
+    Returns:
+        str: The edited line ranges, or why the edits were rejected.
+    """
+    buffer = PieceTable(state.get("document_content", ""))
+    try:
+        regions = apply_edits(buffer, operations)
+    except PatchError as e:
+        return f"Edits rejected, the document is unchanged: {e}"
+    ranges = ", ".join(f"{start}-{end}" if end > start else f"{start}" for start, end in regions)
+    return Command(update={
+        "document_content": buffer.text(),
+        "document_focus": [start for start, _ in regions],
+        "messages": [ToolMessage(content=f"Document edited at lines {ranges} ({buffer.line_count()} lines).",
+                                 name="edit", tool_call_id=tool_call_id)],
+    })
+
 @tool
-def update(content: str) -> str:
-    """Update the document content."""
-    global document_content
-    document_content = content
-    return f"Document updated with content: {content}"
+def view(start_line: int, end_line: int, state: Annotated[dict, InjectedState]) -> str:
+    """Show lines start_line..end_line of the document with their line numbers."""
+    buffer = PieceTable(state.get("document_content", ""))
+    end_line = min(end_line, buffer.line_count())
+    if start_line < 1 or end_line < start_line:
+        return f"The document has {buffer.line_count()} lines."
+    lines = split_lines(buffer.get_lines(start_line, end_line))
+    return "\n".join(f"{n:>5}| {line}" for n, line in enumerate(lines, start_line))
 
 @tool
-def save(filename: str) -> str:
+def save(filename: str, state: Annotated[dict, InjectedState]) -> str:
     """Save the document content to a file.
-    
+
     Args:
         filename (str): The name of the file to save the content to.
     Returns:
@@ -38,55 +94,129 @@ def save(filename: str) -> str:
     if not filename.endswith(".txt"):
         # Ensure the filename ends with .txt
         filename += ".txt"
-    
-    global document_content
+
     try:
         with open(filename, "w") as f:
-            f.write(document_content)
+            f.write(state.get("document_content", ""))
         return f"Document saved to {filename}"
     except Exception as e:
         return f"Error saving document: {str(e)}"
 
 
-tools = [update, save]
+tools = [update, edit, view, save]
+_tools_by_name = {t.name: t for t in tools}
+# Tools that read the document through InjectedState
+_STATE_TOOLS = ("edit", "view", "save")
 
-model = ChatGoogleGenerativeAI(model="gemini-2.5-pro").bind_tools(tools).bind_tools(tools)
+def create_model():
+    """
+    Create the chat model with the document tools bound.
+    Gemini by default; set LLM_MODE=record/replay/fake to record, replay or fake it (see model_provider).
+    """
+    return get_chat_model(tools, fake_script=drafter_script)
 
-def our_agent(state: AgentState) -> str:
-    
-    system_prompt = SystemMessage(content=f"""You are Document Drafter, a helpful writing assistant. You are going to help the user update and modify documents.
-                                   - If the user wants to update or modify the document, use the `update` tool with the complete updated content.
+def system_prompt(document: str) -> SystemMessage:
+    """
+    System prompt around the document section (see document_prompt).
+    """
+    return SystemMessage(content=f"""You are Document Drafter, a helpful writing assistant. You are going to help the user update and modify documents.
+                                   - If the user wants to change part of the document, use the `edit` tool with line-based operations on the numbered lines shown below.
+                                   - Use the `update` tool with the complete content only to create a new document or to rewrite it entirely.
+                                   - Use the `view` tool to read lines that are not shown below before editing them.
                                    - If the user wants to save and finish the document, use the `save` tool with the filename.
                                    - If the user asks for help, provide a brief overview of the available tools and their usage.
                                    - If the user asks to exit, respond with a polite farewell message.
                                    - If the user asks to see the current document content, return the content of the document
-                                   - Make sure to always show the current document state after each interaction.
-                                   - The current document content is: {document_content}
                                    - Always respond in a friendly and helpful manner.
-                                  """)      
-    
-    
-    # Send messages to the model  
-    # no document content   
-    if not state['messages']:
-        user_input = "Hello, I'm ready to help you with a document.  What would you like to create?"
-        user_message = HumanMessage(content=user_input)      
-    else:  # Document content exists
-        user_input = input("\nWhat would you like to do with the document? ")   
-        print(f"\nUser Input: {user_input}\n")
-        user_message = HumanMessage(content=user_input)
-
-    all_messages = [system_prompt] + list(state['messages']) + [user_message]
-    response = model.invoke(all_messages)
-    
-    print(f"\nLLM Response: {response.content}\n")
+                                   - The current document (line numbers are not part of the text):
+{document}
+                                  """)
+
+def document_prompt(state: AgentState) -> str:
+    """
+    The document as the model sees it: whole when short, otherwise an outline plus the windows
+    around the last edit and the lines matching the user's latest message.
+    """
+    query = next((m.content for m in reversed(state['messages']) if isinstance(m, HumanMessage)), "")
+    return prompt_view(PieceTable(state.get('document_content', '')), query=query,
+                       focus=state.get('document_focus') or ())
+
+def _agent_messages(state: AgentState) -> tuple:
+    """
+    Return (messages to send to the model, messages to add to the state).
+    """
+    # The user's text arrives through the human node; a new session without input starts with a greeting
+    new_messages = [] if state['messages'] else [HumanMessage(content=GREETING)]
+    return [system_prompt(document_prompt(state))] + list(state['messages']) + new_messages, new_messages
+
+def _agent_update(state: AgentState, new_messages: List[BaseMessage], response) -> AgentState:
+    update = {"messages": new_messages + [response]}
     if hasattr(response, 'tool_calls') and response.tool_calls:
-        print(f"Tool Calls: {response.tool_calls}\n")
-        state['tool_calls'].extend(response.tool_calls)
+        update['tool_calls'] = (list(state.get('tool_calls', [])) + list(response.tool_calls))[-MAX_RECORDED_TOOL_CALLS:]
     if hasattr(response, 'tool_results') and response.tool_results:
-        print(f"Tool Results: {response.tool_results}\n")
-        state['tool_results'].extend(response.tool_results)
-    
+        update['tool_results'] = list(state.get('tool_results', [])) + list(response.tool_results)
+    return update
+
+def our_agent(state: AgentState, model) -> AgentState:
+    all_messages, new_messages = _agent_messages(state)
+    response = model.invoke(all_messages)
+    return _agent_update(state, new_messages, response)
+
+async def aour_agent(state: AgentState, model) -> AgentState:
+    all_messages, new_messages = _agent_messages(state)
+    response = await model.ainvoke(all_messages)
+    return _agent_update(state, new_messages, response)
+
+
+def run_tools(state: AgentState) -> AgentState:
+    """
+    Run the tool calls of the last AI message one after another. Each call sees the document
+    as left by the calls before it, so several edits, or update + save, in one turn compose;
+    a ToolNode would run them in one step on the document from before the turn.
+    """
+    document = state.get('document_content', '')
+    focus = state.get('document_focus') or []
+    messages = []
+    for call in state['messages'][-1].tool_calls:
+        tool_ = _tools_by_name.get(call["name"])
+        if tool_ is None:
+            messages.append(ToolMessage(content=f"Error: unknown tool {call['name']!r}; use one of {sorted(_tools_by_name)}.",
+                                        name=call["name"], tool_call_id=call["id"], status="error"))
+            continue
+        args = dict(call["args"])
+        if call["name"] in _STATE_TOOLS:
+            args["state"] = {**state, "document_content": document, "document_focus": focus}
+        try:
+            result = tool_.invoke({"type": "tool_call", "name": call["name"], "args": args, "id": call["id"]})
+        except Exception as e:
+            messages.append(ToolMessage(content=f"Error: {type(e).__name__}: {e}", name=call["name"],
+                                        tool_call_id=call["id"], status="error"))
+            continue
+        if isinstance(result, Command):
+            document = result.update.get("document_content", document)
+            focus = result.update.get("document_focus", focus)
+            messages.extend(result.update.get("messages", []))
+        else:
+            messages.append(result)
+    return {"messages": messages, "document_content": document, "document_focus": focus}
+
+
+def human_input(state: AgentState) -> AgentState:
+    """
+    Pause the thread until the user's next instruction arrives as Command(resume=text).
+    Nothing is blocked while waiting: the state is in the checkpointer and the run has returned.
+    """
+    text = interrupt({"prompt": HUMAN_PROMPT, "document_content": state.get('document_content', '')})
+    return {"messages": [HumanMessage(content=text)]}
+
+
+def route_agent(state: AgentState) -> str:
+    """
+    Run the tools the model asked for, otherwise wait for the user.
+    """
+    last = state['messages'][-1]
+    return "tools" if getattr(last, 'tool_calls', None) else "human"
+
 
 def should_continue(state: AgentState) -> str:
     """
@@ -97,7 +227,10 @@ def should_continue(state: AgentState) -> str:
     if not messages:
         return "continue"
  
+    # Only the tool results of the latest turn (after the last AI message) can report a save
     for message in reversed(messages):
+        if isinstance(message, AIMessage):
+            break
         if (isinstance(message, ToolMessage) and 
             "saved" in message.content.lower() and
             "document" in message.content.lower()):
@@ -131,37 +264,185 @@ def pretty_print(state):
             print(f"Other ({msg.__class__.__name__}): {msg.content}")
     print("\n-------------------------\n")
 
-def run_document_agent():
+def pending_prompt(app, config: dict):
+    """
+    Return the interrupt payload the thread is waiting on, or None if it is not paused.
+    """
+    snapshot = app.get_state(config)
+    for task in snapshot.tasks:
+        if task.interrupts:
+            return task.interrupts[0].value
+    return None
+
+def run_document_agent(app=None, thread_id: str = "drafter"):
+    if app is None:
+        app = build_app()
     print("\n ==== Document Drafter Agent ====\n")
-    state = {"messages": []}
+    config = {"configurable": {"thread_id": thread_id}}
 
-    # Initial prompt
-    user_input = input("Hello, I'm ready to help you with a document. What would you like to create?\n> ")
-    state["messages"].append(HumanMessage(content=user_input))
+    # A thread saved while waiting for input (with a persistent checkpointer) continues where it stopped
+    waiting = pending_prompt(app, config)
+    if waiting is None:
+        user_input = input(f"{GREETING}\n> ")
+        inputs = {"messages": [HumanMessage(content=user_input)]}
+    else:
+        inputs = Command(resume=input(f"\n{waiting['prompt']} "))
 
-    for step in app.stream(state, stream_mode="values"):
-        if "messages" in step:
-            pretty_print({"messages": step["messages"]})
+    while True:
+        for step in app.stream(inputs, config, stream_mode="values"):
+            if "messages" in step:
+                pretty_print({"messages": step["messages"]})
+        waiting = pending_prompt(app, config)
+        if waiting is None:
+            break
+        inputs = Command(resume=input(f"\n{waiting['prompt']} "))
     print("\n ==== End of Document Drafter Agent ====\n")
-    
 
-graph = StateGraph(AgentState)
-graph.add_node("agent", our_agent)
-graph.add_node("tools", ToolNode(tools=tools))
-graph.set_entry_point("agent")
-graph.add_edge("agent", "tools")
-graph.add_conditional_edges(
-    "tools",
-    should_continue,
-    {
-        "continue": "agent",
-        "end": END,
-    },
-)
-app = graph.compile()
+
+def run_scripted_session(app, thread_id: str, texts: List[str]) -> dict:
+    """
+    Drive one session without a terminal: texts[0] starts it and the following texts answer
+    its interrupts in order (the last one is repeated if the session asks for more).
+
+    :return: Final state of the thread
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    result = app.invoke({"messages": [HumanMessage(content=texts[0])]}, config)
+    answers = iter(texts[1:])
+    answer = texts[-1]
+    while "__interrupt__" in result:
+        answer = next(answers, answer)
+        result = app.invoke(Command(resume=answer), config)
+    return result
+
+
+def _build_graph(agent) -> StateGraph:
+    graph = StateGraph(AgentState)
+    graph.add_node("agent", agent)
+    graph.add_node("tools", run_tools)
+    graph.add_node("human", human_input)
+    graph.set_entry_point("agent")
+    graph.add_conditional_edges(
+        "agent",
+        route_agent,
+        {
+            "tools": "tools",
+            "human": "human",
+        },
+    )
+    graph.add_conditional_edges(
+        "tools",
+        should_continue,
+        {
+            "continue": "human",
+            "end": END,
+        },
+    )
+    graph.add_edge("human", "agent")
+    return graph
+
+def build_app(model=None, checkpointer=None):
+    """
+    Build and compile the Document Drafter graph. The graph pauses in the human node until
+    the next instruction is sent with Command(resume=text) on the same thread_id.
+
+    :param model: Chat model with the tools bound (defaults to create_model())
+    :param checkpointer: Checkpoint saver persisting each thread's state (default: get_checkpointer(),
+                         else an in-memory saver, since interrupts need one)
+    :return: Compiled graph
+    """
+    if model is None:
+        model = create_model()
+    checkpointer = checkpointer or get_checkpointer() or InMemorySaver()
+    return _build_graph(partial(our_agent, model=model)).compile(checkpointer=checkpointer)
+
+def build_async_app(model=None, checkpointer=None):
+    """
+    Build the Document Drafter graph for ainvoke/astream: the model is called asynchronously,
+    so one event loop can serve many sessions (see DraftingSessions).
+
+    :param model: Chat model with the tools bound (defaults to create_model())
+    :param checkpointer: Checkpoint saver persisting each thread's state (default: get_checkpointer(),
+                         else an in-memory saver)
+    :return: Compiled graph
+    """
+    if model is None:
+        model = create_model()
+    checkpointer = checkpointer or get_checkpointer() or InMemorySaver()
+    return _build_graph(partial(aour_agent, model=model)).compile(checkpointer=checkpointer)
+
+
+@dataclass
+class DraftTurn:
+    """
+    Outcome of one message to a drafting session.
+    """
+    reply: str
+    document_content: str
+    done: bool
+
+
+class DraftingSessions:
+    """
+    Async front end serving many drafting sessions from one compiled graph.
+
+    An idle session is only its checkpointed state: no thread, task or coroutine waits for the
+    user. send() starts a session or resumes the one waiting on its interrupt, runs it to the
+    next interrupt (or the end) and returns. With a SqliteDeltaSaver (CHECKPOINT_DB) the
+    sessions survive restarts and live outside the Python heap.
+
+        sessions = DraftingSessions()
+        turn = await sessions.send("user-42", "Write a note to the team.")
+        turn = await sessions.send("user-42", "Save it as note.txt")
+    """
+
+    def __init__(self, app=None, model=None, checkpointer=None):
+        """
+        :param app: Graph from build_async_app (built from model and checkpointer if omitted)
+        :param model: Chat model with the tools bound (defaults to create_model())
+        :param checkpointer: Checkpoint saver (default: get_checkpointer(), else in memory)
+        """
+        self.app = app or build_async_app(model, checkpointer)
+
+    @staticmethod
+    def _config(session_id: str) -> dict:
+        return {"configurable": {"thread_id": session_id}}
+
+    async def waiting(self, session_id: str) -> bool:
+        """
+        Return True if the session is paused waiting for the user's next message.
+        """
+        snapshot = await self.app.aget_state(self._config(session_id))
+        return any(task.interrupts for task in snapshot.tasks)
+
+    async def send(self, session_id: str, text: str) -> DraftTurn:
+        """
+        Send the user's text to the session, starting it if it is not waiting for input.
+        """
+        if await self.waiting(session_id):
+            inputs = Command(resume=text)
+        else:
+            inputs = {"messages": [HumanMessage(content=text)]}
+        result = await self.app.ainvoke(inputs, self._config(session_id))
+        reply = next((m.content for m in reversed(result.get('messages', [])) if isinstance(m, AIMessage)), "")
+        return DraftTurn(reply, result.get('document_content', ''), "__interrupt__" not in result)
+
+    async def document(self, session_id: str) -> str:
+        snapshot = await self.app.aget_state(self._config(session_id))
+        return snapshot.values.get('document_content', '')
+
+    async def end(self, session_id: str) -> None:
+        """
+        Delete the session's checkpoints.
+        """
+        await self.app.checkpointer.adelete_thread(session_id)
+
 
 if __name__ == "__main__":
-    run_document_agent()
+    model = create_model()
+    run_document_agent(build_app(model))
+    if hasattr(model, "cache_stats"):
+        print(format_cache_stats(model.cache_stats()))
     # Uncomment the line below to run the agent in a loop
     # while True:
     #     run_document_agent()
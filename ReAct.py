@@ -1,11 +1,20 @@
-from typing import TypedDict, Annotated, Sequence
+from typing import TypedDict, Annotated, Optional, Sequence, Union
+from functools import partial
+import asyncio
+import json
+import sys
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage, BaseMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool, tool
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
 from dotenv import load_dotenv
+from checkpoint_store import get_checkpointer
+from fake_llm import react_script
+from llm_cache import format_cache_stats, tool_schemas
+from model_provider import get_chat_model, is_recording, model_identity
+from tool_cache import TurnCache, is_memoized, memoize_tool
+from tool_executor import RESULT_REFERENCE_PROMPT, ConcurrentToolExecutor
 
 load_dotenv()
 
@@ -15,32 +24,98 @@ class AgentState(TypedDict):
     tool_calls: Annotated[Sequence[str], "List of tool calls made"]
     tool_results: Annotated[Sequence[str], "List of results from tool calls"]
     
+# The arithmetic tools are pure, so their results are memoized (see tool_cache)
 @tool
+@memoize_tool(maxsize=4096, ttl=3600)
 def add(a: int, b: int) -> int:
     """Add two numbers."""
     return a + b
 
 @tool
+@memoize_tool(maxsize=4096, ttl=3600)
 def subtract(a: int, b: int) -> int:
     """Subtract two numbers."""
     return a - b
 
 @tool
+@memoize_tool(maxsize=4096, ttl=3600)
 def multiply(a: int, b: int) -> int:
     """Multiply two numbers."""
     return a * b
 
 tools = [add, subtract, multiply]
 
-model = ChatGoogleGenerativeAI(model="gemini-2.5-pro").bind_tools(tools)
+# In the async app an operand can also be "$N": the result of the N-th call of the same turn,
+# resolved by tool_executor before the tool runs
+Operand = Annotated[Union[int, str], "A number, or \"$N\" for the result of the N-th tool call of this turn"]
 
-def model_call(state: AgentState) -> AgentState:
+def _number(value) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{value!r} is not a number; result references are only resolved within one turn.")
+
+def create_reference_tools() -> list:
+    """
+    Variants of the arithmetic tools for build_async_app, whose executor resolves result
+    references: operands may also be "$N" strings. They share the memoized functions (and
+    caches) of the int-typed tools that build_app uses.
+    """
+    def variant(base):
+        def run(a: Operand, b: Operand) -> int:
+            return base.func(_number(a), _number(b))
+        run.pure, run.cache = True, base.func.cache
+        return StructuredTool.from_function(run, name=base.name, description=base.description)
+    return [variant(t) for t in tools]
+
+def create_turn_cache(model, app_tools: list = None) -> Optional[TurnCache]:
+    """
+    Create the cache of model replies after turns that only called memoized tools, keyed also
+    by the model identity and the tool schemas. Returns None for a recording model (record
+    mode), whose every request has to reach the recording.
+
+    :param model: Chat model of the app
+    :param app_tools: Tools the app runs (default: tools)
+    """
+    if is_recording(model):
+        return None
+    app_tools = app_tools or tools
+    scope = json.dumps({"model": model_identity(model), "tools": tool_schemas(app_tools)}, sort_keys=True, default=str)
+    return TurnCache([t.name for t in app_tools if is_memoized(t)], scope=scope)
+
+def create_model(bound_tools: list = None):
+    """
+    Create the chat model with the arithmetic tools (or bound_tools) bound.
+    Gemini by default; set LLM_MODE=record/replay/fake to record, replay or fake it (see model_provider).
+    """
+    return get_chat_model(bound_tools or tools, fake_script=react_script)
+
+def model_call(state: AgentState, model, turn_cache: TurnCache = None) -> AgentState:
     """
     Call the model with the current state and update the state with the response.
+    With a turn_cache, replies to deterministic tool turns are served without calling the model.
     """
     # Send messages to the model
     system_prompt = SystemMessage(content="You are my AI Assistant, please help me with my tasks.")
-    response = model.invoke([system_prompt] + state['messages'])
+    messages = [system_prompt] + state['messages']
+    response = turn_cache.get(messages) if turn_cache else None
+    if response is None:
+        response = model.invoke(messages)
+        if turn_cache:
+            turn_cache.put(messages, response)
+    return {"messages": [response]}
+
+async def amodel_call(state: AgentState, model, turn_cache: TurnCache = None) -> AgentState:
+    """
+    Async variant of model_call, used by build_async_app; its tool node resolves result references.
+    """
+    system_prompt = SystemMessage(content=f"You are my AI Assistant, please help me with my tasks. {RESULT_REFERENCE_PROMPT}")
+    messages = [system_prompt] + state['messages']
+    response = turn_cache.get(messages) if turn_cache else None
+    if response is None:
+        response = await model.ainvoke(messages)
+        if turn_cache:
+            turn_cache.put(messages, response)
     return {"messages": [response]}
 
 def should_continue(state: AgentState) -> str:
@@ -78,26 +153,88 @@ def pretty_print(state):
             print(f"Other ({msg.__class__.__name__}): {msg.content}")
     print("\n-------------------------\n")
 
-graph = StateGraph(AgentState) 
-graph.add_node("our_agent", model_call) 
-
-tool_node = ToolNode(tools=tools)
-graph.add_node("tools", tool_node)
-graph.set_entry_point("our_agent")
-#graph.add_edge(START, "our_agent")
-graph.add_conditional_edges(
-    "our_agent",
-    should_continue,
-    {
-        "continue": "tools",
-        "end": END,
-    },
-)
-graph.add_edge("tools", "our_agent")  # Loop back to the model call after tool execution
-graph.add_edge("our_agent", END)  # Final state, no further processing
-app = graph.compile()
-
-inputs = {"messages": [("user", "Add 34 + 21.  Add 12 + 13. Then subtract 5 from the result of the first addition.")]}
-pretty_print(app.invoke(inputs, stream_mode="values"))
+def build_app(model=None, cache_turns: bool = True, checkpointer=None):
+    """
+    Build and compile the ReAct agent graph.
+
+    :param model: Chat model with the tools bound (defaults to create_model())
+    :param cache_turns: Serve replies to deterministic tool turns from a TurnCache of this app (see create_turn_cache)
+    :param checkpointer: Checkpoint saver persisting each thread's state (see checkpoint_store)
+    :return: Compiled graph
+    """
+    if model is None:
+        model = create_model()
+
+    graph = StateGraph(AgentState) 
+    turn_cache = create_turn_cache(model) if cache_turns else None
+    graph.add_node("our_agent", partial(model_call, model=model, turn_cache=turn_cache))
+
+    tool_node = ToolNode(tools=tools)
+    graph.add_node("tools", tool_node)
+    graph.set_entry_point("our_agent")
+    #graph.add_edge(START, "our_agent")
+    graph.add_conditional_edges(
+        "our_agent",
+        should_continue,
+        {
+            "continue": "tools",
+            "end": END,
+        },
+    )
+    graph.add_edge("tools", "our_agent")  # Loop back to the model call after tool execution
+    graph.add_edge("our_agent", END)  # Final state, no further processing
+    return graph.compile(checkpointer=checkpointer)
+
+def build_async_app(model=None, max_concurrency: int = 8, cache_turns: bool = True, checkpointer=None):
+    """
+    Build the ReAct agent graph for ainvoke/astream: the model is called asynchronously and
+    independent tool calls of a turn run concurrently (see tool_executor).
 
+    :param model: Chat model with the create_reference_tools() variants bound (defaults to
+                  create_model with them)
+    :param max_concurrency: Maximum number of tool calls running at once
+    :param cache_turns: Serve replies to deterministic tool turns from a TurnCache of this app (see create_turn_cache)
+    :param checkpointer: Checkpoint saver persisting each thread's state (see checkpoint_store)
+    :return: Compiled graph
+    """
+    async_tools = create_reference_tools()
+    if model is None:
+        model = create_model(async_tools)
+
+    graph = StateGraph(AgentState)
+    turn_cache = create_turn_cache(model, async_tools) if cache_turns else None
+    graph.add_node("our_agent", partial(amodel_call, model=model, turn_cache=turn_cache))
+    graph.add_node("tools", ConcurrentToolExecutor(async_tools, max_concurrency=max_concurrency))
+    graph.set_entry_point("our_agent")
+    graph.add_conditional_edges(
+        "our_agent",
+        should_continue,
+        {
+            "continue": "tools",
+            "end": END,
+        },
+    )
+    graph.add_edge("tools", "our_agent")  # Loop back to the model call after tool execution
+    return graph.compile(checkpointer=checkpointer)
 
+async def arun(inputs: dict) -> None:
+    """
+    Stream the async agent and pretty print the final state.
+    """
+    app = build_async_app()
+    final_state = None
+    async for final_state in app.astream(inputs, stream_mode="values"):
+        pass
+    pretty_print(final_state)
+
+SAMPLE_INPUTS = {"messages": [("user", "Add 34 + 21.  Add 12 + 13. Then subtract 5 from the result of the first addition.")]}
+
+if __name__ == "__main__":
+    if "--async" in sys.argv:
+        asyncio.run(arun(SAMPLE_INPUTS))
+    else:
+        model = create_model()
+        app = build_app(model, checkpointer=get_checkpointer())
+        pretty_print(app.invoke(SAMPLE_INPUTS, {"configurable": {"thread_id": "react"}}, stream_mode="values"))
+        if hasattr(model, "cache_stats"):
+            print(format_cache_stats(model.cache_stats()))
@@ -0,0 +1,1021 @@
+"""
+Standalone benchmark and budget checks for the LangGraph examples.
+
+Usage:
+    python benchmarks.py import-budget [--module main] [--budget 0.25] [--runs 5]
+    python benchmarks.py run [--graphs graph3,exerciseV,react,drafter] [--concurrency 1,4,16]
+                             [--invocations 200] [--output bench.json]
+    python benchmarks.py compare baseline.json current.json [--threshold 0.10]
+    python benchmarks.py checkpoints [--turns 20] [--snapshot-every 16]
+    python benchmarks.py state-updates [--steps 20] [--invocations 200]
+    python benchmarks.py compact-state [--states 10000] [--invocations 500]
+    python benchmarks.py run-many [--records 5000] [--workers 4] [--chunksize 256]
+    python benchmarks.py fast-executor [--invocations 2000]
+    python benchmarks.py parallel-branches [--latency-ms 20] [--invocations 20]
+    python benchmarks.py hot-reload [--threads 4] [--phase-s 1.0]
+    python benchmarks.py drafter-sessions [--sessions 1000] [--checkpointer memory|sqlite]
+    python benchmarks.py drafter-edits [--pages 10] [--edits 20]
+    python benchmarks.py tool-dependencies
+
+The LLM graphs (ReAct, Drafter) run against fake_llm.FakeChatModel, so no network is needed
+and the numbers measure LangGraph orchestration and tool dispatch only.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Budget for a cold `import main` in a fresh interpreter, in seconds.
+# Importing the node functions must not pull in langgraph, numpy or IPython.
+DEFAULT_IMPORT_BUDGET = 0.25
+HEAVY_MODULES = ('langgraph', 'langchain_core', 'numpy', 'IPython')
+
+
+def measure_import_time(module: str = 'main', runs: int = 5) -> dict:
+    """
+    Measure the cold import time of a module, each run in a fresh interpreter.
+
+    :param module: Module to import
+    :param runs: Number of fresh interpreters to time
+    :return: Dictionary with the individual timings, their median and any heavy modules loaded
+    """
+    probe = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - t\n"
+        f"heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY_MODULES!r}))\n"
+        "print(elapsed, ','.join(heavy))\n"
+    )
+    timings = []
+    heavy = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+        elapsed, _, loaded = out.stdout.strip().rpartition('\n')[2].partition(' ')
+        timings.append(float(elapsed))
+        heavy = [m for m in loaded.split(',') if m]
+    return {"module": module, "timings": timings, "median": statistics.median(timings), "heavy_modules": heavy}
+
+
+def slowest_imports(module: str = 'main', top: int = 10) -> List[tuple]:
+    """
+    Return the `top` slowest imports (cumulative microseconds, name) reported by -X importtime.
+    """
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def report_import_time(module: str = 'main', budget: float = DEFAULT_IMPORT_BUDGET, runs: int = 5) -> None:
+    """
+    Print the import timing for a module, and the slowest imports when it exceeds the budget
+    or loads one of the heavy modules at import time (tests/test_import_budget.py enforces both).
+    """
+    result = measure_import_time(module, runs)
+    print(f"import {module}: median {result['median'] * 1000:.1f} ms (budget {budget * 1000:.0f} ms)")
+    if result["heavy_modules"]:
+        print(f"  heavy modules loaded at import: {', '.join(result['heavy_modules'])}")
+    if result["median"] > budget or result["heavy_modules"]:
+        for cumulative, name in slowest_imports(module):
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+def _react_fixture() -> Callable[[int], Callable[[], object]]:
+    import ReAct
+    from fake_llm import FakeChatModel, react_script
+
+    app = ReAct.build_app(FakeChatModel(script=react_script))
+    def make(i: int):
+        return lambda: app.invoke({"messages": [("user", f"Add {i} + 21. Add 12 + {i}. Then subtract 5 from the result of the first addition.")]})
+    return make
+
+
+def _react_async_fixture() -> Callable[[int], Callable[[], object]]:
+    import asyncio
+    import ReAct
+    from fake_llm import FakeChatModel, react_script
+
+    app = ReAct.build_async_app(FakeChatModel(script=react_script))
+    def make(i: int):
+        inputs = {"messages": [("user", f"Add {i} + 21. Add 12 + {i}. Then subtract 5 from the result of the first addition.")]}
+        return lambda: asyncio.run(app.ainvoke(inputs))
+    return make
+
+
+def _drafter_fixture() -> Callable[[int], Callable[[], object]]:
+    import itertools
+    import Drafter
+    from fake_llm import FakeChatModel, drafter_script
+
+    # One invocation is a whole session: the request, then "Make it shorter." at the interrupt.
+    app = Drafter.build_app(FakeChatModel(script=drafter_script))
+    sessions = itertools.count()
+    def make(i: int):
+        def run():
+            thread_id = f"bench-{next(sessions)}"
+            result = Drafter.run_scripted_session(app, thread_id, [f"Write a note number {i}.", "Make it shorter."])
+            app.checkpointer.delete_thread(thread_id)
+            return result
+        return run
+    return make
+
+
+def _graph3_fixture(optimize: bool = False) -> Callable[[int], Callable[[], object]]:
+    import main as graph_main
+
+    app = graph_main.load_app3(os.path.join(REPO_DIR, graph_main.DEFAULT_CONFIG_FILE), optimize=optimize)
+    rng = random.Random(42)
+    records = [graph_main.AgentState(operation=rng.choice('+-'), operation2=rng.choice('+-'),
+                                     number1=rng.randint(0, 99), number2=rng.randint(0, 99),
+                                     number3=rng.randint(0, 99), number4=rng.randint(0, 99),
+                                     final_number=0, final_number2=0, messages=[])
+               for _ in range(256)]
+    def make(i: int):
+        record = records[i % len(records)]
+        return lambda: app.invoke({**record, "messages": []})
+    return make
+
+
+def _exercise_v_fixture() -> Callable[[int], Callable[[], object]]:
+    import main as graph_main
+
+    app = graph_main.build_graph_exerciseV()
+    def make(i: int):
+        return lambda: app.invoke(graph_main.AgentStateV(name=f"User{i}", number=[], counter=-1))
+    return make
+
+
+# name -> factory returning make(i) -> zero-argument invocation
+GRAPH_FIXTURES: Dict[str, Callable] = {
+    'graph3': _graph3_fixture,
+    'graph3_optimized': lambda: _graph3_fixture(optimize=True),
+    'exerciseV': _exercise_v_fixture,
+    'react': _react_fixture,
+    'react_async': _react_async_fixture,
+    'drafter': _drafter_fixture,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process so far, in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def bench_graph(name: str, concurrency: int, invocations: int, warmup: int = 10) -> dict:
+    """
+    Invoke a graph fixture `invocations` times from `concurrency` threads and collect
+    latency percentiles, throughput and peak RSS.
+    """
+    make = GRAPH_FIXTURES[name]()
+    random.seed(1234)
+    for i in range(warmup):
+        make(i)()
+
+    def timed(call):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    calls = [make(i) for i in range(invocations)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(timed, calls))
+    wall = time.perf_counter() - start
+
+    return {
+        "graph": name,
+        "concurrency": concurrency,
+        "invocations": invocations,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "invocations_per_second": invocations / wall,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmarks(graphs: List[str], concurrency_levels: List[int], invocations: int) -> dict:
+    """
+    Run every graph at every concurrency level. Node output (prints, saved documents) is
+    discarded and written to a temporary directory respectively.
+    """
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        sys.path.insert(0, REPO_DIR)
+        os.chdir(workdir)
+        try:
+            for name in graphs:
+                for concurrency in concurrency_levels:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        result = bench_graph(name, concurrency, invocations)
+                    results.append(result)
+                    print(f"{name:18s} c={concurrency:<3d} p50 {result['p50_ms']:8.3f} ms  "
+                          f"p95 {result['p95_ms']:8.3f} ms  p99 {result['p99_ms']:8.3f} ms  "
+                          f"{result['invocations_per_second']:9.1f} inv/s  rss {result['peak_rss_mb']:.1f} MiB")
+        finally:
+            os.chdir(cwd)
+            sys.path.remove(REPO_DIR)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "commit": _git_commit(),
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=REPO_DIR)
+        return out.stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.10) -> List[str]:
+    """
+    Return a description of every (graph, concurrency) whose p50/p95 latency grew, or whose
+    throughput dropped, by more than `threshold` (a fraction) relative to the baseline.
+    """
+    base = {(r["graph"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = base.get((result["graph"], result["concurrency"]))
+        if old is None:
+            continue
+        label = f"{result['graph']} c={result['concurrency']}"
+        for metric in ("p50_ms", "p95_ms"):
+            if old[metric] and result[metric] > old[metric] * (1 + threshold):
+                regressions.append(f"{label}: {metric} {old[metric]:.3f} -> {result[metric]:.3f}")
+        ips_old, ips_new = old["invocations_per_second"], result["invocations_per_second"]
+        if ips_new < ips_old * (1 - threshold):
+            regressions.append(f"{label}: invocations_per_second {ips_old:.1f} -> {ips_new:.1f}")
+    return regressions
+
+
+def measure_checkpoint_writes(turns: int = 20, snapshot_every: int = 16) -> dict:
+    """
+    Run a multi-turn ReAct conversation on one thread with checkpoint_store.SqliteDeltaSaver and
+    compare the bytes it writes with what a full-snapshot checkpointer would write.
+
+    :param turns: Number of user turns on the thread
+    :param snapshot_every: Appends after which the messages list is stored in full again
+    :return: Saver stats plus elapsed time and bytes per turn
+    """
+    import ReAct
+    from checkpoint_store import SqliteDeltaSaver
+    from fake_llm import FakeChatModel, react_script
+
+    saver = SqliteDeltaSaver(':memory:', snapshot_every=snapshot_every, measure_full_snapshots=True)
+    app = ReAct.build_app(FakeChatModel(script=react_script), cache_turns=False, checkpointer=saver)
+    config = {"configurable": {"thread_id": "bench"}}
+    start = time.perf_counter()
+    for i in range(turns):
+        app.invoke({"messages": [("user", f"Add {i} + 21. Multiply {i} by 3.")]}, config)
+    stats = saver.stats()
+    stats["elapsed_s"] = time.perf_counter() - start
+    stats["bytes_per_turn"] = stats["bytes_written"] / turns
+    stats["full_snapshot_bytes_per_turn"] = stats["full_snapshot_bytes"] / turns
+    saver.close()
+    return stats
+
+
+def measure_state_updates(steps: int = 20, invocations: int = 200) -> dict:
+    """
+    Time a chain of `steps` nodes over a nine-field state written in three styles: nodes that
+    mutate the state and return all of it (every channel is written every step), the same with
+    a defensive copy instead of mutation, and nodes returning only the fields they change into
+    a reducer-annotated messages list.
+
+    :return: {style: {"us_per_step": ..., "channel_writes_per_step": ...}}
+    """
+    import operator
+    from typing import Annotated, TypedDict
+    from langgraph.graph import StateGraph, START, END
+
+    class WholeState(TypedDict):
+        messages: List[str]
+        a: int
+        b: int
+        c: int
+        d: int
+        e: int
+        f: int
+        g: int
+        h: int
+
+    class PartialState(TypedDict):
+        messages: Annotated[List[str], operator.add]
+        a: int
+        b: int
+        c: int
+        d: int
+        e: int
+        f: int
+        g: int
+        h: int
+
+    def whole_node(state):
+        state['a'] = state['a'] + 1
+        state['messages'].append(f"a is {state['a']}")
+        return state
+
+    def copied_node(state):
+        # The defensive alternative to mutation when returning the whole state
+        state = dict(state, a=state['a'] + 1)
+        state['messages'] = state['messages'] + [f"a is {state['a']}"]
+        return state
+
+    def partial_node(state):
+        a = state['a'] + 1
+        return {"a": a, "messages": [f"a is {a}"]}
+
+    def chain(schema, node):
+        graph = StateGraph(schema)
+        previous = START
+        for i in range(steps):
+            graph.add_node(f"n{i}", node)
+            graph.add_edge(previous, f"n{i}")
+            previous = f"n{i}"
+        graph.add_edge(previous, END)
+        return graph.compile()
+
+    timings = {}
+    styles = (("whole_state", chain(WholeState, whole_node)), ("whole_state_copy", chain(WholeState, copied_node)),
+              ("partial_update", chain(PartialState, partial_node)))
+    for style, app in styles:
+        fresh = lambda: dict(messages=[], a=0, b=1, c=2, d=3, e=4, f=5, g=6, h=7)
+        app.invoke(fresh())
+        start = time.perf_counter()
+        for _ in range(invocations):
+            result = app.invoke(fresh())
+        elapsed = time.perf_counter() - start
+        assert len(result['messages']) == steps
+        updates = [u for chunk in app.stream(fresh(), stream_mode="updates") for u in chunk.values()]
+        timings[style] = {"us_per_step": elapsed / (invocations * steps) * 1e6,
+                          "channel_writes_per_step": sum(len(u) for u in updates) / len(updates)}
+    return timings
+
+
+def measure_compact_state(states: int = 10000, invocations: int = 500) -> dict:
+    """
+    Compare the AgentState dict with compact_state.CompactAgentState and StateBatch: memory
+    per in-flight state (tracemalloc) and graph3 time per super-step with each as state_schema.
+
+    :param states: Number of states held in memory for the memory measurement
+    :param invocations: graph3 invocations per schema for the timing
+    :return: {"bytes_per_state": {...}, "us_per_step": {...}}
+    """
+    import tracemalloc
+    import main as graph_main
+    from compact_state import CompactAgentState, StateBatch
+
+    def record(i):
+        return dict(operation='+-'[i % 2], operation2='-+'[i % 2], number1=i, number2=i + 1, number3=i + 2,
+                    number4=i + 3, final_number=0, final_number2=0, messages=[])
+
+    builders = {
+        "typed_dict": lambda: [record(i) for i in range(states)],
+        "compact_state": lambda: [CompactAgentState(**record(i)) for i in range(states)],
+        "state_batch": lambda: StateBatch.from_states([record(i) for i in range(states)]),
+    }
+    import numpy  # noqa: F401  (imported up front so the import is not measured as state)
+    bytes_per_state = {}
+    for name, build in builders.items():
+        tracemalloc.start()
+        held = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        bytes_per_state[name] = current / states
+        del held
+
+    config_file = os.path.join(REPO_DIR, graph_main.DEFAULT_CONFIG_FILE)
+    us_per_step = {}
+    for name, compact in (("typed_dict", False), ("compact_state", True)):
+        app = graph_main.load_app3(config_file, compact=compact)
+        app.invoke(record(0))
+        start = time.perf_counter()
+        for i in range(invocations):
+            app.invoke(record(i))
+        # graph3 runs four super-steps per invocation (router, operation, router2, operation2)
+        us_per_step[name] = (time.perf_counter() - start) / (invocations * 4) * 1e6
+    return {"bytes_per_state": bytes_per_state, "us_per_step": us_per_step}
+
+
+def measure_run_many(records: int = 5000, workers: int = 4, chunksize: int = 256) -> dict:
+    """
+    graph3 throughput with a thread pool versus parallel.run_many's process pool, and whether
+    run_many returns exactly what app.invoke does.
+
+    :param records: Number of input records
+    :param workers: Threads or worker processes
+    :param chunksize: Records per run_many chunk
+    :return: {"records_per_s": {...}, "equivalent": bool}
+    """
+    import main as graph_main
+    from parallel import run_many
+
+    rng = random.Random(42)
+    def inputs():
+        for _ in range(records):
+            yield dict(operation=rng.choice('+-'), operation2=rng.choice('+-'),
+                       number1=rng.randint(0, 99), number2=rng.randint(0, 99),
+                       number3=rng.randint(0, 99), number4=rng.randint(0, 99),
+                       final_number=0, final_number2=0, messages=[])
+    data = list(inputs())
+    config_file = os.path.join(REPO_DIR, graph_main.DEFAULT_CONFIG_FILE)
+    app = graph_main.load_app3(config_file)
+
+    records_per_s = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        expected = list(pool.map(lambda record: app.invoke({**record, "messages": []}), data))
+    records_per_s["threads"] = records / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = list(run_many(config_file, data, workers=workers, chunksize=chunksize))
+    records_per_s["run_many"] = records / (time.perf_counter() - start)
+    return {"records_per_s": records_per_s, "equivalent": results == expected}
+
+
+def measure_fast_executor(invocations: int = 2000) -> dict:
+    """
+    Per-invoke time of app3.invoke versus the generated fast executor (plain and optimized);
+    tests/test_fast_executor.py checks that they return the same results.
+
+    :param invocations: Timed invocations per executor
+    :return: {"us_per_invoke": {...}}
+    """
+    import main as graph_main
+    from fast_executor import load_fast_app3
+
+    config_file = os.path.join(REPO_DIR, graph_main.DEFAULT_CONFIG_FILE)
+    executors = {
+        "app3": graph_main.load_app3(config_file),
+        "fast": load_fast_app3(config_file),
+        "fast_optimized": load_fast_app3(config_file, optimize=True),
+    }
+    state = dict(operation='+', operation2='-', number1=1, number2=2, number3=3, number4=4, messages=[])
+    us_per_invoke = {}
+    for name, app in executors.items():
+        app.invoke(state)
+        start = time.perf_counter()
+        for _ in range(invocations):
+            app.invoke(state)
+        us_per_invoke[name] = (time.perf_counter() - start) / invocations * 1e6
+    return {"us_per_invoke": us_per_invoke}
+
+
+# Stand-ins for I/O-bound nodes (a lookup per operand) in the parallel-branches benchmark.
+# They sleep for BRANCH_LATENCY seconds, which releases the GIL like a network call would.
+BRANCH_LATENCY = 0.02
+
+def lookup_left(state):
+    time.sleep(BRANCH_LATENCY)
+    return {"final_number": state['number1'] + state['number2'],
+            "messages": [f"left lookup gives {state['number1'] + state['number2']}"]}
+
+def lookup_right(state):
+    time.sleep(BRANCH_LATENCY)
+    return {"final_number2": state['number3'] + state['number4'],
+            "messages": [f"right lookup gives {state['number3'] + state['number4']}"]}
+
+def report_right(state):
+    return {"messages": [f"right total {state['final_number2']}"]}
+
+
+def measure_parallel_branches(latency_ms: float = 20, invocations: int = 20) -> dict:
+    """
+    Wall time per invoke of a three-stage graph (lookup_left, lookup_right -> report_right) built
+    sequentially and with graph_dependencies.parallelize_config, plus the analysis of graph3.
+
+    :param latency_ms: Simulated I/O latency of each lookup node
+    :param invocations: Timed invocations per build
+    :return: {"ms_per_invoke": {...}, "equivalent": bool, "report": ..., "graph3_report": ...}
+    """
+    import main as graph_main
+    from graph_dependencies import parallelize_config
+
+    global BRANCH_LATENCY
+    BRANCH_LATENCY = latency_ms / 1000
+    config = {"nodes": {"a_lookup": {"function": lookup_left, "edges_to": ["b_lookup"]},
+                        "b_lookup": {"function": lookup_right, "edges_to": ["b_report"]},
+                        "b_report": {"function": report_right, "edges_to": []}},
+              "entry_point": "a_lookup", "finish_points": ["b_report"]}
+    parallel_config, report = parallelize_config(config, graph_main.AgentState)
+    apps = {"sequential": graph_main.build_graph_from_config(config, graph_main.AgentState).compile(),
+            "parallel": graph_main.build_graph_from_config(parallel_config, graph_main.AgentState).compile()}
+
+    rng = random.Random(42)
+    states = [dict(number1=rng.randint(0, 99), number2=rng.randint(0, 99), number3=rng.randint(0, 99),
+                   number4=rng.randint(0, 99), messages=[]) for _ in range(invocations)]
+    results, ms_per_invoke = {}, {}
+    for name, app in apps.items():
+        app.invoke(states[0])
+        start = time.perf_counter()
+        results[name] = [app.invoke(state) for state in states]
+        ms_per_invoke[name] = (time.perf_counter() - start) / invocations * 1000
+
+    graph3 = graph_main.load_arithmetic_config_from_json(
+        graph_main.resolve_config_paths(os.path.join(REPO_DIR, graph_main.DEFAULT_CONFIG_FILE))[0])
+    _, graph3_report = parallelize_config(graph3, graph_main.AgentState)
+    return {"ms_per_invoke": ms_per_invoke, "equivalent": results["sequential"] == results["parallel"],
+            "report": report, "graph3_report": graph3_report}
+
+
+def measure_hot_reload(threads: int = 4, phase_s: float = 1.0, interval: float = 0.05) -> dict:
+    """
+    Invoke graph3 continuously from several threads through a hot_reload.HotReloader while its
+    config is edited on disk: a valid change (addition_operation2 runs subtractor2), an invalid one
+    (edge to an unknown node, which must be rejected) and a revert. Runs on a copy of the configs.
+
+    :param threads: Invoking threads
+    :param phase_s: Seconds to keep invoking after each edit
+    :param interval: Poll interval of the reloader
+    :return: {"invocations", "errors", "latency_ms": {...}, "results_by_version": {...}, "metrics": {...}}
+    """
+    import shutil
+    import threading
+    import main as graph_main
+    from hot_reload import HotReloader
+
+    workdir = tempfile.mkdtemp(prefix='hot-reload-')
+    shutil.copy(os.path.join(REPO_DIR, graph_main.DEFAULT_CONFIG_FILE), workdir)
+    shutil.copytree(os.path.join(REPO_DIR, 'config'), os.path.join(workdir, 'config'))
+    config_file = os.path.join(workdir, graph_main.DEFAULT_CONFIG_FILE)
+    graph_nodes_file, _ = graph_main.resolve_config_paths(config_file)
+    with open(graph_nodes_file) as f:
+        original = json.load(f)
+    state = dict(operation='+', operation2='+', number1=1, number2=2, number3=30, number4=4, messages=[])
+
+    def write_config(edit=None):
+        config = json.loads(json.dumps(original))
+        if edit:
+            edit(config["nodes"])
+        # Write then rename, as deployment tools do; the watcher also tolerates in-place writes
+        with open(graph_nodes_file + '.tmp', 'w') as f:
+            json.dump(config, f)
+        os.replace(graph_nodes_file + '.tmp', graph_nodes_file)
+
+    def swap_addition(nodes):
+        nodes["addition_operation2"]["function_name"] = "subtractor2"
+
+    def break_edge(nodes):
+        nodes["addition_operation"]["edges_to"] = ["missing_node"]
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, errors, results_by_version = [], [], {}
+    reloader = HotReloader(config_file, interval=interval, probe_inputs=[state])
+
+    def worker():
+        while not stop.is_set():
+            version = reloader.version.number
+            start = time.perf_counter()
+            try:
+                result = reloader.invoke(dict(state))
+            except Exception as exc:
+                with lock:
+                    errors.append(f"{type(exc).__name__}: {exc}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                results_by_version.setdefault(version, set()).add(result["final_number2"])
+
+    with reloader:
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        time.sleep(phase_s)
+        for edit in (swap_addition, break_edge, None):
+            write_config(edit)
+            time.sleep(phase_s)
+        stop.set()
+        for thread in pool:
+            thread.join()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies.sort()
+    return {"invocations": len(latencies) + len(errors), "errors": errors,
+            "latency_ms": {"p50": percentile(latencies, 50), "p99": percentile(latencies, 99),
+                           "max": latencies[-1]},
+            "results_by_version": {v: sorted(r) for v, r in sorted(results_by_version.items())},
+            "metrics": reloader.metrics()}
+
+
+def measure_drafter_sessions(sessions: int = 1000, checkpointer: str = 'sqlite') -> dict:
+    """
+    Open many Drafter sessions on one event loop (Drafter.DraftingSessions), leave them all waiting
+    at the human-input interrupt, then answer every one concurrently.
+
+    :param sessions: Number of concurrent drafting sessions
+    :param checkpointer: 'memory' (InMemorySaver) or 'sqlite' (in-memory SqliteDeltaSaver)
+    :return: {"open_s", "resume_s", "threads", "heap_kib_per_idle_session", "completed", "documents_ok"}
+    """
+    import asyncio
+    import gc
+    import threading
+    import tracemalloc
+    import Drafter
+    from checkpoint_store import SqliteDeltaSaver
+    from fake_llm import FakeChatModel, drafter_script
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    saver = SqliteDeltaSaver(':memory:') if checkpointer == 'sqlite' else InMemorySaver()
+    manager = Drafter.DraftingSessions(model=FakeChatModel(script=drafter_script), checkpointer=saver)
+    ids = [f"session-{i}" for i in range(sessions)]
+
+    async def run():
+        # Warm up imports and caches so the heap measurement only sees session state
+        await manager.send("warmup", "Write a warmup note.")
+        await manager.end("warmup")
+        threads = threading.active_count()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        opened = await asyncio.gather(*(manager.send(i, f"Write note {i}.") for i in ids))
+        open_s = time.perf_counter() - start
+        # Finished runs leave reference cycles behind; count only what idle sessions keep alive
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        heap = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+        idle_threads = threading.active_count()
+
+        start = time.perf_counter()
+        finished = await asyncio.gather(*(manager.send(i, "Make it shorter.") for i in ids))
+        resume_s = time.perf_counter() - start
+        return {"open_s": open_s, "resume_s": resume_s, "threads": (threads, idle_threads),
+                "heap_kib_per_idle_session": heap / sessions / 1024,
+                "waiting": sum(not turn.done for turn in opened),
+                "completed": sum(turn.done for turn in finished),
+                "documents_ok": all(turn.document_content == f"Draft: Write note {i}."
+                                    for i, turn in zip(ids, finished))}
+
+    return asyncio.run(run())
+
+
+def measure_drafter_edits(pages: int = 10, edits: int = 20, lines_per_page: int = 50) -> dict:
+    """
+    Tokens per Drafter edit on a multi-page document: before (the full document inlined in the
+    system prompt and re-emitted through `update`, whose result echoed it) and after (outline plus
+    windows in the prompt, a one-line `edit` operation). The after numbers are recorded from the
+    prompts and tool calls of a real Drafter session driven by a scripted model.
+
+    :param pages: Document length in pages
+    :param edits: Single-line edits, one per turn
+    :param lines_per_page: Lines per page (a heading every half page)
+    :return: {"document_tokens", "lines", "tokens_per_edit": {"before": {...}, "after": {...}}}
+    """
+    import re
+    import Drafter
+    from fake_llm import FakeChatModel
+    from history import message_tokens
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from langgraph.types import Command
+    from llm_cache import estimate_tokens
+
+    rng = random.Random(42)
+    lines = []
+    for n in range(pages * lines_per_page):
+        if n % (lines_per_page // 2) == 0:
+            lines.append(f"# Section {n // (lines_per_page // 2) + 1}")
+        else:
+            lines.append(f"Line {n + 1} of the report: " + " ".join(rng.choice(
+                ["budget", "schedule", "risk", "team", "review", "scope", "vendor", "launch"]) for _ in range(8)) + ".")
+    document = "\n".join(lines) + "\n"
+    targets = rng.sample([n for n, line in enumerate(lines, 1) if not line.startswith('#')], edits)
+    replacements = [f"Revised line {n} after the {lines[n - 1].split()[5]} review." for n in targets]
+    instructions = [f"Replace line {n} with: {text}" for n, text in zip(targets, replacements)]
+    instruction = re.compile(r"Replace line (\d+) with: (.*)")
+
+    calls = []
+    def script(messages):
+        # Edit the line named in the instruction
+        calls.append(messages)
+        text = next(m.content for m in reversed(messages) if isinstance(m, HumanMessage))
+        match = instruction.match(text)
+        if match and not isinstance(messages[-1], ToolMessage):
+            operation = {"op": "replace", "start_line": int(match.group(1)), "text": match.group(2)}
+            return AIMessage(content="", tool_calls=[{"name": "edit", "args": {"operations": [operation]},
+                                                      "id": f"call_edit_{len(calls)}", "type": "tool_call"}])
+        return AIMessage(content="Done.")
+
+    app = Drafter.build_app(FakeChatModel(script=script))
+    config = {"configurable": {"thread_id": "edits"}}
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = app.invoke({"messages": [HumanMessage(content=instructions[0])], "document_content": document}, config)
+        for text in instructions[1:]:
+            result = app.invoke(Command(resume=text), config)
+
+    # Before: the document inlined whole, re-emitted in update's arguments and echoed in its result
+    before = {"prompt_document": [], "output": [], "tool_result": []}
+    current = list(lines)
+    for n, text in zip(targets, replacements):
+        before["prompt_document"].append(estimate_tokens("\n".join(current) + "\n"))
+        current[n - 1] = text
+        content = "\n".join(current) + "\n"
+        before["output"].append(estimate_tokens(json.dumps({"content": content})))
+        before["tool_result"].append(estimate_tokens(f"Document updated with content: {content}") + 4)
+
+    # After: the document section of the prompts that led to an edit, the edit calls and their results
+    after = {"prompt_document": [], "output": [], "tool_result": []}
+    template_tokens = estimate_tokens(Drafter.system_prompt("").content)
+    for messages in calls:
+        if isinstance(messages[-1], HumanMessage) and instruction.match(messages[-1].content):
+            after["prompt_document"].append(estimate_tokens(messages[0].content) - template_tokens)
+    for message in result["messages"]:
+        if isinstance(message, AIMessage) and message.tool_calls and message.tool_calls[0]["name"] == "edit":
+            after["output"].append(estimate_tokens(json.dumps(message.tool_calls[0]["args"])))
+        if isinstance(message, ToolMessage) and message.name == "edit":
+            after["tool_result"].append(message_tokens(message))
+
+    mean = lambda values: sum(values) / len(values) if values else 0.0
+    return {"document_tokens": estimate_tokens(document), "lines": len(lines),
+            "tokens_per_edit": {name: {key: mean(values) for key, values in side.items()}
+                                for name, side in (("before", before), ("after", after))}}
+
+
+def check_tool_dependencies(latency: float = 0.05) -> List[str]:
+    """
+    Check that ConcurrentToolExecutor runs a call referencing an earlier result ("$1") after that
+    call has finished, with the result substituted, while independent calls overlap; then the same
+    through ReAct's async app with a model turn that uses the reference.
+
+    :param latency: Seconds each slow tool sleeps
+    :return: Problems found (empty when the ordering holds)
+    """
+    import asyncio
+    import ReAct
+    from fake_llm import FakeChatModel
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.tools import tool
+    from tool_executor import ConcurrentToolExecutor, call_dependencies
+
+    spans = {}
+
+    @tool
+    async def slow_add(a: int, b: int, label: str) -> int:
+        """Add two numbers slowly."""
+        start = time.perf_counter()
+        await asyncio.sleep(latency)
+        spans[label] = (start, time.perf_counter())
+        return a + b
+
+    @tool
+    async def slow_subtract(a: ReAct.Operand, b: ReAct.Operand, label: str) -> int:
+        """Subtract two numbers slowly."""
+        start = time.perf_counter()
+        await asyncio.sleep(latency)
+        spans[label] = (start, time.perf_counter())
+        return int(a) - int(b)
+
+    calls = [{"name": "slow_add", "args": {"a": 1, "b": 2, "label": "first"}, "id": "call_a"},
+             {"name": "slow_add", "args": {"a": 10, "b": 20, "label": "independent"}, "id": "call_b"},
+             {"name": "slow_subtract", "args": {"a": "$1", "b": 1, "label": "dependent"}, "id": "call_c"},
+             {"name": "slow_subtract", "args": {"a": "$call_b", "b": "{$1}", "label": "both"}, "id": "call_d"}]
+    problems = []
+    dependencies = call_dependencies(calls)
+    if dependencies != {"call_a": set(), "call_b": set(), "call_c": {"call_a"}, "call_d": {"call_a", "call_b"}}:
+        problems.append(f"dependencies {dependencies}")
+
+    executor = ConcurrentToolExecutor([slow_add, slow_subtract])
+    messages = asyncio.run(executor.execute(calls))
+    results = [m.content for m in messages]
+    if results != ["3", "30", "2", "27"]:
+        problems.append(f"results {results}, expected ['3', '30', '2', '27']")
+    if spans["dependent"][0] < spans["first"][1] or spans["both"][0] < spans["independent"][1]:
+        problems.append(f"a dependent call started before the call it depends on finished: {spans}")
+    if spans["independent"][0] >= spans["first"][1]:
+        problems.append("independent calls did not overlap")
+
+    def script(history):
+        # One turn: add, then subtract 5 from that addition's result by reference
+        if not isinstance(history[-1], ToolMessage):
+            return AIMessage(content="", tool_calls=[
+                {"name": "add", "args": {"a": 4, "b": 21}, "id": "call_add", "type": "tool_call"},
+                {"name": "subtract", "args": {"a": "$1", "b": 5}, "id": "call_sub", "type": "tool_call"}])
+        return AIMessage(content="Results: " + ", ".join(m.content for m in history if isinstance(m, ToolMessage)))
+
+    app = ReAct.build_async_app(FakeChatModel(script=script), cache_turns=False)
+    result = asyncio.run(app.ainvoke({"messages": [("user", "Add 4 + 21, then subtract 5 from it.")]}))
+    if result["messages"][-1].content != "Results: 25, 20":
+        problems.append(f"async ReAct app answered {result['messages'][-1].content!r}, expected 'Results: 25, 20'")
+    return problems
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks and budget checks for the LangGraph examples.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    budget = sub.add_parser('import-budget', help="Cold import time of a module against the startup budget")
+    budget.add_argument('--module', default='main')
+    budget.add_argument('--budget', type=float, default=DEFAULT_IMPORT_BUDGET, help="Seconds")
+    budget.add_argument('--runs', type=int, default=5)
+
+    run = sub.add_parser('run', help="Benchmark graph invocations")
+    run.add_argument('--graphs', default=','.join(GRAPH_FIXTURES), help="Comma separated graph names")
+    run.add_argument('--concurrency', default='1,4,16', help="Comma separated thread counts")
+    run.add_argument('--invocations', type=int, default=200)
+    run.add_argument('--output', help="Write results as JSON")
+
+    compare = sub.add_parser('compare', help="Fail if current results regress against a baseline")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.10, help="Allowed relative slowdown")
+
+    checkpoints = sub.add_parser('checkpoints', help="Checkpoint write amplification: deltas vs full snapshots")
+    checkpoints.add_argument('--turns', type=int, default=20)
+    checkpoints.add_argument('--snapshot-every', type=int, default=16)
+
+    state_updates = sub.add_parser('state-updates', help="Per-step cost of partial updates vs whole-state returns")
+    state_updates.add_argument('--steps', type=int, default=20)
+    state_updates.add_argument('--invocations', type=int, default=200)
+
+    compact = sub.add_parser('compact-state', help="Memory and per-step time of compact vs TypedDict state")
+    compact.add_argument('--states', type=int, default=10000)
+    compact.add_argument('--invocations', type=int, default=500)
+
+    many = sub.add_parser('run-many', help="graph3 throughput of run_many's process pool vs a thread pool")
+    many.add_argument('--records', type=int, default=5000)
+    many.add_argument('--workers', type=int, default=4)
+    many.add_argument('--chunksize', type=int, default=256)
+
+    fast = sub.add_parser('fast-executor', help="graph3 per-invoke time of the generated executor vs app3.invoke")
+    fast.add_argument('--invocations', type=int, default=2000)
+
+    branches = sub.add_parser('parallel-branches', help="Wall time of independent stages run as parallel "
+                                                        "branches, and the dependency analysis of graph3")
+    branches.add_argument('--latency-ms', type=float, default=20, help="Simulated I/O latency per lookup node")
+    branches.add_argument('--invocations', type=int, default=20)
+
+    reload = sub.add_parser('hot-reload', help="graph3 invocations while its config is edited and hot reloaded")
+    reload.add_argument('--threads', type=int, default=4)
+    reload.add_argument('--phase-s', type=float, default=1.0, help="Seconds of load after each config edit")
+
+    drafts = sub.add_parser('drafter-sessions', help="Many concurrent Drafter sessions idling at the "
+                                                    "human-input interrupt on one event loop")
+    drafts.add_argument('--sessions', type=int, default=1000)
+    drafts.add_argument('--checkpointer', choices=('memory', 'sqlite'), default='sqlite')
+
+    drafter_edits = sub.add_parser('drafter-edits', help="Tokens per Drafter edit: full-document update vs "
+                                                         "patch edits with a windowed prompt")
+    drafter_edits.add_argument('--pages', type=int, default=10)
+    drafter_edits.add_argument('--edits', type=int, default=20)
+
+    sub.add_parser('tool-dependencies', help="Check that tool calls referencing earlier results run after them")
+
+    args = parser.parse_args(argv)
+    if args.command == 'import-budget':
+        report_import_time(args.module, args.budget, args.runs)
+        return 0
+    if args.command == 'run':
+        graphs = [g for g in args.graphs.split(',') if g]
+        unknown = [g for g in graphs if g not in GRAPH_FIXTURES]
+        if unknown:
+            parser.error(f"unknown graphs {unknown}; choose from {list(GRAPH_FIXTURES)}")
+        report = run_benchmarks(graphs, [int(c) for c in args.concurrency.split(',')], args.invocations)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        return 0
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare_results(baseline, current, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    if args.command == 'checkpoints':
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = measure_checkpoint_writes(args.turns, args.snapshot_every)
+        print(f"{stats['checkpoints']} checkpoints over {args.turns} turns in {stats['elapsed_s']:.2f} s")
+        print(f"delta checkpointer:   {stats['bytes_written']:10d} bytes ({stats['bytes_per_turn']:.0f}/turn, "
+              f"{stats['append_blobs']} appends, {stats['full_blobs']} full blobs)")
+        print(f"full snapshots:       {stats['full_snapshot_bytes']:10d} bytes "
+              f"({stats['full_snapshot_bytes_per_turn']:.0f}/turn)")
+        print(f"write amplification saved: {stats['write_amplification_saved']:.0%}")
+        return 0
+    if args.command == 'state-updates':
+        timings = measure_state_updates(args.steps, args.invocations)
+        for style, timing in timings.items():
+            print(f"{style:16s} {timing['us_per_step']:8.1f} us/step  "
+                  f"{timing['channel_writes_per_step']:4.1f} channel writes/step")
+        return 0
+    if args.command == 'compact-state':
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = measure_compact_state(args.states, args.invocations)
+        for name, size in report["bytes_per_state"].items():
+            print(f"{name:14s} {size:8.1f} bytes/state")
+        for name, micros in report["us_per_step"].items():
+            print(f"graph3 {name:14s} {micros:8.1f} us/step")
+        return 0
+    if args.command == 'run-many':
+        report = measure_run_many(args.records, args.workers, args.chunksize)
+        for name, rate in report["records_per_s"].items():
+            print(f"{name:10s} {rate:10.0f} records/s ({args.workers} workers, {os.cpu_count()} CPUs)")
+        print(f"results equivalent to app.invoke: {report['equivalent']}")
+        return 0 if report["equivalent"] else 1
+    if args.command == 'fast-executor':
+        report = measure_fast_executor(args.invocations)
+        baseline = report["us_per_invoke"]["app3"]
+        for name, micros in report["us_per_invoke"].items():
+            print(f"{name:16s} {micros:10.1f} us/invoke  {baseline / micros:7.1f}x")
+        return 0
+    if args.command == 'parallel-branches':
+        from graph_dependencies import format_parallel_report
+
+        report = measure_parallel_branches(args.latency_ms, args.invocations)
+        print(format_parallel_report(report["report"]))
+        for name, millis in report["ms_per_invoke"].items():
+            print(f"{name:12s} {millis:8.1f} ms/invoke")
+        print(f"results identical (messages in sequential order): {report['equivalent']}")
+        print(f"graph3: {format_parallel_report(report['graph3_report'])}")
+        return 0 if report["equivalent"] else 1
+    if args.command == 'hot-reload':
+        report = measure_hot_reload(args.threads, args.phase_s)
+        metrics = report["metrics"]
+        latency = report["latency_ms"]
+        print(f"{report['invocations']} invocations, {len(report['errors'])} errors; latency p50 "
+              f"{latency['p50']:.2f} ms, p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+        print(f"version {metrics['version']}: {metrics['reloads']} reloads "
+              f"(mean {metrics['mean_reload_ms']:.1f} ms, max {metrics['max_reload_ms']:.1f} ms), "
+              f"{metrics['failures']} rejected (last: {metrics['last_error']})")
+        for version, values in report["results_by_version"].items():
+            print(f"  version {version}: final_number2 {values}")
+        for error in report["errors"][:10]:
+            print(f"ERROR {error}")
+        return 1 if report["errors"] or metrics["failures"] != 1 else 0
+    if args.command == 'drafter-sessions':
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = measure_drafter_sessions(args.sessions, args.checkpointer)
+        print(f"{args.sessions} sessions opened in {report['open_s']:.2f} s, {report['waiting']} waiting for input; "
+              f"threads {report['threads'][0]} -> {report['threads'][1]}")
+        print(f"python heap per idle session: {report['heap_kib_per_idle_session']:.1f} KiB ({args.checkpointer})")
+        print(f"all resumed in {report['resume_s']:.2f} s: {report['completed']} completed, "
+              f"documents per session intact: {report['documents_ok']}")
+        return 0 if report["documents_ok"] and report["completed"] == args.sessions else 1
+    if args.command == 'drafter-edits':
+        report = measure_drafter_edits(args.pages, args.edits)
+        print(f"document: {report['lines']} lines, ~{report['document_tokens']} tokens; "
+              f"{args.edits} single-line edits")
+        print(f"{'tokens per edit':16s} {'prompt doc':>10s} {'output':>8s} {'tool result':>12s} {'total':>8s}")
+        totals = {}
+        for name, tokens in report["tokens_per_edit"].items():
+            totals[name] = sum(tokens.values())
+            print(f"{name:16s} {tokens['prompt_document']:10.0f} {tokens['output']:8.0f} "
+                  f"{tokens['tool_result']:12.0f} {totals[name]:8.0f}")
+        print(f"reduction: {totals['before'] / totals['after']:.0f}x")
+        return 0
+    if args.command == 'tool-dependencies':
+        problems = check_tool_dependencies()
+        for problem in problems:
+            print(f"FAIL {problem}")
+        if not problems:
+            print("tool dependencies: referencing calls run after their sources, independent calls overlap")
+        return 1 if problems else 0
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
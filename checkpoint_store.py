@@ -0,0 +1,365 @@
+"""
+Persistent LangGraph checkpointer backed by SQLite that stores per-step deltas.
+
+LangGraph tells a checkpointer which channels changed in a super-step (new_versions); only
+those channels are written. List channels that grow by appending, such as `messages`
+reduced with add_messages, are stored as the appended items plus a pointer to the version
+they extend instead of the whole list. Every `snapshot_every` appends a full copy is
+written so reading a version never replays a long chain.
+
+Threads idle for longer than `ttl` seconds are garbage collected by gc(), which also runs
+automatically every `gc_every` checkpoints.
+
+    saver = SqliteDeltaSaver('checkpoints.sqlite', ttl=7 * 24 * 3600)
+    app = graph.compile(checkpointer=saver)
+    app.invoke(inputs, {"configurable": {"thread_id": "user-42"}})
+
+stats() reports the bytes written and, with measure_full_snapshots=True, the bytes a
+checkpointer writing every channel at every step would have written.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from langgraph.checkpoint.base import (WRITES_IDX_MAP, BaseCheckpointSaver, ChannelVersions, Checkpoint,
+                                       CheckpointMetadata, CheckpointTuple, get_checkpoint_id,
+                                       get_checkpoint_metadata, writes_sort_key)
+from langchain_core.runnables import RunnableConfig
+
+DEFAULT_CHECKPOINT_DB = 'checkpoints.sqlite'
+_MISSING = object()
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS threads (thread_id TEXT PRIMARY KEY, updated REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS checkpoints (thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL,"
+    " checkpoint_id TEXT NOT NULL, parent_id TEXT, type TEXT NOT NULL, checkpoint BLOB NOT NULL,"
+    " metadata_type TEXT NOT NULL, metadata BLOB NOT NULL,"
+    " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+    # kind is 'full', 'append' (data holds the items appended to base_version) or 'empty'
+    "CREATE TABLE IF NOT EXISTS blobs (thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL,"
+    " channel TEXT NOT NULL, version TEXT NOT NULL, kind TEXT NOT NULL, base_version TEXT,"
+    " depth INTEGER NOT NULL, type TEXT, data BLOB,"
+    " PRIMARY KEY (thread_id, checkpoint_ns, channel, version))",
+    "CREATE TABLE IF NOT EXISTS writes (thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL,"
+    " checkpoint_id TEXT NOT NULL, task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL,"
+    " type TEXT NOT NULL, data BLOB NOT NULL, task_path TEXT NOT NULL,"
+    " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))",
+)
+
+
+class SqliteDeltaSaver(BaseCheckpointSaver[str]):
+    """
+    SQLite checkpointer writing only changed channels, list growth as appends (see module docstring).
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_DB, snapshot_every: int = 16,
+                 ttl: Optional[float] = None, gc_every: int = 1000, measure_full_snapshots: bool = False,
+                 max_tracked_lists: int = 1024, serde=None):
+        """
+        :param path: SQLite database file (':memory:' for a throwaway store)
+        :param snapshot_every: Appends after which a list channel is stored in full again
+        :param ttl: Seconds of inactivity after which gc() deletes a thread (None keeps threads)
+        :param gc_every: Run gc() automatically every this many checkpoints
+        :param measure_full_snapshots: Also count the bytes a full-snapshot checkpointer would write
+        :param max_tracked_lists: List channels remembered for append detection (least recently used dropped)
+        """
+        super().__init__(serde=serde)
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.ttl = ttl
+        self.gc_every = gc_every
+        self.measure_full_snapshots = measure_full_snapshots
+        self.max_tracked_lists = max_tracked_lists
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        # Last list value written per (thread, ns, channel): appends are detected against it.
+        self._last_lists: Dict[Tuple[str, str, str], Tuple[str, list, int]] = OrderedDict()
+        self._puts = 0
+        self._stats = {"checkpoints": 0, "blob_bytes": 0, "checkpoint_bytes": 0, "write_bytes": 0,
+                       "full_blobs": 0, "append_blobs": 0, "full_snapshot_bytes": 0}
+
+    # -- blobs ----------------------------------------------------------------
+
+    def _encode_blob(self, key: Tuple[str, str, str], version: str, value: Any) -> tuple:
+        """
+        Return (kind, base_version, depth, type, data) for a channel value.
+        """
+        if not isinstance(value, list):
+            type_, data = self.serde.dumps_typed(value)
+            return 'full', None, 0, type_, data
+        # The tracked lists are shared by every thread writing checkpoints; serialization
+        # happens after the bookkeeping, outside the lock
+        with self._lock:
+            last = self._last_lists.pop(key, None)
+            if len(self._last_lists) >= self.max_tracked_lists:
+                self._last_lists.popitem(last=False)
+            if last is not None:
+                base_version, base, depth = last
+                if len(value) > len(base) and depth + 1 < self.snapshot_every and value[:len(base)] == base:
+                    self._last_lists[key] = (version, list(value), depth + 1)
+                    appended = value[len(base):]
+                else:
+                    last = None
+            if last is None:
+                self._last_lists[key] = (version, list(value), 0)
+        if last is not None:
+            type_, data = self.serde.dumps_typed(appended)
+            return 'append', base_version, depth + 1, type_, data
+        type_, data = self.serde.dumps_typed(value)
+        return 'full', None, 0, type_, data
+
+    def _load_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: str) -> Any:
+        parts = []
+        while version is not None:
+            row = self._conn.execute(
+                "SELECT kind, base_version, type, data FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?"
+                " AND channel = ? AND version = ?", (thread_id, checkpoint_ns, channel, version)).fetchone()
+            if row is None or row[0] == 'empty':
+                return _MISSING
+            parts.append(self.serde.loads_typed((row[2], row[3])))
+            version = row[1] if row[0] == 'append' else None
+        value = parts.pop()
+        if len(parts):
+            value = list(value)
+            for appended in reversed(parts):
+                value.extend(appended)
+        return value
+
+    def _load_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict:
+        values = {}
+        for channel, version in versions.items():
+            value = self._load_blob(thread_id, checkpoint_ns, channel, str(version))
+            if value is not _MISSING:
+                values[channel] = value
+        return values
+
+    # -- reading --------------------------------------------------------------
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, data, metadata_type, metadata = row
+        checkpoint = self.serde.loads_typed((type_, data))
+        writes = self._conn.execute(
+            "SELECT task_id, idx, channel, type, data, task_path FROM writes WHERE thread_id = ?"
+            " AND checkpoint_ns = ? AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[5], w[0], w[1]))
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": self._load_values(
+                thread_id, checkpoint_ns, checkpoint["channel_versions"])},
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=({"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                             "checkpoint_id": parent_id}} if parent_id else None),
+            pending_writes=[(w[0], w[2], self.serde.loads_typed((w[3], w[4]))) for w in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)).fetchone()
+            return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type,"
+                 " metadata FROM checkpoints")
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for row in rows:
+            thread_id, checkpoint_ns = row[0], row[1]
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            with self._lock:
+                yield self._tuple(thread_id, checkpoint_ns, row[2:])
+
+    # -- writing --------------------------------------------------------------
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+        rows = []
+        for channel, version in new_versions.items():
+            if channel in values:
+                kind, base, depth, type_, data = self._encode_blob(
+                    (thread_id, checkpoint_ns, channel), str(version), values[channel])
+            else:
+                kind, base, depth, type_, data = 'empty', None, 0, None, None
+            rows.append((thread_id, checkpoint_ns, channel, str(version), kind, base, depth, type_, data))
+        type_, data = self.serde.dumps_typed(stored)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, data, metadata_type, metadata_data))
+            self._conn.execute("INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time()))
+            self._conn.commit()
+
+            stats = self._stats
+            stats["checkpoints"] += 1
+            stats["checkpoint_bytes"] += len(data) + len(metadata_data)
+            for row in rows:
+                stats["blob_bytes"] += len(row[8] or b"")
+                if row[4] == 'full':
+                    stats["full_blobs"] += 1
+                elif row[4] == 'append':
+                    stats["append_blobs"] += 1
+            if self.measure_full_snapshots:
+                stats["full_snapshot_bytes"] += len(data) + len(metadata_data) + sum(
+                    len(self.serde.dumps_typed(v)[1]) for v in values.values())
+            self._puts += 1
+
+        if self.ttl is not None and self._puts % self.gc_every == 0:
+            self.gc()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, type_, data, task_path))
+        # Special channels (errors, interrupts; negative idx) are replaced, regular writes kept if stored.
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [row for row in rows if row[4] < 0])
+            self._conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   [row for row in rows if row[4] >= 0])
+            self._conn.commit()
+            self._stats["write_bytes"] += sum(len(row[7]) for row in rows)
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        # Same scheme as langgraph's InMemorySaver: zero-padded counter plus a random suffix.
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # -- deletion -------------------------------------------------------------
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for table in ('checkpoints', 'blobs', 'writes', 'threads'):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+            for key in [k for k in self._last_lists if k[0] == thread_id]:
+                del self._last_lists[key]
+
+    def gc(self, ttl: Optional[float] = None) -> int:
+        """
+        Delete threads not updated for `ttl` seconds (default: the saver's ttl).
+        Returns the number of threads deleted.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is None:
+            return 0
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT thread_id FROM threads WHERE updated < ?", (time.time() - ttl,))]
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+        return len(expired)
+
+    def stats(self) -> dict:
+        """
+        Return checkpoint count, bytes written (blobs, checkpoint headers, pending writes),
+        full and append blob counts and, if measured, the full-snapshot bytes for comparison.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["bytes_written"] = stats["blob_bytes"] + stats["checkpoint_bytes"] + stats["write_bytes"]
+        if stats["full_snapshot_bytes"]:
+            stats["full_snapshot_bytes"] += stats["write_bytes"]
+            stats["write_amplification_saved"] = 1 - stats["bytes_written"] / stats["full_snapshot_bytes"]
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- async ----------------------------------------------------------------
+    # SQLite calls are short; the async API runs them inline like langgraph's InMemorySaver.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None):
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+
+def get_checkpointer(path: Optional[str] = None) -> Optional[SqliteDeltaSaver]:
+    """
+    Return a SqliteDeltaSaver for `path` or the CHECKPOINT_DB environment variable, or None
+    if neither is set (graphs then keep state in memory only). CHECKPOINT_TTL sets the TTL.
+    """
+    path = path or os.environ.get('CHECKPOINT_DB')
+    if not path:
+        return None
+    ttl = os.environ.get('CHECKPOINT_TTL')
+    return SqliteDeltaSaver(path, ttl=float(ttl) if ttl else None)
@@ -0,0 +1,179 @@
+"""
+Compact state representations for the arithmetic graphs in main.py.
+
+CompactAgentState, CompactAgentStateV and CompactAgentStateTest are frozen, slotted
+dataclasses with the same fields as main.AgentState, AgentStateV and AgentStateTest. They can
+be passed as the state_schema of build_graph_from_config (or load_app3(compact=True)):
+LangGraph then hands each node a slotted instance instead of a dict, which takes less memory
+per in-flight state. The nodes keep working unchanged because the classes implement the
+read-only mapping protocol (state['number1'], 'messages' in state, state.get(...)).
+
+A field holding None counts as absent, just like a key missing from the TypedDict.
+
+StateBatch is the struct-of-arrays form for batched runs: one numpy array per numeric field
+and one list per list field, in the columnar layout main.invoke_batch accepts.
+
+Conversions share values rather than copying them: from_dict/to_dict pass the same objects
+(lists included) through, and StateBatch.columns is the batch's own storage.
+"""
+from dataclasses import dataclass, field, fields
+from typing import Annotated, Any, Dict, Iterator, List, Mapping, Optional, get_args, get_origin
+import operator
+
+
+class CompactStateMixin:
+    """
+    Read-only mapping protocol for slotted state dataclasses.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        value = getattr(self, key, None) if key in self.__dataclass_fields__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__dataclass_fields__ and getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.__dataclass_fields__ else None
+        return default if value is None else value
+
+    def keys(self) -> List[str]:
+        return [name for name in self.__dataclass_fields__ if getattr(self, name) is not None]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def items(self) -> List[tuple]:
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def to_dict(self) -> dict:
+        """
+        Dict form with the fields that are set; values are shared, not copied.
+        """
+        return dict(self.items())
+
+    @classmethod
+    def from_dict(cls, state: Mapping[str, Any]):
+        """
+        Build from a dict (or any mapping); unknown keys are ignored and values are shared.
+        """
+        return cls(**{name: state[name] for name in cls.__dataclass_fields__ if name in state})
+
+
+@dataclass(frozen=True, slots=True)
+class CompactAgentState(CompactStateMixin):
+    """
+    Slotted equivalent of main.AgentState.
+    """
+    operation: Optional[str] = None
+    operation2: Optional[str] = None
+    number1: Optional[int] = None
+    number2: Optional[int] = None
+    number3: Optional[int] = None
+    number4: Optional[int] = None
+    final_number: Optional[int] = None
+    final_number2: Optional[int] = None
+    messages: Annotated[List[str], operator.add] = field(default_factory=list)
+
+
+@dataclass(frozen=True, slots=True)
+class CompactAgentStateV(CompactStateMixin):
+    """
+    Slotted equivalent of main.AgentStateV.
+    """
+    name: Optional[str] = None
+    number: Annotated[List[int], operator.add] = field(default_factory=list)
+    counter: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class CompactAgentStateTest(CompactStateMixin):
+    """
+    Slotted equivalent of main.AgentStateTest.
+    """
+    messages: Annotated[List[str], operator.add] = field(default_factory=list)
+    values: Optional[List[int]] = None
+    operations: Optional[List[str]] = None
+    name: Optional[str] = None
+    skills: Optional[List[str]] = None
+    current_step: Optional[str] = None
+    result: Optional[str] = None
+
+
+class StateBatch:
+    """
+    Struct-of-arrays batch of states: a numpy array per scalar field and a list per list field.
+    """
+    __slots__ = ('schema', 'columns', 'size')
+
+    def __init__(self, schema, columns: Dict[str, Any]):
+        """
+        :param schema: Compact state class describing the rows (e.g. CompactAgentState)
+        :param columns: {field: array or list}, all of the same length
+        """
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns must have equal lengths, got {sorted(lengths)}.")
+        self.schema = schema
+        self.columns = columns
+        self.size = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_states(cls, states: List[Mapping[str, Any]], schema=CompactAgentState) -> "StateBatch":
+        """
+        Build a batch from dicts or compact states. List fields keep their per-row lists.
+        """
+        import numpy as np
+
+        columns = {}
+        for spec in fields(schema):
+            if not all(spec.name in state for state in states):
+                continue
+            values = [state[spec.name] for state in states]
+            columns[spec.name] = values if _is_list_field(spec) else np.asarray(values)
+        return cls(schema, columns)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index: int):
+        """
+        Row `index` as a compact state (numeric values converted to Python scalars).
+        """
+        return self.schema(**{name: _scalar(column[index]) for name, column in self.columns.items()})
+
+    def to_states(self) -> List[dict]:
+        """
+        Rows as plain dicts, with Python scalars for the numeric fields.
+        """
+        lists = {name: (column if isinstance(column, list) else column.tolist())
+                 for name, column in self.columns.items()}
+        return [{name: values[i] for name, values in lists.items()} for i in range(self.size)]
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the columns (array buffers plus list element references).
+        """
+        import sys
+        return sum(getattr(column, 'nbytes', None) or sys.getsizeof(column) for column in self.columns.values())
+
+
+def _is_list_field(spec) -> bool:
+    # True for List[...] fields, also inside Optional[...] and Annotated[...]
+    pending = [spec.type]
+    while pending:
+        hint = pending.pop()
+        if hint is list or get_origin(hint) is list:
+            return True
+        pending.extend(get_args(hint))
+    return False
+
+
+def _scalar(value: Any) -> Any:
+    return value.item() if hasattr(value, 'item') else value
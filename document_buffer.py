@@ -0,0 +1,428 @@
+"""
+Piece-table document buffer and structured edits for the Drafter agent.
+
+PieceTable keeps a document as a list of pieces (slices of immutable strings): the original
+text plus one string per inserted fragment. Inserting or deleting splits at most two pieces and
+never copies the rest of the document, so a batch of edits costs O(pieces + edited text) and
+the text is joined once at the end (text() is cached per version).
+
+apply_edits applies the operations of the Drafter `edit` tool. Line numbers are 1-based and
+refer to the document as it was before the call, so several operations (and the hunks of a
+unified diff) can be sent together:
+
+    {"op": "replace", "start_line": 3, "end_line": 5, "text": "..."}
+    {"op": "insert", "after_line": 7, "text": "..."}           # after_line 0 inserts at the top
+    {"op": "delete", "start_line": 3, "end_line": 4}
+    {"op": "diff", "patch": "@@ -3,2 +3,2 @@\\n context\\n-old\\n+new\\n"}
+
+prompt_view renders what the model sees of a document: the whole text with line numbers when
+it is short, otherwise an outline plus windows around the last edit and the lines matching the
+user's request.
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+import re
+
+DEFAULT_FULL_LINES = 60
+DEFAULT_WINDOW = 3
+DEFAULT_MAX_WINDOW_LINES = 60
+MAX_OUTLINE_ITEMS = 40
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_WORD = re.compile(r"[A-Za-z0-9']{4,}")
+
+
+class PatchError(ValueError):
+    """
+    Raised when an edit operation or diff hunk does not apply to the document.
+    """
+
+
+class PieceTable:
+    """
+    Mutable text buffer with offset and line based edits (see module docstring).
+    """
+
+    def __init__(self, text: str = ""):
+        # Each piece is (source string, start, end, newlines in the slice); sources are never modified
+        self._pieces: List[Tuple[str, int, int, int]] = [(text, 0, len(text), text.count('\n'))] if text else []
+        self._length = len(text)
+        self._newlines = text.count('\n')
+        self.version = 0
+        self._text = text
+        self._text_version = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __str__(self) -> str:
+        return self.text()
+
+    @property
+    def pieces(self) -> int:
+        return len(self._pieces)
+
+    def text(self) -> str:
+        if self._text_version != self.version:
+            self._text = "".join(source[start:end] for source, start, end, _ in self._pieces)
+            self._text_version = self.version
+        return self._text
+
+    # -- Offsets
+
+    def _split(self, offset: int) -> int:
+        """
+        Make sure a piece starts at offset and return its index (len(pieces) at the end).
+        """
+        if not 0 <= offset <= self._length:
+            raise PatchError(f"Offset {offset} is outside the document (length {self._length}).")
+        position = 0
+        for index, (source, start, end, newlines) in enumerate(self._pieces):
+            size = end - start
+            if offset == position:
+                return index
+            if offset < position + size:
+                cut = start + offset - position
+                head = source.count('\n', start, cut)
+                self._pieces[index:index + 1] = [(source, start, cut, head), (source, cut, end, newlines - head)]
+                return index + 1
+            position += size
+        return len(self._pieces)
+
+    def _char_before(self, offset: int) -> str:
+        position = 0
+        for source, start, end, _ in self._pieces:
+            position += end - start
+            if position >= offset:
+                return source[end - (position - offset) - 1]
+        return ''
+
+    def insert(self, offset: int, text: str) -> None:
+        if not text:
+            return
+        index = self._split(offset)
+        newlines = text.count('\n')
+        self._pieces.insert(index, (text, 0, len(text), newlines))
+        self._length += len(text)
+        self._newlines += newlines
+        self.version += 1
+
+    def delete(self, start: int, end: int) -> None:
+        if end < start:
+            raise PatchError(f"Invalid range {start}-{end}.")
+        if start == end:
+            return
+        first = self._split(start)
+        last = self._split(end)
+        self._newlines -= sum(piece[3] for piece in self._pieces[first:last])
+        del self._pieces[first:last]
+        self._length -= end - start
+        self.version += 1
+
+    def replace(self, start: int, end: int, text: str) -> None:
+        self.delete(start, end)
+        self.insert(start, text)
+
+    # -- Lines
+
+    def line_count(self) -> int:
+        if not self._length:
+            return 0
+        return self._newlines + (self._char_before(self._length) != '\n')
+
+    def line_offset(self, line: int) -> int:
+        """
+        Offset of the first character of a 1-based line; line_count() + 1 gives the end of the text.
+        """
+        if line < 1 or line > self.line_count() + 1:
+            raise PatchError(f"Line {line} is outside the document ({self.line_count()} lines).")
+        remaining = line - 1
+        position = 0
+        for source, start, end, newlines in self._pieces:
+            if remaining <= newlines:
+                if not remaining:
+                    return position
+                found = start - 1
+                for _ in range(remaining):
+                    found = source.index('\n', found + 1, end)
+                return position + found - start + 1
+            remaining -= newlines
+            position += end - start
+        # line_count() + 1 on a text without a trailing newline
+        return self._length
+
+    def get_lines(self, start_line: int, end_line: int) -> str:
+        """
+        Text of lines start_line..end_line (inclusive), line endings included.
+        """
+        start, end = self._line_range(start_line, end_line)
+        return "".join(source[a:b] for source, a, b in self._slices(start, end))
+
+    def _slices(self, start: int, end: int) -> Iterable[Tuple[str, int, int]]:
+        # (source, slice start, slice end) of the pieces covering start..end
+        position = 0
+        for source, piece_start, piece_end, _ in self._pieces:
+            size = piece_end - piece_start
+            if position + size > start and position < end:
+                yield (source, piece_start + max(0, start - position), piece_start + min(size, end - position))
+            position += size
+            if position >= end:
+                return
+
+    def _line_range(self, start_line: int, end_line: int) -> Tuple[int, int]:
+        count = self.line_count()
+        if start_line < 1 or end_line > count or end_line < start_line - 1:
+            raise PatchError(f"Lines {start_line}-{end_line} are outside the document ({count} lines).")
+        return self.line_offset(start_line), self.line_offset(end_line + 1)
+
+    def replace_lines(self, start_line: int, end_line: int, text: str, exact: bool = False) -> None:
+        """
+        Replace lines start_line..end_line with text; end_line = start_line - 1 inserts before start_line.
+        Unless exact, a missing final newline is added where the text would otherwise run into
+        the next line or drop the document's final newline.
+        """
+        start, end = self._line_range(start_line, end_line)
+        if text and not text.endswith('\n') and not exact:
+            # Keep the following line on its own line; only the last line of the text may lack a newline
+            if end < self._length or (end > start and self._char_before(end) == '\n'):
+                text += '\n'
+        if text and start == self._length and start and self._char_before(start) != '\n':
+            text = '\n' + text
+        self.replace(start, end, text)
+
+    def insert_lines(self, after_line: int, text: str) -> None:
+        self.replace_lines(after_line + 1, after_line, text)
+
+    def delete_lines(self, start_line: int, end_line: int) -> None:
+        self.replace_lines(start_line, end_line, "")
+
+    def lines(self) -> List[str]:
+        return split_lines(self.text())
+
+
+def split_lines(text: str) -> List[str]:
+    """
+    Lines of text without their '\n' endings. Unlike str.splitlines, only '\n' ends a line, so
+    the lines match the line numbers of line_offset and the edit operations.
+    """
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return lines
+
+
+def _text_lines(text: str) -> int:
+    if not text:
+        return 0
+    return text.count('\n') + (not text.endswith('\n'))
+
+
+def parse_unified_diff(patch: str) -> List[Tuple[int, List[str], List[str]]]:
+    """
+    Parse the hunks of a unified diff (file headers are ignored).
+
+    :return: List of (old start line, old lines, new lines, new text ends without a newline);
+             lines are without line endings
+    """
+    hunks = []
+    current = None
+    tag = None
+    for line in split_lines(patch):
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = [int(header.group(1)), [], [], False]
+            hunks.append(current)
+            tag = None
+            continue
+        if current is None:
+            # File headers before the first hunk
+            continue
+        if line.startswith('\\'):
+            # "\ No newline at end of file" applies to the line before it; only the new side matters
+            if tag in (' ', '+'):
+                current[3] = True
+            continue
+        tag, body = (line[0], line[1:]) if line else (' ', '')
+        if tag in ' -':
+            current[1].append(body)
+        if tag in ' +':
+            current[2].append(body)
+        if tag not in ' -+':
+            raise PatchError(f"Invalid diff line {line!r}.")
+    if not hunks:
+        raise PatchError("The patch has no @@ hunks.")
+    return [tuple(hunk) for hunk in hunks]
+
+
+def _locate_hunk(lines: Sequence[str], old_start: int, old: List[str]) -> int:
+    """
+    Return the 1-based line where the hunk's old lines are, preferring its header's position.
+    """
+    size = len(old)
+    if not size:
+        # Pure insertion: "@@ -N,0" inserts after line N
+        return old_start + 1
+
+    def matches(line):
+        return list(lines[line - 1:line - 1 + size]) == old
+
+    if matches(old_start):
+        return old_start
+    found = [line for line in range(1, len(lines) - size + 2) if matches(line)]
+    if len(found) != 1:
+        raise PatchError(f"Hunk at line {old_start} does not match the document"
+                         f"{' (ambiguous)' if found else ''}: {old[0]!r}...")
+    return found[0]
+
+
+def _text(operation: dict) -> str:
+    # A missing or null text must not turn a replace or insert into a silent delete
+    text = operation.get("text")
+    if not isinstance(text, str):
+        raise PatchError(f"Invalid {operation.get('op')} operation {operation!r}: 'text' must be a string "
+                         f"(use delete to remove lines)")
+    return text
+
+
+def _normalize(operation: dict, buffer: PieceTable) -> List[Tuple[int, int, str, bool]]:
+    """
+    Turn one edit operation into (start_line, end_line, text, exact) replacements of original
+    lines; exact text (from diffs) is applied without adding line endings.
+    """
+    op = operation.get("op")
+    try:
+        if op == "replace":
+            start = int(operation["start_line"])
+            return [(start, int(operation.get("end_line", start)), _text(operation), False)]
+        if op == "insert":
+            after = int(operation["after_line"])
+            return [(after + 1, after, _text(operation), False)]
+        if op == "delete":
+            start = int(operation["start_line"])
+            return [(start, int(operation.get("end_line", start)), "", False)]
+        if op == "diff":
+            # Only hunks need the text as lines; line operations never materialize the document
+            lines = buffer.lines()
+            replacements = []
+            for old_start, old, new, no_newline in parse_unified_diff(operation["patch"]):
+                start = _locate_hunk(lines, old_start, old)
+                text = "".join(f"{line}\n" for line in new)
+                if no_newline and text and start + len(old) - 1 == len(lines):
+                    # The marker only means something for a hunk that reaches the end of the document
+                    text = text[:-1]
+                replacements.append((start, start + len(old) - 1, text, True))
+            return replacements
+    except (KeyError, TypeError, ValueError) as exc:
+        if isinstance(exc, PatchError):
+            raise
+        raise PatchError(f"Invalid {op} operation {operation!r}: {exc}")
+    raise PatchError(f"Unknown edit operation {op!r}; use replace, insert, delete or diff.")
+
+
+def apply_edits(buffer: PieceTable, operations: Iterable[dict]) -> List[Tuple[int, int]]:
+    """
+    Apply edit operations whose line numbers refer to the buffer before the call.
+
+    :param buffer: Document buffer, modified in place (unchanged if any operation is invalid)
+    :param operations: Operations as described in the module docstring
+    :return: (start_line, end_line) of each edited region in the new document
+    :raises PatchError: An operation is malformed, out of range, overlaps another or a hunk does not match
+    """
+    count = buffer.line_count()
+    replacements = []
+    for operation in operations:
+        replacements.extend(_normalize(operation, buffer))
+    replacements.sort(key=lambda r: (r[0], r[1]))
+
+    previous_end = 0
+    for start, end, _, _ in replacements:
+        if start < 1 or end > count or end < start - 1:
+            raise PatchError(f"Lines {start}-{end} are outside the document ({count} lines).")
+        if start <= previous_end:
+            raise PatchError(f"Edits overlap at line {start}.")
+        previous_end = max(previous_end, end)
+
+    # Bottom-up, so the line numbers of the remaining edits stay valid
+    for start, end, text, exact in reversed(replacements):
+        buffer.replace_lines(start, end, text, exact)
+
+    regions, shift = [], 0
+    for start, end, text, _ in replacements:
+        added = _text_lines(text)
+        regions.append((start + shift, start + shift + max(added, 1) - 1))
+        shift += added - (end - start + 1)
+    return regions
+
+
+def outline(buffer: PieceTable, max_items: int = MAX_OUTLINE_ITEMS) -> List[Tuple[int, str]]:
+    """
+    (line, text) of the Markdown headings, or of the first line of each paragraph if there are none.
+    """
+    lines = buffer.lines()
+    headings = [(n, line.strip()) for n, line in enumerate(lines, 1) if line.lstrip().startswith('#')]
+    if not headings:
+        headings = [(n, line.strip()[:60]) for n, line in enumerate(lines, 1)
+                    if line.strip() and (n == 1 or not lines[n - 2].strip())]
+    if len(headings) > max_items:
+        step = -(-len(headings) // max_items)
+        headings = headings[::step]
+    return headings
+
+
+def _numbered(lines: Sequence[str], first: int) -> str:
+    return "\n".join(f"{n:>5}| {line}" for n, line in enumerate(lines, first))
+
+
+def _matching_lines(lines: Sequence[str], query: str, limit: int = 3) -> List[int]:
+    terms = {w.lower() for w in _WORD.findall(query)}
+    if not terms:
+        return []
+    scored = []
+    for n, line in enumerate(lines, 1):
+        score = len(terms & {w.lower() for w in _WORD.findall(line)})
+        if score:
+            scored.append((-score, n))
+    return [n for _, n in sorted(scored)[:limit]]
+
+
+def prompt_view(buffer: PieceTable, query: str = "", focus: Iterable[int] = (),
+                full_lines: Optional[int] = DEFAULT_FULL_LINES, window: int = DEFAULT_WINDOW,
+                max_window_lines: int = DEFAULT_MAX_WINDOW_LINES) -> str:
+    """
+    Render the document for the model's prompt.
+
+    :param buffer: Document buffer
+    :param query: The user's latest request; lines sharing words with it are shown
+    :param focus: Lines to show regardless of the query (e.g. the regions edited last)
+    :param full_lines: Show the whole document when it has at most this many lines (None: always)
+    :param window: Lines of context around each focus or matching line
+    :param max_window_lines: Maximum lines shown in windows
+    :return: Numbered document text, or an outline plus numbered windows
+    """
+    lines = buffer.lines()
+    if not lines:
+        return "(The document is empty.)"
+    if full_lines is None or len(lines) <= full_lines:
+        return f"Document ({len(lines)} lines):\n{_numbered(lines, 1)}"
+
+    centers = [n for n in focus if 1 <= n <= len(lines)] + _matching_lines(lines, query)
+    ranges = sorted((max(1, center - window), min(len(lines), center + window)) for center in centers)
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    windows, shown = [], 0
+    for start, end in merged:
+        end = min(end, start + max_window_lines - shown - 1)
+        if end < start:
+            break
+        windows.append((start, end))
+        shown += end - start + 1
+
+    parts = [f"Document ({len(lines)} lines). Outline:",
+             "\n".join(f"{n:>5}| {text}" for n, text in outline(buffer))]
+    for start, end in windows:
+        parts.append(f"Lines {start}-{end}:\n{_numbered(lines[start - 1:end], start)}")
+    parts.append("Other lines are not shown; use the view tool to read them before editing.")
+    return "\n\n".join(parts)
@@ -0,0 +1,126 @@
+"""
+Restricted expression language for "lambda" entries in function_mapping configs.
+
+Expressions are single-argument lambdas over the graph state, e.g. `lambda state: state` or
+`lambda state: {'final_number': state['number1'] * 2}`. They are parsed once, checked against
+an AST whitelist (no attribute access other than state.get, no imports, no dunder names, only
+a handful of pure builtins) and compiled to a code object. Compiled callables are cached by
+expression string, so reloading a config does not parse anything again.
+
+Arithmetic is bounded: there is no exponentiation, and `*` only multiplies numbers, so an
+expression cannot build a huge number or repeat a sequence into a huge string or list.
+"""
+from functools import lru_cache
+from typing import Callable
+import ast
+
+SAFE_FUNCTIONS = {
+    'abs': abs, 'bool': bool, 'float': float, 'int': int, 'len': len,
+    'max': max, 'min': min, 'round': round, 'str': str, 'sum': sum,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.Lambda, ast.arguments, ast.arg, ast.Load,
+    ast.Name, ast.Constant, ast.Dict, ast.List, ast.Tuple, ast.Set,
+    ast.Subscript, ast.Slice, ast.Attribute, ast.Call, ast.keyword,
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+)
+_ALLOWED_METHODS = ('get',)
+_SEQUENCE_NODES = (ast.List, ast.Tuple, ast.Set, ast.Dict)
+_MULTIPLY = '_multiply'
+
+
+class ExpressionError(ValueError):
+    """
+    Raised when a lambda expression is malformed or uses something outside the whitelist.
+    """
+
+
+def _multiply(a, b):
+    """
+    `a * b` for numbers only; sequence repetition (e.g. "x" * n) is rejected.
+    """
+    for operand in (a, b):
+        if not isinstance(operand, (int, float)):
+            raise ExpressionError(f"'*' only multiplies numbers, not {type(operand).__name__}")
+    return a * b
+
+
+class _CheckedMultiply(ast.NodeTransformer):
+    """
+    Rewrite `a * b` into `_multiply(a, b)`: the operand types are only known at run time.
+    """
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Mult):
+            return node
+        call = ast.Call(func=ast.Name(id=_MULTIPLY, ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+        return ast.copy_location(call, node)
+
+
+def _validate(tree: ast.Expression, expression: str) -> str:
+    """
+    Check the parsed expression against the whitelist and return the lambda's argument name.
+    """
+    lam = tree.body
+    if not isinstance(lam, ast.Lambda):
+        raise ExpressionError(f"Expression must be a lambda: {expression!r}")
+    args = lam.args
+    if (len(args.args) != 1 or args.posonlyargs or args.kwonlyargs or args.vararg
+            or args.kwarg or args.defaults):
+        raise ExpressionError(f"Lambda must take exactly one argument (the state): {expression!r}")
+    arg_name = args.args[0].arg
+
+    for node in ast.walk(lam.body):
+        if isinstance(node, ast.Lambda) or not isinstance(node, _ALLOWED_NODES):
+            raise ExpressionError(f"'{type(node).__name__}' is not allowed in {expression!r}")
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+            for operand in (node.left, node.right):
+                if isinstance(operand, _SEQUENCE_NODES) or (isinstance(operand, ast.Constant)
+                                                            and not isinstance(operand.value, (int, float))):
+                    raise ExpressionError(f"'*' only multiplies numbers in {expression!r}")
+        if isinstance(node, ast.Name) and node.id != arg_name and node.id not in SAFE_FUNCTIONS:
+            raise ExpressionError(f"Unknown name '{node.id}' in {expression!r}")
+        if isinstance(node, ast.Attribute):
+            if not (isinstance(node.value, ast.Name) and node.value.id == arg_name
+                    and node.attr in _ALLOWED_METHODS):
+                raise ExpressionError(f"Attribute access '.{node.attr}' is not allowed in {expression!r}")
+        if isinstance(node, ast.Call):
+            func = node.func
+            if not (isinstance(func, ast.Attribute) or (isinstance(func, ast.Name) and func.id in SAFE_FUNCTIONS)):
+                raise ExpressionError(f"Only {sorted(SAFE_FUNCTIONS)} and state.get may be called in {expression!r}")
+    return arg_name
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression: str) -> Callable:
+    """
+    Compile a whitelisted lambda expression into a callable. Results are cached by expression string.
+
+    :param expression: Lambda source, e.g. "lambda state: state"
+    :return: The compiled function; identity lambdas are marked with pass_through = True
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression {expression!r}: {e.msg}") from None
+    arg_name = _validate(tree, expression)
+
+    # Checked on the validated tree; the rewrite only adds calls to _multiply
+    checked = ast.fix_missing_locations(_CheckedMultiply().visit(tree))
+    code = compile(checked, '<function_mapping>', 'eval')
+    func = eval(code, {'__builtins__': {}, **SAFE_FUNCTIONS, _MULTIPLY: _multiply})
+    func.expression = expression
+    func.pass_through = isinstance(tree.body.body, ast.Name) and tree.body.body.id == arg_name
+    return func
+
+
+def is_pass_through(func: Callable) -> bool:
+    """
+    Return True if func is a compiled identity lambda (returns the state unchanged).
+    """
+    return getattr(func, 'pass_through', False)
@@ -0,0 +1,127 @@
+"""
+Deterministic, offline stand-in for ChatGoogleGenerativeAI.
+
+FakeChatModel answers from a script function (messages -> AIMessage) with optional synthetic
+latency, so the ReAct and Drafter graphs can be run and benchmarked without network access.
+react_script and drafter_script reproduce the tool-calling behaviour those agents expect.
+"""
+from typing import Any, Callable, List, Optional
+import asyncio
+import os
+import re
+import tempfile
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model whose reply is computed by `script` from the incoming messages.
+    """
+    script: Callable[[List[BaseMessage]], AIMessage]
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_tools(self, tools, **kwargs) -> "FakeChatModel":
+        # Scripts decide which tools to call; binding is a no-op.
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.script(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.script(messages))])
+
+
+def _tool_call(name: str, args: dict, index: int) -> dict:
+    return {"name": name, "args": args, "id": f"call_{name}_{index}", "type": "tool_call"}
+
+
+_ADD = re.compile(r"add\s+(-?\d+)\s*(?:\+|and)\s*(-?\d+)", re.IGNORECASE)
+_SUBTRACT = re.compile(r"subtract\s+(-?\d+)\s+from\s+(-?\d+)", re.IGNORECASE)
+_MULTIPLY = re.compile(r"multiply\s+(-?\d+)\s*(?:\*|x|and|by)\s*(-?\d+)", re.IGNORECASE)
+_SUBTRACT_FROM_RESULT = re.compile(r"subtract\s+(-?\d+)\s+from\s+the\s+result\s+of\s+the\s+(first|second|third)\s+addition", re.IGNORECASE)
+_ORDINALS = {"first": 0, "second": 1, "third": 2}
+
+
+def react_script(messages: List[BaseMessage]) -> AIMessage:
+    """
+    ReAct behaviour: turn "Add 34 + 21", "subtract 5 from 55", "multiply 3 by 4" phrases in
+    the last human message into tool calls. "Subtract 5 from the result of the first addition"
+    is issued as a second round once the additions have returned. Finally the tool results
+    are summarized.
+    """
+    text = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+    last = messages[-1]
+    if isinstance(last, ToolMessage):
+        results = [m for m in messages if isinstance(m, ToolMessage)]
+        additions = [m for m in results if m.name == "add"]
+        follow_up = _SUBTRACT_FROM_RESULT.search(text)
+        if follow_up and not any(m.name == "subtract" for m in results):
+            source = additions[_ORDINALS[follow_up.group(2).lower()]]
+            return AIMessage(content="", tool_calls=[
+                _tool_call("subtract", {"a": int(source.content), "b": int(follow_up.group(1))}, len(results))])
+        return AIMessage(content="Results: " + ", ".join(f"{m.name}={m.content}" for m in results))
+
+    calls = []
+    for name, pattern in (("add", _ADD), ("multiply", _MULTIPLY)):
+        for a, b in pattern.findall(text):
+            calls.append(_tool_call(name, {"a": int(a), "b": int(b)}, len(calls)))
+    for b, a in _SUBTRACT.findall(text):
+        calls.append(_tool_call("subtract", {"a": int(a), "b": int(b)}, len(calls)))
+    if not calls:
+        return AIMessage(content="There is nothing to calculate.")
+    return AIMessage(content="", tool_calls=calls)
+
+
+# Where drafter_script saves, so scripted sessions never write into the working directory
+DRAFTER_SAVE_PATH = os.path.join(tempfile.gettempdir(), "bench_document.txt")
+
+
+def drafter_script(messages: List[BaseMessage]) -> AIMessage:
+    """
+    Drafter behaviour: update the document on the first turn, save it (to DRAFTER_SAVE_PATH) on the next one.
+    """
+    updated = any(isinstance(m, ToolMessage) and m.name == "update" for m in messages)
+    turn = sum(isinstance(m, AIMessage) for m in messages)
+    if not updated:
+        text = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        return AIMessage(content="Updating the document.",
+                         tool_calls=[_tool_call("update", {"content": f"Draft: {text}"}, turn)])
+    return AIMessage(content="Saving the document.",
+                     tool_calls=[_tool_call("save", {"filename": DRAFTER_SAVE_PATH}, turn)])
+
+
+def echo_script(messages: List[BaseMessage]) -> AIMessage:
+    """
+    Plain chat behaviour: acknowledge the last human message.
+    """
+    text = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+    return AIMessage(content=f"You said: {text}")
+
+
+def summary_script(messages: List[BaseMessage]) -> AIMessage:
+    """
+    Summarizer behaviour: keep the previous summary and the first sentence of each new line
+    of the transcript to summarize.
+    """
+    text = messages[-1].content if messages else ""
+    lines = []
+    for line in text.splitlines():
+        if line.startswith("Previous summary: "):
+            lines.append(line[len("Previous summary: "):])
+        elif line.strip():
+            lines.append(line.split(". ")[0].strip()[:80])
+    return AIMessage(content=" ".join(lines))
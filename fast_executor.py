@@ -0,0 +1,257 @@
+"""
+Generated executor for deterministic config graphs.
+
+compile_fast turns a resolved graph config (the output of load_arithmetic_config_from_json,
+optionally after graph_optimizer) into one plain Python function: a loop over the current
+node name in which every node block calls its function directly, merges the returned update
+(applying the schema's reducers) and picks the next node from its edge or router. There are
+no channels, no checkpoints and no task scheduling. Pass-through nodes compile to their router
+call only.
+
+The result matches StateGraph(...).compile().invoke for graphs in which every super-step runs
+exactly one node: each node has either one plain edge, conditional edges, or none (a finish
+point). Fan-out graphs raise UnsupportedGraphError. Node functions must not mutate the state
+they receive (they return partial updates, see main.py), since it is not copied per step.
+
+    fast = load_fast_app3()
+    fast.invoke({"operation": "+", "operation2": "-", "number1": 1, ...})
+
+    # Shadow mode: also run the compiled graph and raise EquivalenceError on any difference
+    checked = load_fast_app3(verify_against=main.load_app3())
+"""
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, get_origin, get_type_hints
+import itertools
+import os
+
+from graph_optimizer import channel_reducers
+
+END_NODE = '__end__'
+# Same default (and environment override) as LangGraph's recursion_limit
+DEFAULT_RECURSION_LIMIT = int(os.getenv("LANGGRAPH_DEFAULT_RECURSION_LIMIT", "10007"))
+
+# Distinguishes generated functions in tracebacks
+_counter = itertools.count()
+
+
+class UnsupportedGraphError(ValueError):
+    """
+    Raised for graph shapes the fast executor cannot run with the same semantics as LangGraph.
+    """
+
+
+class EquivalenceError(AssertionError):
+    """
+    Raised in verify mode when the fast executor and the compiled graph disagree.
+    """
+
+
+def _channel_defaults(state_schema) -> Dict[str, Callable[[], Any]]:
+    # Reducer channels start from an empty value of their type (e.g. []), as in LangGraph
+    defaults = {}
+    hints = get_type_hints(state_schema, include_extras=True)
+    for name in channel_reducers(state_schema):
+        base = getattr(hints[name], '__origin__', hints[name])
+        defaults[name] = get_origin(base) or base
+    return defaults
+
+
+def _check_supported(config: dict) -> None:
+    if "entry_points" in config:
+        raise UnsupportedGraphError("Parallel configs (several entry points) are not supported.")
+    finish_points = config.get("finish_points") or ([config["finish_point"]] if "finish_point" in config else [])
+    for name, node in config["nodes"].items():
+        edges = node.get("edges_to", [])
+        exits = len(edges) + ("conditional_edges" in node) + (name in finish_points)
+        if exits > 1:
+            raise UnsupportedGraphError(f"Node '{name}' fans out to several successors.")
+        for target in list(edges) + list(node.get("conditional_edges", {}).values()):
+            if target not in config["nodes"] and target != END_NODE:
+                raise UnsupportedGraphError(f"Node '{name}' has an edge to unknown node '{target}'.")
+
+
+def generate_source(config: dict, name: str = 'run', view: bool = False) -> tuple:
+    """
+    Generate the executor source for a resolved graph config.
+
+    :param config: Resolved (optionally optimized) graph config
+    :param name: Name of the generated function
+    :param view: Pass nodes view(state) instead of the state dict (for dataclass schemas)
+    :return: (source, namespace of the functions and mappings it refers to)
+    """
+    _check_supported(config)
+    namespace = {}
+    argument = "view(state)" if view else "state"
+    lines = [f"def {name}(state, limit):"]
+
+    def route(indent, router_key, mapping_key):
+        # Router results outside the mapping raise KeyError, as they do in LangGraph
+        lines.append(f"{indent}node = {mapping_key}[{router_key}(state)]")
+
+    if "entry_conditional_edges" in config:
+        namespace["entry_router"] = config["entry_router"]
+        namespace["entry_mapping"] = config["entry_conditional_edges"]
+        route("    ", "entry_router", "entry_mapping")
+    else:
+        lines.append(f"    node = {config['entry_point']!r}")
+    lines += [
+        "    steps = 0",
+        f"    while node != {END_NODE!r}:",
+        "        steps += 1",
+        "        # LangGraph runs at most limit - 1 super-steps",
+        "        if steps >= limit:",
+        "            raise_recursion(limit)",
+    ]
+
+    for index, (node_name, node) in enumerate(config["nodes"].items()):
+        keyword = "if" if index == 0 else "elif"
+        lines.append(f"        {keyword} node == {node_name!r}:")
+        if not node.get("pass_through"):
+            namespace[f"f{index}"] = node["function"]
+            lines += [
+                f"            update = f{index}({argument})",
+                "            if update:",
+                "                merge(state, update)",
+            ]
+        if "conditional_edges" in node:
+            router = node.get("router_function", node["function"])
+            namespace[f"r{index}"], namespace[f"m{index}"] = router, node["conditional_edges"]
+            route("            ", f"r{index}", f"m{index}")
+        elif node.get("edges_to"):
+            lines.append(f"            node = {node['edges_to'][0]!r}")
+        else:
+            lines.append(f"            node = {END_NODE!r}")
+    lines.append("        else:")
+    lines.append("            raise KeyError(node)")
+    lines.append("    return state")
+    return "\n".join(lines) + "\n", namespace
+
+
+class FastGraph:
+    """
+    Executor compiled from a resolved graph config, with the invoke/batch surface of a compiled graph.
+    """
+
+    def __init__(self, config: dict, state_schema, validate_input: Optional[Callable[[Mapping], None]] = None,
+                 recursion_limit: int = DEFAULT_RECURSION_LIMIT, verify_against=None):
+        """
+        :param config: Resolved (optionally optimized) graph config
+        :param state_schema: TypedDict or dataclass state schema the config was built for
+        :param validate_input: Optional boundary check for input states (graph_validator.InputValidator)
+        :param recursion_limit: Maximum node executions per invoke, like LangGraph's recursion_limit
+        :param verify_against: Compiled graph to shadow every invoke with; differences raise EquivalenceError
+        """
+        self.state_schema = state_schema
+        self.validate_input = validate_input
+        self.recursion_limit = recursion_limit
+        self.verify_against = verify_against
+        self.channels = list(get_type_hints(state_schema))
+        self._channel_set = frozenset(self.channels)
+        self.reducers = channel_reducers(state_schema)
+        self.defaults = _channel_defaults(state_schema)
+
+        # Dataclass schemas (compact_state) hand nodes an instance, TypedDicts the dict itself
+        dataclass_schema = hasattr(state_schema, '__dataclass_fields__')
+        name = f"fast_graph_{next(_counter)}"
+        self.source, namespace = generate_source(config, name, view=dataclass_schema)
+        namespace.update(merge=self._merge, view=lambda state: state_schema(**state),
+                         raise_recursion=_raise_recursion)
+        exec(compile(self.source, f"<{name}>", 'exec'), namespace)
+        self._run = namespace[name]
+
+    def _merge(self, state: dict, update: Mapping[str, Any]) -> None:
+        reducers = self.reducers
+        for key, value in update.items():
+            if key not in reducers:
+                if key not in self._channel_set:
+                    raise ValueError(f"Node returned unknown state key '{key}'.")
+                state[key] = value
+            else:
+                state[key] = reducers[key](state[key], value)
+
+    def _initial_state(self, state: Mapping[str, Any]) -> dict:
+        result = {}
+        for key in self.channels:
+            if key in self.defaults:
+                # Input values pass through the reducer, so the caller's lists are never shared
+                empty = self.defaults[key]()
+                result[key] = self.reducers[key](empty, state[key]) if key in state else empty
+            elif key in state:
+                result[key] = state[key]
+        return result
+
+    def invoke(self, state: Mapping[str, Any], config: dict = None, **kwargs) -> dict:
+        """
+        Run the graph on one input state and return the final state.
+        """
+        if self.validate_input is not None:
+            self.validate_input(state)
+        if hasattr(state, 'to_dict'):
+            state = state.to_dict()
+        limit = (config or {}).get("recursion_limit", self.recursion_limit)
+        final = self._run(self._initial_state(state), limit)
+        # Same key order as the compiled graph's output (schema order)
+        result = {key: final[key] for key in self.channels if key in final}
+        if self.verify_against is not None:
+            expected = self.verify_against.invoke(dict(state), config)
+            if expected != result:
+                raise EquivalenceError(f"Fast executor returned {result!r}, compiled graph {expected!r}.")
+        return result
+
+    __call__ = invoke
+
+    def batch(self, states: Iterable[Mapping[str, Any]], config: dict = None, **kwargs) -> List[dict]:
+        return [self.invoke(state, config) for state in states]
+
+
+def _raise_recursion(limit: int) -> None:
+    from langgraph.errors import GraphRecursionError
+
+    raise GraphRecursionError(f"Recursion limit of {limit} reached without hitting a stop condition.")
+
+
+def compile_fast(config: dict, state_schema, validate_input=None, **kwargs) -> FastGraph:
+    """
+    Compile a resolved graph config into a FastGraph; see FastGraph for the keyword arguments.
+    """
+    return FastGraph(config, state_schema, validate_input, **kwargs)
+
+
+def load_fast_app3(config_file: str = None, optimize: bool = False, verify_against=None) -> FastGraph:
+    """
+    Fast executor for the config-based arithmetic graph (graph3), validated like load_app3.
+
+    :param config_file: Path to the top-level config (default: main.DEFAULT_CONFIG_FILE)
+    :param optimize: Apply graph_optimizer passes first (fewer node blocks per invoke)
+    :param verify_against: Compiled graph to compare every invoke with (see FastGraph)
+    """
+    import json
+    import main
+    from graph_optimizer import optimize_graph_config
+
+    graph_nodes_file, _ = main.resolve_config_paths(config_file or main.DEFAULT_CONFIG_FILE)
+    with open(graph_nodes_file, 'r') as f:
+        json_config = json.load(f)
+    validate_input = main.validate_arithmetic_config(json_config, json_config["function_mapping"])
+    config = main.resolve_arithmetic_config(json_config, json_config["function_mapping"])
+    if optimize:
+        config, _ = optimize_graph_config(config, main.AgentState)
+    return FastGraph(config, main.AgentState, validate_input, verify_against=verify_against)
+
+
+def check_equivalence(fast: FastGraph, app, states: Iterable[Mapping[str, Any]]) -> List[str]:
+    """
+    Run every state through both executors and describe each difference (empty when equivalent).
+    Exceptions count as results, so both sides must also fail on the same inputs.
+    """
+    def outcome(run, state):
+        try:
+            return run(dict(state))
+        except Exception as exc:
+            return f"{type(exc).__name__}"
+
+    mismatches = []
+    for index, state in enumerate(states):
+        got, expected = outcome(fast.invoke, state), outcome(app.invoke, state)
+        if got != expected:
+            mismatches.append(f"input {index} {dict(state)!r}: fast {got!r} != compiled {expected!r}")
+    return mismatches
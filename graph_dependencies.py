@@ -0,0 +1,343 @@
+"""
+Field-level dependency analysis of resolved graph configs, and parallel fan-out of independent stages.
+
+A config is cut into stages at its articulation nodes: the nodes every path from the entry
+point to the end passes through. In graph3 these are `router` and `router2`, so the stages are
+{router, addition_operation, subtraction_operation} and {router2, addition_operation2,
+subtraction_operation2}. Each stage gets a read set and a write set, the union over its nodes
+and routers. The sets are declared as "reads"/"writes" in the function mapping, or inferred
+from the source: graph_validator.infer_reads for reads, and the keys of returned dict
+literals for writes.
+
+Two stages depend on each other when one reads or writes a field the other writes. Reducer
+channels (e.g. messages with operator.add) are the exception: both stages may append to them,
+provided the parallel run appends in the sequential order. Within a super-step LangGraph
+applies writes sorted by node name, so every writer in an earlier stage must come first by
+(super-step, node name).
+
+parallelize_config groups dependent stages into branches that keep their order and rewrites
+the config so START fans out to every branch, with the branch ends meeting in a deferred join
+node before END. When everything depends on everything the config is left sequential and the
+report lists the reasons. graph3 stays sequential because adder2 formats final_number, which
+the first stage writes, into its message.
+"""
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import ast
+
+from graph_optimizer import channel_reducers, max_super_steps
+from graph_validator import function_tree, infer_reads, walk_function_body
+
+END_NODE = '__end__'
+JOIN_NODE = 'join'
+
+
+def infer_writes(func: Callable) -> Optional[Set[str]]:
+    """
+    Infer the state fields a node function writes from the dict literals it returns.
+
+    :param func: Node function or compiled lambda expression
+    :return: Set of field names, or None when a return value is not a dict literal (or None)
+    """
+    if getattr(func, 'pass_through', False):
+        return set()
+    tree = function_tree(func)
+    if tree is None:
+        return None
+    if isinstance(tree, ast.Lambda):
+        returns = [tree.body]
+    else:
+        returns = [node.value for node in walk_function_body(tree) if isinstance(node, ast.Return)]
+    writes = set()
+    for value in returns:
+        if value is None or (isinstance(value, ast.Constant) and value.value is None):
+            continue
+        if not isinstance(value, ast.Dict):
+            return None
+        for key in value.keys:
+            if not (isinstance(key, ast.Constant) and isinstance(key.value, str)):
+                return None
+            writes.add(key.value)
+    return writes
+
+
+def node_access(node: dict) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+    """
+    Return (reads, writes) of a resolved node, including its router; None where unknown.
+    """
+    if node.get("pass_through"):
+        reads, writes = set(), set()
+    else:
+        reads = set(node["reads"]) if "reads" in node else infer_reads(node["function"])
+        writes = set(node["writes"]) if "writes" in node else infer_writes(node["function"])
+    if "router_function" in node:
+        router_reads = (set(node["router_reads"]) if "router_reads" in node
+                        else infer_reads(node["router_function"]))
+        reads = None if reads is None or router_reads is None else reads | router_reads
+    return reads, writes
+
+
+def _successors(config: dict) -> Dict[str, List[str]]:
+    finish_points = config.get("finish_points") or ([config["finish_point"]] if "finish_point" in config else [])
+    successors = {}
+    for name, node in config["nodes"].items():
+        targets = list(node.get("edges_to", [])) + list(node.get("conditional_edges", {}).values())
+        if name in finish_points:
+            targets.append(END_NODE)
+        successors[name] = targets
+    return successors
+
+
+def _reaches_end(successors: Dict[str, List[str]], start: str, removed: str = None) -> bool:
+    seen, pending = {start}, deque([start])
+    while pending:
+        for target in successors.get(pending.popleft(), []):
+            if target == END_NODE:
+                return True
+            if target != removed and target not in seen:
+                seen.add(target)
+                pending.append(target)
+    return False
+
+
+def split_stages(config: dict) -> List[Tuple[Dict[str, Optional[int]], Optional[int]]]:
+    """
+    Cut an acyclic config at the nodes every path passes through.
+
+    :return: One ({node: depth in the stage}, length) pair per stage, in execution order, head
+             first. A depth is None when the node can be reached at different depths, and the
+             length (super-steps until the next stage starts) is None when it varies by path.
+    """
+    successors = _successors(config)
+    entry = config["entry_point"]
+    cuts = [name for name in config["nodes"]
+            if name == entry or not _reaches_end(successors, entry, removed=name)]
+
+    # Order the cut nodes along the graph: each one's distance from the entry point
+    distance, pending = {entry: 0}, deque([entry])
+    while pending:
+        name = pending.popleft()
+        for target in successors[name]:
+            if target != END_NODE and target not in distance:
+                distance[target] = distance[name] + 1
+                pending.append(target)
+    cuts.sort(key=lambda name: distance[name])
+
+    stages = []
+    for index, head in enumerate(cuts):
+        stop = cuts[index + 1] if index + 1 < len(cuts) else END_NODE
+        depths, exits = {head: {0}}, set()
+        pending = deque([head])
+        while pending:
+            name = pending.popleft()
+            for target in successors[name]:
+                if target in (stop, END_NODE):
+                    exits.update(d + 1 for d in depths[name])
+                    continue
+                seen = target in depths
+                depths.setdefault(target, set()).update(d + 1 for d in depths[name])
+                if not seen:
+                    pending.append(target)
+        stages.append(({name: (min(d) if len(d) == 1 else None) for name, d in depths.items()},
+                       min(exits) if len(exits) == 1 else None))
+    return stages
+
+
+def analyze_config(config: dict, state_schema=None) -> dict:
+    """
+    Find the stages of a resolved config, the dependencies between them and the independent
+    branches they form: stages that depend on each other (directly or through reducer
+    ordering) share a branch and stay in sequence.
+
+    :param config: Resolved graph config (load_arithmetic_config_from_json output)
+    :param state_schema: State schema, used to recognise reducer channels
+    :return: {"stages", "branches" (lists of stage indices), "reads", "writes", "conflicts"}
+    """
+    report = {"stages": [], "branches": [], "reads": {}, "writes": {}, "conflicts": []}
+    if "entry_point" not in config or "finish_points" not in config and "finish_point" not in config:
+        report["conflicts"].append("Only configs with an entry_point and finish points can be analyzed "
+                                   "(optimized configs cannot).")
+        return report
+    if max_super_steps(config) is None:
+        report["conflicts"].append("The graph contains a loop.")
+        return report
+
+    reducers = channel_reducers(state_schema)
+    split = split_stages(config)
+    stages = [depths for depths, _ in split]
+    lengths = [length for _, length in split]
+    report["stages"] = [list(stage) for stage in stages]
+    report["branches"] = [list(range(len(stages)))]
+
+    access = {}
+    for stage in stages:
+        for name in stage:
+            reads, writes = node_access(config["nodes"][name])
+            if reads is None or writes is None:
+                report["conflicts"].append(
+                    f"Cannot infer the {'reads' if reads is None else 'writes'} of node '{name}'; "
+                    f"declare \"reads\"/\"writes\" in its function mapping.")
+            access[name] = (reads or set(), writes or set())
+    report["reads"] = {name: sorted(rw[0]) for name, rw in access.items()}
+    report["writes"] = {name: sorted(rw[1]) for name, rw in access.items()}
+    if report["conflicts"]:
+        return report
+
+    stage_reads = [set().union(*(access[n][0] for n in stage)) for stage in stages]
+    stage_writes = [set().union(*(access[n][1] for n in stage)) for stage in stages]
+    branch_of = list(range(len(stages)))
+
+    def merge(i, j):
+        old, new = branch_of[j], branch_of[i]
+        for k, b in enumerate(branch_of):
+            if b == old:
+                branch_of[k] = new
+
+    # Field dependencies: one stage reads or writes a (non-reducer) field another stage writes
+    for i in range(len(stages)):
+        for j in range(i + 1, len(stages)):
+            reasons = []
+            for later, earlier in ((j, i), (i, j)):
+                for field in sorted(stage_reads[later] & stage_writes[earlier]):
+                    readers = [n for n in stages[later] if field in access[n][0]]
+                    writers = [n for n in stages[earlier] if field in access[n][1]]
+                    reasons.append(f"Stage {later + 1} ({', '.join(readers)}) reads '{field}', "
+                                   f"written by stage {earlier + 1} ({', '.join(writers)}).")
+            for field in sorted((stage_writes[i] & stage_writes[j]) - set(reducers)):
+                reasons.append(f"Stages {i + 1} and {j + 1} both write '{field}'.")
+            if reasons:
+                report["conflicts"].extend(reasons)
+                merge(i, j)
+
+    # Reducer order: merging branches shifts the depths of later stages, so repeat until stable
+    changed = True
+    while changed:
+        changed = False
+        offsets = _stage_offsets(branch_of, lengths)
+        for i in range(len(stages)):
+            for j in range(i + 1, len(stages)):
+                if branch_of[i] == branch_of[j]:
+                    continue
+                reasons = []
+                for field in sorted(stage_writes[i] & stage_writes[j] & set(reducers)):
+                    reasons.extend(_reducer_order_conflicts(field, stages[i], offsets[i],
+                                                            stages[j], offsets[j], access))
+                if reasons:
+                    report["conflicts"].extend(reasons)
+                    merge(i, j)
+                    changed = True
+                    break
+            if changed:
+                break
+
+    branches = {}
+    for stage, branch in enumerate(branch_of):
+        branches.setdefault(branch, []).append(stage)
+    report["branches"] = sorted(branches.values())
+    return report
+
+
+def _stage_offsets(branch_of: List[int], lengths: List[Optional[int]]) -> List[Optional[int]]:
+    # Super-step at which each stage starts when its branch starts at step 0
+    offsets, elapsed = [], {}
+    for stage, branch in enumerate(branch_of):
+        offsets.append(elapsed.get(branch, 0))
+        previous = elapsed.get(branch, 0)
+        elapsed[branch] = None if previous is None or lengths[stage] is None else previous + lengths[stage]
+    return offsets
+
+
+def _reducer_order_conflicts(field: str, earlier: Dict[str, Optional[int]], earlier_offset: Optional[int],
+                             later: Dict[str, Optional[int]], later_offset: Optional[int],
+                             access: Dict[str, tuple]) -> List[str]:
+    # In parallel, a node writes in super-step (stage offset + depth), and writes within a
+    # super-step are applied in node name order. The sequential order survives only if every
+    # earlier-stage writer comes before every later-stage writer.
+    conflicts = []
+    for a in (n for n in earlier if field in access[n][1]):
+        for b in (n for n in later if field in access[n][1]):
+            step_a = None if earlier_offset is None or earlier[a] is None else earlier_offset + earlier[a]
+            step_b = None if later_offset is None or later[b] is None else later_offset + later[b]
+            if step_a is None or step_b is None:
+                conflicts.append(f"'{a if step_a is None else b}' runs at a varying super-step, "
+                                 f"so the order of '{field}' cannot be kept.")
+            elif (step_a, a) > (step_b, b):
+                conflicts.append(f"Running '{a}' and '{b}' in parallel would reorder '{field}'.")
+    return conflicts
+
+
+def _join(state: dict) -> dict:
+    """
+    Deferred join node of parallelized configs; runs once after every branch has finished.
+    """
+    return {}
+
+
+def parallelize_config(config: dict, state_schema=None) -> Tuple[dict, dict]:
+    """
+    Rewrite a resolved config so independent branches of stages run in parallel.
+
+    :param config: Resolved graph config (load_arithmetic_config_from_json output)
+    :param state_schema: State schema, used to recognise reducer channels
+    :return: (parallel config, or the unchanged config when everything depends on everything;
+             report with the analysis, "parallel" and before/after super-step counts)
+    """
+    report = analyze_config(config, state_schema)
+    report["max_steps_before"] = max_super_steps(config) if "entry_point" in config else None
+    report["parallel"] = len(report["branches"]) > 1
+    if not report["parallel"]:
+        report["max_steps_after"] = report["max_steps_before"]
+        return config, report
+
+    stages = report["stages"]
+    heads = [stage[0] for stage in stages]
+    finish_points = config.get("finish_points") or [config["finish_point"]]
+    parallel = {key: value for key, value in config.items()
+                if key not in ("entry_point", "finish_point", "finish_points")}
+    parallel["nodes"] = {name: dict(node) for name, node in config["nodes"].items()}
+    join = JOIN_NODE
+    while join in parallel["nodes"]:
+        join += '_'
+
+    # Each stage continues with the next stage of its own branch, or the join
+    for branch in report["branches"]:
+        for position, index in enumerate(branch):
+            old = heads[index + 1] if index + 1 < len(stages) else END_NODE
+            new = heads[branch[position + 1]] if position + 1 < len(branch) else join
+            for name in stages[index]:
+                node = parallel["nodes"][name]
+                if "edges_to" in node:
+                    node["edges_to"] = [new if t == old else t for t in node["edges_to"]]
+                if "conditional_edges" in node:
+                    node["conditional_edges"] = {k: new if t == old else t
+                                                 for k, t in node["conditional_edges"].items()}
+                if name in finish_points:
+                    node["edges_to"] = node.get("edges_to", []) + [new]
+    parallel["nodes"][join] = {"function": _join, "edges_to": [], "pass_through": True, "defer": True}
+    parallel["entry_points"] = [heads[branch[0]] for branch in report["branches"]]
+    parallel["finish_points"] = [join]
+    report["max_steps_after"] = max_super_steps(parallel)
+    return parallel, report
+
+
+def format_parallel_report(report: dict) -> str:
+    """
+    Human readable summary of a parallelize_config report.
+    """
+    def describe(branch):
+        return " -> ".join(", ".join(report["stages"][i]) for i in branch)
+
+    if report["parallel"]:
+        lines = [f"{len(report['branches'])} parallel branches, max super-steps "
+                 f"{report['max_steps_before']} -> {report['max_steps_after']}:"]
+        lines += [f"  [{describe(branch)}]" for branch in report["branches"]]
+        if report["conflicts"]:
+            lines.append("  kept in sequence because:")
+            lines += [f"    - {conflict}" for conflict in report["conflicts"]]
+        return "\n".join(lines)
+    stages = "; ".join(f"stage {i + 1}: {', '.join(stage)}" for i, stage in enumerate(report["stages"]))
+    lines = [f"kept sequential ({stages or 'no stages'}):"]
+    lines += [f"  - {conflict}" for conflict in report["conflicts"]]
+    if len(report["stages"]) < 2 and not report["conflicts"]:
+        lines.append("  - fewer than two stages")
+    return "\n".join(lines)
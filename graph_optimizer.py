@@ -0,0 +1,221 @@
+"""
+Optimization passes over resolved graph configs (the output of load_arithmetic_config_from_json).
+
+Two rewrites are applied before build_graph_from_config:
+
+* Router fusion: a pass-through node whose only job is to host a conditional edge is removed,
+  and its router is attached directly to each predecessor (or to START when it is the entry
+  point). This saves one super-step and one state merge per fused router.
+* Chain merging: a node with a single unconditional edge into a node that has no other
+  predecessors is merged with it when both are pure (lambda expressions, or function mappings
+  marked "pure": true). The merged node calls both functions in order within one step.
+
+Both rewrites keep the values the graph produces identical.
+"""
+from typing import Callable, Dict, Optional, Tuple, get_type_hints
+import copy
+
+END_NODE = '__end__'
+
+
+def channel_reducers(state_schema) -> Dict[str, Callable]:
+    """
+    Return {field: reducer} for state fields declared as Annotated[type, reducer].
+    """
+    if state_schema is None:
+        return {}
+    reducers = {}
+    for name, hint in get_type_hints(state_schema, include_extras=True).items():
+        for meta in getattr(hint, '__metadata__', ()):
+            if callable(meta):
+                reducers[name] = meta
+    return reducers
+
+
+def _predecessors(config: dict) -> Dict[str, Dict[str, list]]:
+    """
+    Map each node to the nodes that reach it via plain and conditional edges.
+    """
+    preds = {name: {"edges": [], "conditional": []} for name in config["nodes"]}
+    for name, node in config["nodes"].items():
+        for target in node.get("edges_to", []):
+            if target in preds:
+                preds[target]["edges"].append(name)
+        for target in node.get("conditional_edges", {}).values():
+            if target in preds:
+                preds[target]["conditional"].append(name)
+    return preds
+
+
+def _finish_points(config: dict) -> list:
+    return config.get("finish_points") or ([config["finish_point"]] if "finish_point" in config else [])
+
+
+def fuse_pass_through_routers(config: dict) -> list:
+    """
+    Remove pass-through nodes that only host a conditional edge, moving the router onto their
+    predecessors. Modifies config in place and returns the names of the fused nodes.
+    """
+    fused = []
+    for name in list(config["nodes"]):
+        node = config["nodes"][name]
+        mapping = node.get("conditional_edges")
+        if not (node.get("pass_through") and mapping and "router_function" in node) or node.get("edges_to"):
+            continue
+        if name in _finish_points(config) or name in mapping.values():
+            continue
+        preds = _predecessors(config)[name]
+        if preds["conditional"]:
+            continue
+        if any("conditional_edges" in config["nodes"][p] for p in preds["edges"]):
+            continue
+
+        router = node["router_function"]
+        for pred in preds["edges"]:
+            pred_node = config["nodes"][pred]
+            pred_node["edges_to"] = [t for t in pred_node["edges_to"] if t != name]
+            pred_node["conditional_edges"] = dict(mapping)
+            pred_node["router_function"] = router
+        if config.get("entry_point") == name:
+            del config["entry_point"]
+            config["entry_conditional_edges"] = dict(mapping)
+            config["entry_router"] = router
+        del config["nodes"][name]
+        fused.append(name)
+    return fused
+
+
+def compose_nodes(first: Callable, second: Callable, reducers: Dict[str, Callable] = None) -> Callable:
+    """
+    Return a node function that runs first then second within one step, producing the same
+    combined update LangGraph would have applied over two steps.
+    """
+    reducers = reducers or {}
+
+    def apply(state: dict, update: dict) -> dict:
+        merged = dict(state)
+        for key, value in update.items():
+            merged[key] = reducers[key](merged[key], value) if key in reducers and key in merged else value
+        return merged
+
+    def composed(state):
+        update1 = first(state) or {}
+        update2 = second(apply(state, update1)) or {}
+        return apply(update1, update2)
+
+    composed.__name__ = f"{getattr(first, '__name__', 'node')}__{getattr(second, '__name__', 'node')}"
+    return composed
+
+
+def merge_pure_chains(config: dict, reducers: Dict[str, Callable] = None) -> list:
+    """
+    Merge A -> B into a single node when A's only edge is to B, B's only predecessor is A and
+    both nodes are pure. Modifies config in place and returns the merged (A, B) pairs.
+    """
+    merged = []
+    changed = True
+    while changed:
+        changed = False
+        preds = _predecessors(config)
+        for name, node in config["nodes"].items():
+            edges = node.get("edges_to", [])
+            if len(edges) != 1 or "conditional_edges" in node or name in _finish_points(config):
+                continue
+            target = edges[0]
+            target_node = config["nodes"].get(target)
+            if target_node is None or target == name:
+                continue
+            if preds[target]["edges"] != [name] or preds[target]["conditional"] or config.get("entry_point") == target:
+                continue
+            if not (_is_pure(node) and _is_pure(target_node)):
+                continue
+
+            node["function"] = compose_nodes(node["function"], target_node["function"], reducers)
+            node["edges_to"] = list(target_node.get("edges_to", []))
+            for key in ("conditional_edges", "router_function"):
+                if key in target_node:
+                    node[key] = target_node[key]
+            node["pure"] = True
+            node.pop("pass_through", None)
+            if "finish_points" in config:
+                config["finish_points"] = [name if f == target else f for f in config["finish_points"]]
+            elif config.get("finish_point") == target:
+                config["finish_point"] = name
+            del config["nodes"][target]
+            merged.append((name, target))
+            changed = True
+            break
+    return merged
+
+
+def _is_pure(node: dict) -> bool:
+    return bool(node.get("pure") or node.get("pass_through") or hasattr(node["function"], "expression"))
+
+
+def max_super_steps(config: dict) -> Optional[int]:
+    """
+    Return the largest number of node executions (super-steps) on any path from the entry
+    point to the end, or None if the graph contains a loop.
+    """
+    successors = {}
+    for name, node in config["nodes"].items():
+        successors[name] = list(node.get("edges_to", [])) + list(node.get("conditional_edges", {}).values())
+    if "entry_conditional_edges" in config:
+        roots = list(config["entry_conditional_edges"].values())
+    elif "entry_points" in config:
+        roots = list(config["entry_points"])
+    else:
+        roots = [config["entry_point"]]
+
+    memo, active = {}, set()
+    def longest(name):
+        if name not in config["nodes"]:
+            return 0
+        if name in active:
+            raise RecursionError
+        if name not in memo:
+            active.add(name)
+            memo[name] = 1 + max((longest(t) for t in successors[name]), default=0)
+            active.discard(name)
+        return memo[name]
+
+    try:
+        return max(longest(root) for root in roots)
+    except RecursionError:
+        return None
+
+
+def optimize_graph_config(config: dict, state_schema=None) -> Tuple[dict, dict]:
+    """
+    Run all optimization passes on a copy of a resolved graph config.
+
+    :param config: Configuration dictionary from load_arithmetic_config_from_json
+    :param state_schema: State schema, used to merge reducer-annotated fields correctly
+    :return: (optimized config, report with before/after node and super-step counts)
+    """
+    optimized = copy.copy(config)
+    optimized["nodes"] = {name: dict(node) for name, node in config["nodes"].items()}
+    if "finish_points" in config:
+        optimized["finish_points"] = list(config["finish_points"])
+
+    report = {"nodes_before": len(config["nodes"]), "max_steps_before": max_super_steps(config)}
+    report["fused_routers"] = fuse_pass_through_routers(optimized)
+    report["merged_chains"] = merge_pure_chains(optimized, channel_reducers(state_schema))
+    report["nodes_after"] = len(optimized["nodes"])
+    report["max_steps_after"] = max_super_steps(optimized)
+    return optimized, report
+
+
+def format_report(report: dict) -> str:
+    """
+    One-line human readable summary of an optimization report.
+    """
+    steps = lambda n: 'unbounded' if n is None else n
+    details = []
+    if report["fused_routers"]:
+        details.append(f"fused routers {', '.join(report['fused_routers'])}")
+    if report["merged_chains"]:
+        details.append(f"merged {', '.join(f'{a}+{b}' for a, b in report['merged_chains'])}")
+    return (f"nodes {report['nodes_before']} -> {report['nodes_after']}, "
+            f"max super-steps {steps(report['max_steps_before'])} -> {steps(report['max_steps_after'])}"
+            + (f" ({'; '.join(details)})" if details else ''))
@@ -0,0 +1,281 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional, get_type_hints
+import hashlib
+import json
+import os
+import threading
+
+
+class GraphRegistry:
+    """
+    Cache of compiled graphs keyed by the content of their configuration.
+
+    The key is a hash of the graph nodes JSON, the function mapping JSON and the state
+    schema, so two workers (or tenants) pointing at identical configs share one compiled
+    app. Entries are evicted least-recently-used first. Source files are re-hashed only
+    when their mtime or size changes, so a warm lookup costs a couple of os.stat calls.
+    Builds run outside the registry lock: a lookup never waits for another config's build,
+    and concurrent requests for a config being built wait for that one build.
+
+    Compiled apps hold live function references and cannot be written to disk. When
+    artifact_dir is set the registry instead stores a build manifest per config (the parsed
+    JSON plus the file stamps it was read from); on a cold start with unchanged files the
+    manifest is used directly and the source files are neither re-read nor re-hashed.
+    """
+
+    def __init__(self,
+                 resolve_config: Callable[[dict, dict], dict],
+                 build_graph: Callable,
+                 max_size: int = 32,
+                 artifact_dir: Optional[str] = None,
+                 optimize_config: Optional[Callable] = None,
+                 checkpointer=None,
+                 validate_config: Optional[Callable] = None,
+                 parallelize_config: Optional[Callable] = None):
+        """
+        :param resolve_config: Turns (graph nodes JSON, function mapping JSON) into a build config
+        :param build_graph: Turns (build config, state schema) into an uncompiled StateGraph
+        :param max_size: Maximum number of compiled apps kept in memory
+        :param artifact_dir: Optional directory for on-disk build manifests
+        :param optimize_config: Turns (build config, state schema) into (optimized config, report);
+                                used for get(..., optimize=True)
+        :param checkpointer: Checkpoint saver every compiled app persists its threads to
+        :param validate_config: Checks (graph nodes JSON, function mapping JSON) before a build,
+                                raising on an invalid config; it returns an input validator the
+                                compiled app is wrapped with (graph_validator.ValidatedGraph)
+        :param parallelize_config: Turns (build config, state schema) into (parallel config, report);
+                                   used for get(..., parallel=True)
+        """
+        self.resolve_config = resolve_config
+        self.build_graph = build_graph
+        self.max_size = max_size
+        self.artifact_dir = artifact_dir
+        self.optimize_config = optimize_config
+        self.checkpointer = checkpointer
+        self.validate_config = validate_config
+        self.parallelize_config = parallelize_config
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._apps = OrderedDict()
+        self._building = {}
+        self._sources = {}
+        self._lock = threading.RLock()
+        if artifact_dir:
+            os.makedirs(artifact_dir, exist_ok=True)
+
+    def get(self, graph_nodes_file: str, state_schema, function_mapping_file: str = None,
+            optimize: bool = False, parallel: bool = False):
+        """
+        Return the compiled app for the given config files and state schema, building it on a miss.
+
+        :param graph_nodes_file: Path to the graph nodes JSON file
+        :param state_schema: The state schema to use (e.g., AgentState)
+        :param function_mapping_file: Optional path to a separate function mapping JSON file
+        :param optimize: Apply optimize_config before building
+        :param parallel: Apply parallelize_config before building; cannot be combined with optimize
+        :return: Compiled StateGraph ready for execution
+        """
+        return self.get_with_report(graph_nodes_file, state_schema, function_mapping_file,
+                                    optimize=optimize, parallel=parallel)[0]
+
+    def get_with_report(self, graph_nodes_file: str, state_schema, function_mapping_file: str = None,
+                        optimize: bool = False, parallel: bool = False) -> tuple:
+        """
+        Like get(), but return (app, report): the optimize_config/parallelize_config report of
+        this app's build (None without optimize/parallel), kept with the cached app.
+        """
+        if optimize and self.optimize_config is None:
+            raise ValueError("This registry has no optimize_config.")
+        if parallel and self.parallelize_config is None:
+            raise ValueError("This registry has no parallelize_config.")
+        if optimize and parallel:
+            raise ValueError("optimize and parallel cannot be combined.")
+        with self._lock:
+            content_key, json_config, mapping_config = self._source_key(graph_nodes_file, function_mapping_file)
+        if json_config is None:
+            key = (content_key, schema_fingerprint(state_schema), optimize, parallel)
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            # Not built for this schema/flags (or evicted): read the files once and build
+            # from exactly the bytes that were hashed, even if they changed since the stamp check
+            content_key, json_config, mapping_config = self._read_source_key(graph_nodes_file, function_mapping_file)
+        key = (content_key, schema_fingerprint(state_schema), optimize, parallel)
+
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            building = self._building.get(key)
+            if building is None:
+                # This thread builds; concurrent requests for the same key wait for its result
+                self._building[key] = building = Future()
+                self.misses += 1
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        if not owner:
+            return building.result()
+
+        # The build runs outside the lock so lookups of other configs are not held up by it
+        try:
+            entry = self._build(json_config, mapping_config, state_schema, optimize, parallel)
+        except BaseException as exc:
+            with self._lock:
+                del self._building[key]
+            building.set_exception(exc)
+            raise
+        with self._lock:
+            del self._building[key]
+            self._apps[key] = entry
+            if len(self._apps) > self.max_size:
+                self._apps.popitem(last=False)
+                self.evictions += 1
+        building.set_result(entry)
+        return entry
+
+    def _lookup(self, key: tuple) -> Optional[tuple]:
+        # Cached (app, report) for the key, or None
+        with self._lock:
+            entry = self._apps.get(key)
+            if entry is not None:
+                self._apps.move_to_end(key)
+                self.hits += 1
+            return entry
+
+    def _build(self, json_config: dict, mapping_config: dict, state_schema, optimize: bool, parallel: bool) -> tuple:
+        """
+        Validate, resolve, transform and compile one config; return (app, optimizer/parallelizer report).
+        """
+        report = None
+        validate_input = self.validate_config(json_config, mapping_config) if self.validate_config else None
+        config = self.resolve_config(json_config, mapping_config)
+        if optimize:
+            config, report = self.optimize_config(config, state_schema)
+        if parallel:
+            config, report = self.parallelize_config(config, state_schema)
+        app = self.build_graph(config, state_schema).compile(checkpointer=self.checkpointer)
+        if validate_input is not None:
+            from graph_validator import ValidatedGraph
+            app = ValidatedGraph(app, validate_input)
+        return app, report
+
+    def invalidate(self, graph_nodes_file: str = None) -> None:
+        """
+        Drop cached apps. With a path, only forget the file stamps for that config so the
+        next lookup re-hashes it; without one, clear everything.
+        """
+        with self._lock:
+            if graph_nodes_file is None:
+                self._apps.clear()
+                self._sources.clear()
+                return
+            path = os.path.abspath(graph_nodes_file)
+            for source in [s for s in self._sources if s[0] == path]:
+                del self._sources[source]
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss/eviction counters and the current cache size.
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self._apps)}
+
+    def _source_key(self, graph_nodes_file: str, function_mapping_file: str = None) -> tuple:
+        """
+        Return (content hash, json_config, mapping_config) for the config files. The parsed
+        JSON is only returned when the files actually had to be read.
+        """
+        paths = tuple(os.path.abspath(p) for p in (graph_nodes_file, function_mapping_file) if p)
+        stamps = tuple(_file_stamp(p) for p in paths)
+
+        cached = self._sources.get(paths)
+        if cached is not None and cached[0] == stamps:
+            return cached[1], None, None
+
+        manifest = self._load_manifest(paths, stamps)
+        if manifest is not None:
+            self._sources[paths] = (stamps, manifest["key"])
+            return manifest["key"], manifest["graph_nodes"], manifest["function_mapping"]
+
+        content_key, json_config, mapping_config = self._read_source_key(*paths)
+        self._sources[paths] = (stamps, content_key)
+        self._save_manifest(paths, stamps, content_key, json_config, mapping_config)
+        return content_key, json_config, mapping_config
+
+    def _read_source_key(self, graph_nodes_file: str, function_mapping_file: str = None) -> tuple:
+        """
+        Read the config files once and return (content hash, json_config, mapping_config),
+        all derived from the same bytes.
+        """
+        raw = [_read_bytes(p) for p in (graph_nodes_file, function_mapping_file) if p]
+        json_config, mapping_config = _parse_sources(raw)
+        return hashlib.sha256(b"\0".join(raw)).hexdigest(), json_config, mapping_config
+
+    def _manifest_path(self, paths: tuple) -> str:
+        name = hashlib.sha256("\0".join(paths).encode()).hexdigest()[:16]
+        return os.path.join(self.artifact_dir, f"{name}.json")
+
+    def _load_manifest(self, paths: tuple, stamps: tuple) -> Optional[dict]:
+        if not self.artifact_dir:
+            return None
+        try:
+            with open(self._manifest_path(paths), 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if [list(s) for s in stamps] != manifest.get("stamps"):
+            return None
+        return manifest
+
+    def _save_manifest(self, paths: tuple, stamps: tuple, content_key: str,
+                       json_config: dict, mapping_config: dict) -> None:
+        if not self.artifact_dir:
+            return
+        manifest = {"paths": list(paths), "stamps": [list(s) for s in stamps], "key": content_key,
+                    "graph_nodes": json_config, "function_mapping": mapping_config}
+        target = self._manifest_path(paths)
+        tmp = f"{target}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, target)
+
+
+def schema_fingerprint(state_schema) -> str:
+    """
+    Identify a state schema by its qualified name and field annotations.
+    """
+    try:
+        hints = get_type_hints(state_schema, include_extras=True)
+    except Exception:
+        hints = getattr(state_schema, "__annotations__", {})
+    fields = ",".join(f"{name}:{hint!r}" for name, hint in sorted(hints.items()))
+    return f"{state_schema.__module__}.{state_schema.__qualname__}({fields})"
+
+
+def _file_stamp(path: str) -> tuple:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _parse_sources(raw: list) -> tuple:
+    """
+    Parse (graph nodes, optional function mapping) file contents the same way
+    load_arithmetic_config_from_json does.
+    """
+    json_config = json.loads(raw[0])
+    if len(raw) > 1:
+        mapping_config = json.loads(raw[1])["function_mapping"]
+    elif "function_mapping" in json_config:
+        mapping_config = json_config["function_mapping"]
+    else:
+        raise ValueError("No function mapping found. Either provide a separate function_mapping_file or include function_mapping in the main config.")
+    return json_config, mapping_config
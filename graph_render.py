@@ -0,0 +1,279 @@
+"""
+Offline graph visualization.
+
+Renders LangGraph graphs (or graph_nodes.json configs) to Mermaid text, Graphviz DOT or a
+self-contained SVG without any network access. Output is cached by a hash of the graph
+topology, so rendering an unchanged graph only copies the cached file.
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from html import escape
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+START_NODE = '__start__'
+END_NODE = '__end__'
+DEFAULT_CACHE_DIR = '.graph_cache'
+FORMATS = ('svg', 'mmd', 'dot')
+
+
+class Edge(NamedTuple):
+    source: str
+    target: str
+    label: Optional[str] = None
+    conditional: bool = False
+
+
+class Topology(NamedTuple):
+    nodes: Tuple[str, ...]
+    edges: Tuple[Edge, ...]
+
+
+def topology_from_app(app) -> Topology:
+    """
+    Extract the topology of a compiled graph via app.get_graph() (no rendering involved).
+    """
+    graph = app.get_graph()
+    edges = tuple(Edge(e.source, e.target, e.data if e.data != e.target else None, bool(e.conditional))
+                  for e in graph.edges)
+    return Topology(tuple(graph.nodes), edges)
+
+
+def topology_from_config(json_config: dict) -> Topology:
+    """
+    Build the topology straight from a parsed graph_nodes.json, without resolving any functions.
+    """
+    nodes = [START_NODE] + list(json_config["nodes"]) + [END_NODE]
+    edges = [Edge(START_NODE, json_config["entry_point"])]
+    for node_name, node_info in json_config["nodes"].items():
+        for target in node_info.get("edges_to", []):
+            edges.append(Edge(node_name, target))
+        for key, target in node_info.get("conditional_edges", {}).items():
+            edges.append(Edge(node_name, target, key if key != target else None, True))
+    finish_points = json_config.get("finish_points") or [json_config["finish_point"]]
+    for finish_node in finish_points:
+        edges.append(Edge(finish_node, END_NODE))
+    return Topology(tuple(nodes), tuple(edges))
+
+
+def topology_hash(topology: Topology) -> str:
+    """
+    Stable hash of the nodes and edges; independent of edge declaration order.
+    """
+    payload = json.dumps([sorted(topology.nodes), sorted(map(list, topology.edges), key=repr)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def to_mermaid(topology: Topology) -> str:
+    """
+    Render the topology as Mermaid flowchart text.
+    """
+    lines = ["graph TD;"]
+    for node in topology.nodes:
+        if node in (START_NODE, END_NODE):
+            style = 'first' if node == START_NODE else 'last'
+            lines.append(f"\t{node}([<p>{node}</p>]):::{style}")
+        else:
+            lines.append(f"\t{node}({node})")
+    for edge in topology.edges:
+        arrow = '-.->' if edge.conditional else '-->'
+        if edge.label:
+            arrow = f"-. &nbsp;{edge.label}&nbsp; .->" if edge.conditional else f"-- &nbsp;{edge.label}&nbsp; -->"
+        lines.append(f"\t{edge.source} {arrow} {edge.target};")
+    lines.append("\tclassDef default fill:#f2f0ff,line-height:1.2")
+    lines.append("\tclassDef first fill-opacity:0")
+    lines.append("\tclassDef last fill:#bfb6fc")
+    return "\n".join(lines) + "\n"
+
+
+def to_dot(topology: Topology) -> str:
+    """
+    Render the topology as Graphviz DOT text.
+    """
+    lines = ["digraph G {", "\trankdir=TB;", '\tnode [shape=box, style="rounded,filled", fillcolor="#f2f0ff"];']
+    for node in topology.nodes:
+        if node in (START_NODE, END_NODE):
+            fill = 'white' if node == START_NODE else '#bfb6fc'
+            lines.append(f'\t"{node}" [shape=oval, fillcolor="{fill}"];')
+        else:
+            lines.append(f'\t"{node}";')
+    for edge in topology.edges:
+        attrs = []
+        if edge.conditional:
+            attrs.append('style=dashed')
+        if edge.label:
+            attrs.append(f'label="{edge.label}"')
+        suffix = f" [{', '.join(attrs)}]" if attrs else ''
+        lines.append(f'\t"{edge.source}" -> "{edge.target}"{suffix};')
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def _layers(topology: Topology) -> List[List[str]]:
+    """
+    Assign each node to a layer by its longest path from START, ignoring back edges.
+    """
+    successors: Dict[str, List[str]] = {node: [] for node in topology.nodes}
+    for edge in topology.edges:
+        successors.setdefault(edge.source, []).append(edge.target)
+
+    # Depth-first order to find back edges (loops), then longest-path layering on the DAG.
+    order, back_edges, state = [], set(), {}
+    def visit(node):
+        state[node] = 'active'
+        for target in successors.get(node, []):
+            if state.get(target) == 'active':
+                back_edges.add((node, target))
+            elif target not in state:
+                visit(target)
+        state[node] = 'done'
+        order.append(node)
+    for node in topology.nodes:
+        if node not in state:
+            visit(node)
+
+    depth = {node: 0 for node in topology.nodes}
+    for node in reversed(order):
+        for target in successors.get(node, []):
+            if (node, target) not in back_edges:
+                depth[target] = max(depth[target], depth[node] + 1)
+    if END_NODE in depth:
+        depth[END_NODE] = max(depth.values())
+
+    layers: List[List[str]] = [[] for _ in range(max(depth.values(), default=0) + 1)]
+    for node in topology.nodes:
+        layers[depth[node]].append(node)
+    return layers
+
+
+def to_svg(topology: Topology) -> str:
+    """
+    Render the topology as a standalone SVG using a simple layered (top-down) layout.
+    """
+    char_width, box_height, h_gap, v_gap, margin = 7.5, 34, 30, 60, 20
+    layers = _layers(topology)
+    width_of = {node: len(node) * char_width + 24 for node in topology.nodes}
+    row_widths = [sum(width_of[n] for n in row) + h_gap * (len(row) - 1) for row in layers]
+    canvas_width = max(row_widths, default=0) + 2 * margin
+    canvas_height = len(layers) * (box_height + v_gap) - v_gap + 2 * margin
+
+    position = {}
+    for row_index, row in enumerate(layers):
+        x = margin + (canvas_width - 2 * margin - row_widths[row_index]) / 2
+        y = margin + row_index * (box_height + v_gap)
+        for node in row:
+            position[node] = (x, y)
+            x += width_of[node] + h_gap
+
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{canvas_width:.0f}" height="{canvas_height:.0f}" '
+           f'font-family="sans-serif" font-size="12">',
+           '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="7" markerHeight="7" '
+           'orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" fill="#333"/></marker></defs>']
+    for edge in topology.edges:
+        sx, sy = position[edge.source]
+        tx, ty = position[edge.target]
+        dash = ' stroke-dasharray="5,4"' if edge.conditional else ''
+        if edge.source == edge.target:
+            right = sx + width_of[edge.source]
+            path = (f'M {right:.1f} {sy + 10:.1f} C {right + 40:.1f} {sy - 10:.1f}, '
+                    f'{right + 40:.1f} {sy + box_height + 10:.1f}, {right:.1f} {sy + box_height - 10:.1f}')
+            label_x, label_y = right + 34, sy + box_height / 2
+        else:
+            x1, x2 = sx + width_of[edge.source] / 2, tx + width_of[edge.target] / 2
+            if ty > sy:
+                y1, y2 = sy + box_height, ty
+            else:
+                y1, y2 = sy, ty + box_height
+            path = f'M {x1:.1f} {y1:.1f} L {x2:.1f} {y2:.1f}'
+            label_x, label_y = (x1 + x2) / 2, (y1 + y2) / 2
+        out.append(f'<path d="{path}" fill="none" stroke="#333"{dash} marker-end="url(#arrow)"/>')
+        if edge.label:
+            out.append(f'<text x="{label_x:.1f}" y="{label_y:.1f}" text-anchor="middle" fill="#555">{escape(edge.label)}</text>')
+    for node in topology.nodes:
+        x, y = position[node]
+        fill = {START_NODE: 'white', END_NODE: '#bfb6fc'}.get(node, '#f2f0ff')
+        radius = box_height / 2 if node in (START_NODE, END_NODE) else 6
+        out.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{width_of[node]:.1f}" height="{box_height}" '
+                   f'rx="{radius:.0f}" fill="{fill}" stroke="#7d6fd9"/>')
+        out.append(f'<text x="{x + width_of[node] / 2:.1f}" y="{y + box_height / 2 + 4:.1f}" '
+                   f'text-anchor="middle">{escape(node)}</text>')
+    out.append('</svg>')
+    return "\n".join(out) + "\n"
+
+
+RENDERERS = {'svg': to_svg, 'mmd': to_mermaid, 'dot': to_dot}
+
+
+def render_topology(topology: Topology, fname: str, fmt: str = None,
+                    cache_dir: str = DEFAULT_CACHE_DIR) -> bool:
+    """
+    Write the topology to fname, reusing a cached rendering of the same topology if there is one.
+
+    :param topology: Graph topology to render
+    :param fname: Output file; the format defaults to its extension (svg, mmd or dot)
+    :param fmt: Explicit output format
+    :param cache_dir: Directory holding renderings keyed by topology hash (None disables caching)
+    :return: True if the graph was rendered, False if the cached rendering was reused
+    """
+    fmt = fmt or os.path.splitext(fname)[1].lstrip('.').lower()
+    if fmt not in RENDERERS:
+        raise ValueError(f"Unknown graph format '{fmt}'. Use one of {', '.join(FORMATS)}.")
+
+    cached = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        cached = os.path.join(cache_dir, f"{topology_hash(topology)}.{fmt}")
+        if os.path.exists(cached):
+            if os.path.abspath(cached) != os.path.abspath(fname):
+                shutil.copyfile(cached, fname)
+            return False
+
+    content = RENDERERS[fmt](topology)
+    with open(fname, 'w') as f:
+        f.write(content)
+    if cached:
+        shutil.copyfile(fname, cached)
+    return True
+
+
+def render_graph(app, fname: str = 'graph_visualization.svg', fmt: str = None,
+                 cache_dir: str = DEFAULT_CACHE_DIR) -> bool:
+    """
+    Render a compiled graph to fname offline. See render_topology.
+    """
+    return render_topology(topology_from_app(app), fname, fmt, cache_dir)
+
+
+def render_config_dir(config_dir: str = 'config', out_dir: str = '.', fmt: str = 'svg',
+                      cache_dir: str = DEFAULT_CACHE_DIR) -> List[str]:
+    """
+    Render every graph config (JSON files with a "nodes" section) in config_dir.
+
+    :return: Paths of the files written
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for path in sorted(glob.glob(os.path.join(config_dir, '*.json'))):
+        with open(path, 'r') as f:
+            json_config = json.load(f)
+        if "nodes" not in json_config:
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        fname = os.path.join(out_dir, f"{name}_visualization.{fmt}")
+        render_topology(topology_from_config(json_config), fname, fmt, cache_dir)
+        written.append(fname)
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render every graph config in a directory, offline.")
+    parser.add_argument('--config-dir', default='config')
+    parser.add_argument('--out-dir', default='.')
+    parser.add_argument('--format', default='svg', choices=FORMATS)
+    args = parser.parse_args()
+    for fname in render_config_dir(args.config_dir, args.out_dir, args.format):
+        print(f"Graph saved as '{fname}'")
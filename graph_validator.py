@@ -0,0 +1,383 @@
+"""
+Load-time validation of graph nodes configs (graph_nodes.json) and boundary validation of inputs.
+
+validate_graph_config checks a config once, before it is built:
+
+* every function_name / router_function_name is in the function mapping, and every mapping
+  entry resolves (a known module function, or a lambda the expression engine accepts);
+* the entry point, edge targets, conditional edge targets and finish points are nodes;
+* every node is reachable from the entry point and can reach a finish point;
+* every router can only return keys of its conditional_edges. The values are taken from a
+  "returns" list in the function mapping when present, otherwise inferred from the router's
+  source: string literals in return statements (also inside `a if c else b`), plus None when
+  the function can fall off its end;
+* every field a node function reads (state['x'], state.get('x'), 'x' in state) is declared
+  in required_state_fields.
+
+InputValidator then checks each input state once at the graph boundary (required fields,
+declared types and the allowed "field_values"), so node functions do not re-check fields on
+every step.
+"""
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set
+import ast
+
+from expressions import ExpressionError, compile_expression
+
+END_NODE = '__end__'
+
+# Description prefix in required_state_fields -> Python type
+FIELD_TYPES = {
+    'String': str,
+    'Integer': int,
+    'List[str]': list,
+}
+
+
+class ConfigValidationError(ValueError):
+    """
+    Raised when a graph config fails validation; problems lists every issue found.
+    """
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        super().__init__("Invalid graph config:\n" + "\n".join(f"  - {p}" for p in problems))
+
+
+class StateValidationError(ValueError):
+    """
+    Raised when an input state does not satisfy the config's required_state_fields / field_values.
+    """
+
+
+def field_spec(json_config: dict) -> Dict[str, tuple]:
+    """
+    Read the input contract of a graph nodes config.
+
+    :param json_config: Parsed graph nodes JSON
+    :return: {field: (type or None, has_default, default)} for every required state field
+    """
+    defaults = json_config.get("state_defaults", {})
+    spec = {}
+    for name, description in json_config.get("required_state_fields", {}).items():
+        prefix = description.split(':', 1)[0].strip()
+        spec[name] = (FIELD_TYPES.get(prefix), name in defaults, defaults.get(name))
+    return spec
+
+
+class InputValidator:
+    """
+    Checks input states against required_state_fields, state_defaults and field_values.
+    """
+
+    def __init__(self, json_config: dict):
+        self.spec = field_spec(json_config)
+        self.allowed = {name: set(values) for name, values in json_config.get("field_values", {}).items()}
+
+    def problems(self, state: Mapping[str, Any]) -> List[str]:
+        """
+        Return every problem with the state (empty when it is valid).
+        """
+        problems = []
+        for name, (expected, has_default, _) in self.spec.items():
+            value = state.get(name)
+            if value is None:
+                if not has_default:
+                    problems.append(f"Missing required field '{name}'.")
+                continue
+            if expected is not None and (not isinstance(value, expected) or isinstance(value, bool)):
+                problems.append(f"Field '{name}' must be {expected.__name__}, got {value!r}.")
+            elif name in self.allowed and value not in self.allowed[name]:
+                problems.append(f"Field '{name}' must be one of {sorted(self.allowed[name])}, got {value!r}.")
+        return problems
+
+    def __call__(self, state: Mapping[str, Any]) -> None:
+        problems = self.problems(state)
+        if problems:
+            raise StateValidationError(" ".join(problems))
+
+
+class ValidatedGraph:
+    """
+    Compiled graph wrapper that validates each input state once before running it. Everything
+    other than the run methods is delegated to the compiled graph.
+    """
+
+    def __init__(self, app, validate_input: Callable[[Mapping], None]):
+        self.app = app
+        self.validate_input = validate_input
+
+    def _check(self, state: Any) -> None:
+        # None and Command inputs resume a checkpointed thread; only new input states are checked
+        if isinstance(state, Mapping) or hasattr(state, '__dataclass_fields__'):
+            self.validate_input(state)
+
+    def invoke(self, input, config=None, **kwargs):
+        self._check(input)
+        return self.app.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self._check(input)
+        return await self.app.ainvoke(input, config, **kwargs)
+
+    def stream(self, input, config=None, **kwargs):
+        self._check(input)
+        return self.app.stream(input, config, **kwargs)
+
+    def astream(self, input, config=None, **kwargs):
+        self._check(input)
+        return self.app.astream(input, config, **kwargs)
+
+    def batch(self, inputs, config=None, **kwargs):
+        inputs = list(inputs)
+        for state in inputs:
+            self._check(state)
+        return self.app.batch(inputs, config, **kwargs)
+
+    async def abatch(self, inputs, config=None, **kwargs):
+        inputs = list(inputs)
+        for state in inputs:
+            self._check(state)
+        return await self.app.abatch(inputs, config, **kwargs)
+
+    def with_config(self, config=None, **kwargs) -> "ValidatedGraph":
+        return ValidatedGraph(self.app.with_config(config, **kwargs), self.validate_input)
+
+    def __getattr__(self, name: str):
+        return getattr(self.app, name)
+
+
+def _resolve_functions(mapping_config: dict, namespace: dict, problems: List[str]) -> Dict[str, Callable]:
+    functions = {}
+    for func_name, func_config in mapping_config.items():
+        kind = func_config.get("type")
+        if kind == "lambda":
+            try:
+                functions[func_name] = compile_expression(func_config["expression"])
+            except ExpressionError as e:
+                problems.append(f"Function '{func_name}': {e}")
+        elif kind == "function_reference":
+            target = namespace.get(func_config.get("module_function"))
+            if callable(target):
+                functions[func_name] = target
+            else:
+                problems.append(f"Function '{func_name}' refers to unknown module function "
+                                f"'{func_config.get('module_function')}'.")
+        else:
+            problems.append(f"Function '{func_name}' has unknown type '{kind}'.")
+    return functions
+
+
+def function_tree(func: Callable) -> Optional[ast.AST]:
+    """
+    Return the lambda or def AST of func, or None when its source is unavailable.
+    """
+    if hasattr(func, 'expression'):
+        return ast.parse(func.expression.strip(), mode='eval').body
+    import inspect
+    import textwrap
+
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+    except (OSError, TypeError):
+        return None
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            return node
+    return None
+
+
+def _literal_values(node: Optional[ast.AST]) -> Optional[Set[Any]]:
+    # Values an expression can evaluate to, or None when it is not made of literals
+    if node is None:
+        return {None}
+    if isinstance(node, ast.Constant):
+        return {node.value}
+    if isinstance(node, ast.IfExp):
+        body, orelse = _literal_values(node.body), _literal_values(node.orelse)
+        return None if body is None or orelse is None else body | orelse
+    return None
+
+
+def _always_exits(statements: List[ast.stmt]) -> bool:
+    if not statements:
+        return False
+    last = statements[-1]
+    if isinstance(last, (ast.Return, ast.Raise)):
+        return True
+    if isinstance(last, ast.If):
+        return _always_exits(last.body) and _always_exits(last.orelse)
+    return False
+
+
+def walk_function_body(tree: ast.AST) -> Iterable[ast.AST]:
+    # Walk a function body without descending into nested functions and lambdas
+    pending = list(ast.iter_child_nodes(tree))
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        yield node
+        pending.extend(ast.iter_child_nodes(node))
+
+
+def infer_router_returns(func: Callable) -> Optional[Set[Any]]:
+    """
+    Infer the values a router function can return from its source.
+
+    :param func: Router function or compiled lambda expression
+    :return: Set of possible return values (None included when it can fall off its end),
+             or None when a return value is not a literal
+    """
+    tree = function_tree(func)
+    if tree is None:
+        return None
+    if isinstance(tree, ast.Lambda):
+        return _literal_values(tree.body)
+    values = set()
+    for node in walk_function_body(tree):
+        if isinstance(node, ast.Return):
+            returned = _literal_values(node.value)
+            if returned is None:
+                return None
+            values |= returned
+    if not _always_exits(tree.body):
+        values.add(None)
+    return values
+
+
+def infer_reads(func: Callable) -> Optional[Set[str]]:
+    """
+    Infer the state fields a node function reads: state['x'], state.get('x') and 'x' in state.
+
+    :param func: Node function or compiled lambda expression
+    :return: Set of field names, or None when the source is unavailable
+    """
+    tree = function_tree(func)
+    if tree is None:
+        return None
+    args = tree.args.args
+    if not args:
+        return set()
+    state = args[0].arg
+    is_state = lambda node: isinstance(node, ast.Name) and node.id == state
+    is_field = lambda node: isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+    reads = set()
+    for node in walk_function_body(tree):
+        if isinstance(node, ast.Subscript) and is_state(node.value) and is_field(node.slice):
+            reads.add(node.slice.value)
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'get'
+              and is_state(node.func.value) and node.args and is_field(node.args[0])):
+            reads.add(node.args[0].value)
+        elif (isinstance(node, ast.Compare) and is_field(node.left) and len(node.comparators) == 1
+              and isinstance(node.ops[0], (ast.In, ast.NotIn)) and is_state(node.comparators[0])):
+            reads.add(node.left.value)
+    return reads
+
+
+def _check_topology(json_config: dict, problems: List[str]) -> None:
+    nodes = json_config.get("nodes", {})
+    finish_points = json_config.get("finish_points") or (
+        [json_config["finish_point"]] if "finish_point" in json_config else [])
+
+    entry = json_config.get("entry_point")
+    if entry not in nodes:
+        problems.append(f"Entry point '{entry}' is not a node.")
+    for finish in finish_points:
+        if finish not in nodes:
+            problems.append(f"Finish point '{finish}' is not a node.")
+    if not finish_points:
+        problems.append("No finish point declared.")
+
+    successors = {}
+    for name, node in nodes.items():
+        targets = list(node.get("edges_to", [])) + list(node.get("conditional_edges", {}).values())
+        for target in targets:
+            if target not in nodes and target != END_NODE:
+                problems.append(f"Node '{name}' has an edge to unknown node '{target}'.")
+        successors[name] = [t for t in targets if t in nodes]
+        if name in finish_points:
+            successors[name].append(END_NODE)
+    if entry not in nodes:
+        return
+
+    reached, pending = {entry}, deque([entry])
+    while pending:
+        for target in successors.get(pending.popleft(), []):
+            if target not in reached:
+                reached.add(target)
+                pending.append(target)
+    for name in nodes:
+        if name not in reached:
+            problems.append(f"Node '{name}' is not reachable from the entry point.")
+
+    # Walk the edges backwards from END to find the nodes that can finish
+    predecessors = {END_NODE: []}
+    for name, targets in successors.items():
+        for target in targets:
+            predecessors.setdefault(target, []).append(name)
+    finishing, pending = {END_NODE}, deque([END_NODE])
+    while pending:
+        for source in predecessors.get(pending.popleft(), []):
+            if source not in finishing:
+                finishing.add(source)
+                pending.append(source)
+    for name in nodes:
+        if name in reached and name not in finishing:
+            problems.append(f"Node '{name}' cannot reach a finish point.")
+
+
+def validate_graph_config(json_config: dict, mapping_config: dict, namespace: dict) -> List[str]:
+    """
+    Statically check a graph nodes config.
+
+    :param json_config: Parsed graph nodes JSON
+    :param mapping_config: Parsed "function_mapping" section
+    :param namespace: Namespace function_reference entries are resolved in (e.g. main's globals())
+    :return: List of problems (empty when the config is valid)
+    """
+    problems = []
+    functions = _resolve_functions(mapping_config, namespace, problems)
+    fields = set(json_config.get("required_state_fields", {}))
+
+    for name, node in json_config.get("nodes", {}).items():
+        for key in ("function_name", "router_function_name"):
+            func_name = node.get(key)
+            if key in node and func_name not in mapping_config:
+                problems.append(f"Node '{name}' uses unknown {key} '{func_name}'.")
+        func = functions.get(node.get("function_name"))
+        if func is not None and fields:
+            for field in sorted((infer_reads(func) or set()) - fields):
+                problems.append(f"Node '{name}' reads '{field}', which is not in required_state_fields.")
+
+        if "conditional_edges" not in node:
+            continue
+        router_name = node.get("router_function_name", node.get("function_name"))
+        router = functions.get(router_name)
+        if router is None:
+            continue
+        declared = mapping_config.get(router_name, {}).get("returns")
+        returns = set(declared) if declared is not None else infer_router_returns(router)
+        if returns is None:
+            problems.append(f"Cannot infer the return values of router '{router_name}'; "
+                            f"declare them as \"returns\" in its function mapping.")
+            continue
+        for value in sorted(returns - set(node["conditional_edges"]), key=repr):
+            problems.append(f"Router '{router_name}' of node '{name}' can return {value!r}, "
+                            f"which is not a conditional_edges key.")
+
+    _check_topology(json_config, problems)
+    return problems
+
+
+def compile_graph_config(json_config: dict, mapping_config: dict, namespace: dict) -> InputValidator:
+    """
+    Validate a graph nodes config once at load time and return its input validator.
+
+    :raises ConfigValidationError: listing every problem found
+    """
+    problems = validate_graph_config(json_config, mapping_config, namespace)
+    if problems:
+        raise ConfigValidationError(problems)
+    return InputValidator(json_config)
@@ -0,0 +1,205 @@
+"""
+Token-budgeted conversation history for chat agents.
+
+HistoryManager decides which part of a growing conversation is sent to the model:
+
+* pinned messages (system messages, and anything passed to pin()) are always sent; the pin
+  is a flag on the message itself, so it survives checkpoints, transcripts and restarts
+* the most recent turns are sent as a sliding window that fits the token budget
+* turns that slide out of the window are folded into a rolling summary by a cheap model
+  call, sent as a single system message after the leading system messages
+
+Each prepare() call records how many prompt tokens the window saved compared with sending
+the full history; see last_turn and stats().
+"""
+from typing import Callable, List, Optional
+import json
+import os
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from llm_cache import estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = 2000
+# additional_kwargs flag marking a message as pinned
+PINNED_KEY = "pinned"
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+SUMMARY_INSTRUCTIONS = ("Summarize the conversation below for your own later reference in at most {words} "
+                        "words. Keep names, numbers, facts about the user and decisions; drop small talk.")
+
+
+def message_tokens(message: BaseMessage, count: Callable[[str], int] = estimate_tokens) -> int:
+    """
+    Token count of a message's content and tool calls, plus a small per-message overhead.
+    """
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+    calls = getattr(message, 'tool_calls', None)
+    return count(content + (json.dumps(calls, default=str) if calls else '')) + 4
+
+
+def _transcript_line(message: BaseMessage) -> str:
+    speaker = {"human": "User", "ai": "AI"}.get(message.type, message.type.capitalize())
+    return f"{speaker}: {message.content}"
+
+
+def create_summarizer():
+    """
+    Chat model for summaries: the provider's cheap model (LLM_SUMMARY_MODEL overrides it) in
+    live/record mode, and the same LLM_MODE as the agent otherwise (see model_provider).
+    """
+    from fake_llm import summary_script
+    from model_provider import CHEAP_MODELS, DEFAULT_PROVIDER, get_chat_model
+    provider = os.environ.get('LLM_PROVIDER', DEFAULT_PROVIDER)
+    model_name = os.environ.get('LLM_SUMMARY_MODEL') or CHEAP_MODELS.get(provider)
+    return get_chat_model(fake_script=summary_script, provider=provider, model_name=model_name)
+
+
+class HistoryManager:
+    """
+    Selects the messages of one conversation to send to the model within a token budget.
+    The conversation may only grow between calls (messages are appended, never edited).
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, summarizer=None,
+                 summary_budget: Optional[int] = None, count_tokens: Callable[[str], int] = estimate_tokens):
+        """
+        :param token_budget: Maximum prompt tokens for pinned messages, summary and window together
+        :param summarizer: Chat model used to summarize evicted turns (None drops them instead)
+        :param summary_budget: Tokens reserved for the summary (default: a quarter of the budget)
+        :param count_tokens: Token counter for text (default: about four characters per token)
+        """
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary_budget = summary_budget if summary_budget is not None else token_budget // 4
+        self.count_tokens = count_tokens
+        self.summary = ""
+        self.turns: List[dict] = []
+        self._summarized = 0
+        # Messages (and their tokens) dropped by compact(); still part of the conversation's full size
+        self._compacted_messages = 0
+        self._compacted_tokens = 0
+
+    def pin(self, message: BaseMessage) -> BaseMessage:
+        """
+        Always send this message, however old it gets. Returns the message.
+        """
+        message.additional_kwargs[PINNED_KEY] = True
+        return message
+
+    def is_pinned(self, message: BaseMessage) -> bool:
+        return message.type == 'system' or bool(message.additional_kwargs.get(PINNED_KEY))
+
+    def reset(self) -> None:
+        """
+        Forget the summary and metrics, e.g. to start a new conversation.
+        """
+        self.summary = ""
+        self.turns = []
+        self._summarized = 0
+        self._compacted_messages = 0
+        self._compacted_tokens = 0
+
+    def _tokens(self, message: BaseMessage) -> int:
+        return message_tokens(message, self.count_tokens)
+
+    def _summarize(self, evicted: List[BaseMessage]) -> None:
+        if self.summarizer is None:
+            return
+        words = max(20, self.summary_budget * 3 // 4)
+        transcript = "\n".join(_transcript_line(m) for m in evicted)
+        if self.summary:
+            transcript = f"Previous summary: {self.summary}\n{transcript}"
+        response = self.summarizer.invoke([SystemMessage(content=SUMMARY_INSTRUCTIONS.format(words=words)),
+                                           HumanMessage(content=transcript)])
+        summary = response.content if isinstance(response.content, str) else str(response.content)
+        # Hold the summary to its reservation even if the model ignores the word limit.
+        max_chars = self.summary_budget * 4
+        self.summary = summary.strip()[:max_chars]
+
+    def prepare(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Return the messages to send for this turn: pinned messages and the most recent
+        messages that fit the budget, in conversation order, with the rolling summary of
+        older messages inserted after the leading system messages.
+        """
+        pinned = [m for m in messages if self.is_pinned(m)]
+        unpinned = [m for m in messages if not self.is_pinned(m)]
+        if len(unpinned) < self._summarized:
+            self.reset()
+
+        costs = [self._tokens(m) for m in unpinned]
+        pinned_tokens = sum(self._tokens(m) for m in pinned)
+        full_tokens = pinned_tokens + sum(costs) + self._compacted_tokens
+        available = self.token_budget - pinned_tokens - self.summary_budget
+
+        # Walk back from the newest message; the newest one is always sent.
+        start = len(unpinned)
+        used = 0
+        while start > 0 and (start == len(unpinned) or used + costs[start - 1] <= available):
+            used += costs[start - 1]
+            start -= 1
+        # Never bring back messages that were already summarized.
+        start = max(start, self._summarized)
+
+        summarized_now = start - self._summarized
+        if summarized_now:
+            self._summarize(unpinned[self._summarized:start])
+            self._summarized = start
+
+        window = set(map(id, unpinned[start:]))
+        selected = [m for m in messages if id(m) in window or self.is_pinned(m)]
+        if self.summary:
+            lead = 0
+            while lead < len(selected) and selected[lead].type == 'system':
+                lead += 1
+            selected.insert(lead, SystemMessage(content=SUMMARY_PREFIX + self.summary))
+
+        prompt_tokens = sum(self._tokens(m) for m in selected)
+        self.turns.append({"full_tokens": full_tokens, "prompt_tokens": prompt_tokens,
+                           "saved_tokens": max(0, full_tokens - prompt_tokens),
+                           "sent_messages": len(selected), "summarized_messages": summarized_now})
+        return selected
+
+    def compact(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Drop the messages already folded into the summary and return the rest (pinned
+        messages and the current window), so the caller need not keep the whole conversation.
+        Pass the returned list to the next prepare().
+        """
+        unpinned_seen = 0
+        kept = []
+        for message in messages:
+            if self.is_pinned(message):
+                kept.append(message)
+            else:
+                if unpinned_seen >= self._summarized:
+                    kept.append(message)
+                else:
+                    self._compacted_tokens += self._tokens(message)
+                unpinned_seen += 1
+        self._compacted_messages += self._summarized
+        self._summarized = 0
+        return kept
+
+    @property
+    def last_turn(self) -> Optional[dict]:
+        """
+        Metrics of the latest prepare() call: full history tokens, prompt tokens sent,
+        tokens saved, messages sent and messages newly folded into the summary.
+        """
+        return self.turns[-1] if self.turns else None
+
+    def stats(self) -> dict:
+        """
+        Totals over all turns of this conversation.
+        """
+        full = sum(t["full_tokens"] for t in self.turns)
+        saved = sum(t["saved_tokens"] for t in self.turns)
+        return {"turns": len(self.turns), "full_tokens": full, "prompt_tokens": full - saved,
+                "saved_tokens": saved, "saved_ratio": saved / full if full else 0.0,
+                "summarized_messages": self._compacted_messages + self._summarized}
+
+
+def format_history_stats(turn: dict) -> str:
+    return (f"History: sent {turn['prompt_tokens']} of {turn['full_tokens']} tokens "
+            f"({turn['sent_messages']} messages), saved {turn['saved_tokens']}")
@@ -0,0 +1,284 @@
+"""
+Hot reload of the config-based arithmetic graph (graph3) for long-running workers.
+
+HotReloader serves invocations from the current compiled app while a background thread
+polls the config files (config.json, the graph nodes JSON and an optional separate function
+mapping JSON). When their stamps change and have stayed unchanged for one more poll (so a
+half-written file is never read), the graph is rebuilt and validated off the request path
+and swapped in with a single reference assignment:
+
+- invocations already running keep the app they started with and finish on the old version;
+- new invocations pick up the new version;
+- a config that fails validation (graph_validator) or a probe input is rejected and the
+  previous version keeps serving.
+
+Only the JSON configs are reloaded; node functions are resolved from the loaded main module.
+
+    reloader = HotReloader('config.json', probe_inputs=[{...}]).start()
+    reloader.invoke({"operation": "+", ...})
+    reloader.metrics()   # version, reload latency, failures, in-flight invocations per version
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+import threading
+import time
+
+from graph_registry import _file_stamp
+
+DEFAULT_POLL_INTERVAL = 1.0
+# Reload latencies kept for metrics()
+LATENCY_WINDOW = 256
+
+
+@dataclass
+class GraphVersion:
+    """
+    One loaded build of the graph.
+    """
+    number: int
+    app: Any
+    stamps: Dict[str, Optional[tuple]]
+    loaded_at: float = field(default_factory=time.time)
+    in_flight: int = 0
+
+
+class HotReloader:
+    """
+    Serves graph3 from the latest valid config and rebuilds it in the background when the files change.
+    """
+
+    def __init__(self, config_file: str = None, function_mapping_file: str = None, registry=None,
+                 state_schema=None, optimize: bool = False, interval: float = DEFAULT_POLL_INTERVAL,
+                 probe_inputs: Iterable[Mapping[str, Any]] = (),
+                 on_reload: Optional[Callable[[GraphVersion], None]] = None):
+        """
+        :param config_file: Top-level config (default: main.DEFAULT_CONFIG_FILE)
+        :param function_mapping_file: Separate function mapping JSON to build with (and watch); by
+                                      default the mapping integrated in the graph nodes JSON is used,
+                                      as in main.load_app3
+        :param registry: GraphRegistry that builds and validates the apps (default: main.graph_registry)
+        :param state_schema: State schema to build for (default: main.AgentState)
+        :param optimize: Build with graph_optimizer passes
+        :param interval: Seconds between polls of the config files
+        :param probe_inputs: Input states every new build must run without raising before it is swapped in
+        :param on_reload: Called with the new GraphVersion after each swap
+        """
+        import main
+
+        self.config_file = config_file or main.DEFAULT_CONFIG_FILE
+        self.function_mapping_file = function_mapping_file
+        self.registry = registry or main.graph_registry
+        self.state_schema = state_schema or main.AgentState
+        self.optimize = optimize
+        self.interval = interval
+        self.probe_inputs = [dict(state) for state in probe_inputs]
+        self.on_reload = on_reload
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self._counter_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pending = None
+        self._retired: List[GraphVersion] = []
+        self._current = None
+        self._current = self._build(self._stamps(), number=1)
+
+    # -- Serving
+
+    @property
+    def version(self) -> GraphVersion:
+        """
+        The GraphVersion new invocations run on.
+        """
+        return self._current
+
+    @property
+    def app(self):
+        return self._current.app
+
+    def _acquire(self) -> GraphVersion:
+        # Read the reference once: a swap during this invocation does not affect it. Reading it
+        # under the lock means a swap sees every invocation already counted on the old version.
+        with self._counter_lock:
+            version = self._current
+            version.in_flight += 1
+        return version
+
+    def _release(self, version: GraphVersion) -> None:
+        with self._counter_lock:
+            version.in_flight -= 1
+            if not version.in_flight and version is not self._current:
+                # The last invocation on a retired version: drop the reference to its app
+                self._retired = [v for v in self._retired if v is not version]
+
+    def invoke(self, state: Mapping[str, Any], config: dict = None, **kwargs):
+        version = self._acquire()
+        try:
+            return version.app.invoke(state, config, **kwargs)
+        finally:
+            self._release(version)
+
+    async def ainvoke(self, state: Mapping[str, Any], config: dict = None, **kwargs):
+        version = self._acquire()
+        try:
+            return await version.app.ainvoke(state, config, **kwargs)
+        finally:
+            self._release(version)
+
+    def batch(self, states: Iterable[Mapping[str, Any]], config: dict = None, **kwargs) -> list:
+        version = self._acquire()
+        try:
+            return version.app.batch(list(states), config, **kwargs)
+        finally:
+            self._release(version)
+
+    def stream(self, state: Mapping[str, Any], config: dict = None, **kwargs):
+        version = self._acquire()
+        try:
+            yield from version.app.stream(state, config, **kwargs)
+        finally:
+            self._release(version)
+
+    # -- Watching
+
+    def _watched_files(self) -> List[str]:
+        import main
+
+        graph_nodes_file, _ = main.resolve_config_paths(self.config_file)
+        return [p for p in (self.config_file, graph_nodes_file, self.function_mapping_file) if p]
+
+    def _stamps(self) -> Dict[str, Optional[tuple]]:
+        stamps = {}
+        try:
+            files = self._watched_files()
+        except (OSError, ValueError):
+            # config.json is missing or mid-write; only its own stamp is meaningful
+            files = [self.config_file]
+        for path in files:
+            try:
+                stamps[path] = _file_stamp(path)
+            except OSError:
+                stamps[path] = None
+        return stamps
+
+    def _build(self, stamps: Dict[str, Optional[tuple]], number: int) -> GraphVersion:
+        import main
+
+        graph_nodes_file, _ = main.resolve_config_paths(self.config_file)
+        # The registry validates the config (validate_config) and reuses the app if the content is unchanged
+        app = self.registry.get(graph_nodes_file, self.state_schema, self.function_mapping_file,
+                                optimize=self.optimize)
+        for state in self.probe_inputs:
+            app.invoke(dict(state))
+        return GraphVersion(number, app, stamps)
+
+    def check(self) -> bool:
+        """
+        Poll the config files once and reload if they changed and have settled.
+
+        :return: True if a new version was swapped in
+        """
+        stamps = self._stamps()
+        if stamps == self._current.stamps:
+            self._pending = None
+            return False
+        if stamps != self._pending:
+            # Changed since the last poll: wait until the files stop changing
+            self._pending = stamps
+            return False
+        self._pending = None
+        return self.reload(stamps)
+
+    def reload(self, stamps: Dict[str, Optional[tuple]] = None) -> bool:
+        """
+        Rebuild and validate the graph now and swap it in. On failure the current version keeps
+        serving and the error is kept in last_error (the most recent rejection).
+
+        :param stamps: File stamps the build corresponds to (default: read them now)
+        :return: True if a new version was swapped in
+        """
+        with self._reload_lock:
+            stamps = stamps or self._stamps()
+            current = self._current
+            start = time.perf_counter()
+            try:
+                candidate = self._build(stamps, current.number + 1)
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                # Remember the stamps so the same broken files are not rebuilt on every poll
+                current.stamps = stamps
+                return False
+            self.latencies_ms.append((time.perf_counter() - start) * 1000)
+            if candidate.app is current.app:
+                # Files were touched but their content is unchanged
+                current.stamps = stamps
+                return False
+            with self._counter_lock:
+                self._current = candidate
+                # Keep only retired versions that still have invocations running
+                self._retired = [v for v in self._retired if v.in_flight]
+                if current.in_flight:
+                    self._retired.append(current)
+            self.reloads += 1
+        if self.on_reload is not None:
+            self.on_reload(candidate)
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as exc:
+                # The watcher must outlive any error; it is reported through metrics()
+                self.failures += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+
+    def start(self) -> 'HotReloader':
+        """
+        Start the background watcher thread (a daemon); returns self.
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="graph-hot-reload", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'HotReloader':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def metrics(self) -> dict:
+        """
+        Return the version in use, reload counters and latencies (over the last LATENCY_WINDOW
+        reloads), and in-flight invocations (draining lists older versions that still have
+        invocations running).
+        """
+        current = self._current
+        with self._counter_lock:
+            draining = {v.number: v.in_flight for v in self._retired}
+        latencies = list(self.latencies_ms)
+        return {
+            "version": current.number,
+            "loaded_at": current.loaded_at,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload_ms": latencies[-1] if latencies else None,
+            "mean_reload_ms": sum(latencies) / len(latencies) if latencies else None,
+            "max_reload_ms": max(latencies) if latencies else None,
+            "in_flight": current.in_flight,
+            "draining": draining,
+        }
@@ -0,0 +1,388 @@
+"""
+Per-node timing and tracing for compiled graphs.
+
+GraphTracer is a LangChain callback handler. LangGraph reports every node run (tagged
+graph:step:N) and every conditional-edge router (a child run of the node it routes from)
+through the callback system, so attaching the tracer records, per super-step:
+
+* wall time and CPU time (thread CPU time when the run starts and ends on the same thread),
+* allocations (net bytes traced by tracemalloc; only with trace_memory=True),
+* state-size deltas: approximate size of the state a node received and of the update it returned.
+
+Model and tool calls made inside nodes are recorded as "llm" and "tool" spans.
+
+Tracing is switched on per compiled app and costs nothing when it is not attached:
+
+    tracer = GraphTracer()
+    traced_app = instrument(app, tracer)   # app.with_config(callbacks=[tracer])
+    traced_app.invoke(state)
+    print(tracer.format_summary())
+    tracer.to_chrome_trace('trace.json')   # chrome://tracing or https://ui.perfetto.dev
+    tracer.to_otel_json('spans.json')      # OTLP/JSON (resourceSpans), e.g. for otel-cli or Jaeger
+
+Usage:
+    python instrumentation.py graph3|react|drafter [--invocations 20] [--memory]
+                              [--chrome trace.json] [--otel spans.json] [--top 10]
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+STEP_TAG = 'graph:step:'
+
+
+@dataclass
+class Span:
+    """
+    One timed run: the graph itself, a node, a router, or a model/tool call inside a node.
+    """
+    run_id: UUID
+    parent_id: Optional[UUID]
+    trace_id: UUID
+    name: str
+    kind: str
+    step: Optional[int]
+    start_ns: int
+    end_ns: int = 0
+    cpu_ns: int = 0
+    alloc_bytes: Optional[int] = None
+    input_bytes: Optional[int] = None
+    output_bytes: Optional[int] = None
+    thread: int = 0
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def wall_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    @property
+    def cpu_ms(self) -> float:
+        return self.cpu_ns / 1e6
+
+
+def approx_size(value: Any, depth: int = 8) -> int:
+    """
+    Approximate deep size in bytes of a state or update (dicts, lists, strings, messages).
+    """
+    seen = set()
+
+    def size(obj, level):
+        if id(obj) in seen or level > depth:
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(k, level + 1) + size(v, level + 1) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            total += sum(size(item, level + 1) for item in obj)
+        elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+            total += size(vars(obj), level + 1)
+        elif hasattr(obj, '__slots__'):
+            total += sum(size(getattr(obj, s, None), level + 1) for s in obj.__slots__)
+        return total
+
+    return size(value, 0)
+
+
+class GraphTracer(BaseCallbackHandler):
+    """
+    Callback handler recording a Span for every graph, node, router, model and tool run.
+    """
+    raise_error = False
+
+    def __init__(self, trace_memory: bool = False, measure_state: bool = True):
+        """
+        :param trace_memory: Record net allocations per run with tracemalloc (slows execution down)
+        :param measure_state: Record the approximate size of node inputs and outputs
+        """
+        self.trace_memory = trace_memory
+        self.measure_state = measure_state
+        self.spans: List[Span] = []
+        self._open: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+        # perf_counter is monotonic; this maps it onto wall-clock time for exported timestamps
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+        self._started_tracemalloc = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def close(self) -> None:
+        """
+        Stop tracemalloc if this tracer started it.
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans.clear()
+            self._open.clear()
+
+    # -- callback entry points
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        tags = tags or []
+        name = kwargs.get('name') or (serialized or {}).get('name') or 'chain'
+        if parent_run_id is None:
+            kind = 'graph'
+        elif any(tag.startswith(STEP_TAG) for tag in tags):
+            kind = 'node'
+        elif metadata.get('langgraph_node') and name != metadata['langgraph_node']:
+            parent = self._open.get(parent_run_id)
+            kind = 'router' if parent is not None and parent[0].kind == 'node' else 'chain'
+        else:
+            kind = 'chain'
+        self._start(run_id, parent_run_id, name, kind, metadata, inputs if kind == 'node' else None)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, None, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get('name') or (serialized or {}).get('name') or 'chat_model'
+        self._start(run_id, parent_run_id, name, 'llm', metadata or {}, None)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get('name') or (serialized or {}).get('name') or 'llm'
+        self._start(run_id, parent_run_id, name, 'llm', metadata or {}, None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, None, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get('name') or (serialized or {}).get('name') or 'tool'
+        self._start(run_id, parent_run_id, name, 'tool', metadata or {}, None)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, None)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, None, error)
+
+    # -- span bookkeeping
+
+    def _start(self, run_id, parent_id, name, kind, metadata, inputs) -> None:
+        parent = self._open.get(parent_id)
+        span = Span(run_id=run_id, parent_id=parent_id, trace_id=parent[0].trace_id if parent else run_id,
+                    name=name, kind=kind, step=metadata.get('langgraph_step'), start_ns=0,
+                    thread=threading.get_ident())
+        if self.measure_state and inputs is not None:
+            span.input_bytes = approx_size(inputs)
+        alloc = tracemalloc.get_traced_memory()[0] if self.trace_memory and tracemalloc.is_tracing() else None
+        with self._lock:
+            self._open[run_id] = (span, time.thread_time_ns(), alloc)
+        span.start_ns = time.perf_counter_ns()
+
+    def _end(self, run_id, outputs, error=None) -> None:
+        end_ns = time.perf_counter_ns()
+        cpu_ns = time.thread_time_ns()
+        with self._lock:
+            opened = self._open.pop(run_id, None)
+        if opened is None:
+            return
+        span, cpu_start, alloc_start = opened
+        span.end_ns = end_ns
+        # Thread CPU time is only comparable when the run ended on the thread it started on
+        span.cpu_ns = cpu_ns - cpu_start if span.thread == threading.get_ident() else 0
+        if alloc_start is not None and tracemalloc.is_tracing():
+            span.alloc_bytes = tracemalloc.get_traced_memory()[0] - alloc_start
+        if self.measure_state and span.kind == 'node' and outputs is not None:
+            span.output_bytes = approx_size(outputs)
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        with self._lock:
+            self.spans.append(span)
+
+    # -- reporting
+
+    def summary(self, kinds: tuple = ('node', 'router', 'llm', 'tool')) -> List[dict]:
+        """
+        Aggregate spans per (kind, name), hottest (largest total wall time) first.
+        """
+        rows = {}
+        for span in self.spans:
+            if span.kind not in kinds:
+                continue
+            row = rows.setdefault((span.kind, span.name), {
+                "kind": span.kind, "name": span.name, "calls": 0, "errors": 0, "wall_ms": [],
+                "cpu_ms": 0.0, "alloc_bytes": 0, "state_delta_bytes": 0})
+            row["calls"] += 1
+            row["errors"] += span.error is not None
+            row["wall_ms"].append(span.wall_ms)
+            row["cpu_ms"] += span.cpu_ms
+            row["alloc_bytes"] += span.alloc_bytes or 0
+            row["state_delta_bytes"] += span.output_bytes or 0
+
+        result = []
+        for row in rows.values():
+            walls = sorted(row.pop("wall_ms"))
+            row["total_ms"] = sum(walls)
+            row["mean_ms"] = row["total_ms"] / len(walls)
+            row["p95_ms"] = walls[min(len(walls) - 1, int(0.95 * len(walls)))]
+            result.append(row)
+        return sorted(result, key=lambda r: r["total_ms"], reverse=True)
+
+    def format_summary(self, top: int = 10) -> str:
+        """
+        Table of the hottest nodes, routers, model and tool calls.
+        """
+        rows = self.summary()
+        total = sum(s.wall_ms for s in self.spans if s.kind == 'graph') or sum(r["total_ms"] for r in rows) or 1.0
+        lines = [f"{'kind':7s} {'name':28s} {'calls':>6s} {'total ms':>10s} {'share':>6s} {'mean ms':>8s} "
+                 f"{'p95 ms':>8s} {'cpu ms':>9s} {'alloc KiB':>10s} {'delta KiB':>10s}"]
+        for row in rows[:top]:
+            lines.append(f"{row['kind']:7s} {row['name'][:28]:28s} {row['calls']:6d} {row['total_ms']:10.2f} "
+                         f"{row['total_ms'] / total:6.1%} {row['mean_ms']:8.3f} {row['p95_ms']:8.3f} "
+                         f"{row['cpu_ms']:9.2f} {row['alloc_bytes'] / 1024:10.1f} {row['state_delta_bytes'] / 1024:10.1f}")
+        return "\n".join(lines)
+
+    def _span_args(self, span: Span) -> Dict[str, Any]:
+        args = {"kind": span.kind, "step": span.step, "cpu_ms": round(span.cpu_ms, 4),
+                "alloc_bytes": span.alloc_bytes, "input_bytes": span.input_bytes,
+                "output_bytes": span.output_bytes, "error": span.error}
+        return {k: v for k, v in args.items() if v is not None}
+
+    def to_chrome_trace(self, path: str) -> None:
+        """
+        Write the spans in Chrome trace event format (complete "X" events, microseconds).
+        """
+        origin = min((s.start_ns for s in self.spans), default=0)
+        threads = {}
+        events = []
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            tid = threads.setdefault(span.thread, len(threads) + 1)
+            events.append({"name": span.name, "cat": span.kind, "ph": "X", "pid": os.getpid(), "tid": tid,
+                           "ts": (span.start_ns - origin) / 1000, "dur": (span.end_ns - span.start_ns) / 1000,
+                           "args": self._span_args(span)})
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def to_otel_json(self, path: str, service_name: str = 'langgraph') -> None:
+        """
+        Write the spans as OTLP/JSON (resourceSpans -> scopeSpans -> spans).
+        """
+        def attribute(key, value):
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            return {"key": key, "value": typed}
+
+        # UUID7 run ids start with a timestamp, so span ids use their random tail
+        span_id = lambda run_id: run_id.hex[-16:]
+        spans = []
+        for span in self.spans:
+            attributes = {f"langgraph.{k}": v for k, v in self._span_args(span).items() if k != 'error'}
+            otel = {"traceId": span.trace_id.hex, "spanId": span_id(span.run_id), "name": span.name,
+                    "kind": 1, "startTimeUnixNano": str(span.start_ns + self._epoch_offset_ns),
+                    "endTimeUnixNano": str(span.end_ns + self._epoch_offset_ns),
+                    "attributes": [attribute(k, v) for k, v in attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1}}
+            if span.parent_id is not None:
+                otel["parentSpanId"] = span_id(span.parent_id)
+            spans.append(otel)
+        document = {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "instrumentation"}, "spans": spans}],
+        }]}
+        with open(path, 'w') as f:
+            json.dump(document, f)
+
+
+def instrument(app, tracer: GraphTracer):
+    """
+    Return the compiled app with the tracer attached; the original app stays uninstrumented.
+    """
+    return app.with_config(callbacks=[tracer])
+
+
+def _graph3_runner():
+    import main
+
+    app = main.load_app3()
+    def run(traced, i):
+        traced.invoke({"operation": '+-'[i % 2], "operation2": '-+'[i % 2], "number1": i, "number2": 2,
+                       "number3": 3, "number4": i, "messages": []})
+    return app, run
+
+
+def _react_runner():
+    import ReAct
+    from fake_llm import FakeChatModel, react_script
+
+    app = ReAct.build_app(FakeChatModel(script=react_script))
+    def run(traced, i):
+        traced.invoke({"messages": [("user", f"Add {i} + 21. Add 12 + {i}. Then subtract 5 from the result of the first addition.")]})
+    return app, run
+
+
+def _drafter_runner():
+    import Drafter
+    from fake_llm import FakeChatModel, drafter_script
+
+    # Each run is a whole session: the request, then "Make it shorter." at the human interrupt
+    app = Drafter.build_app(FakeChatModel(script=drafter_script))
+    def run(traced, i):
+        Drafter.run_scripted_session(traced, f"trace-{i}", [f"Write a note number {i}.", "Make it shorter."])
+    return app, run
+
+
+RUNNERS = {'graph3': _graph3_runner, 'react': _react_runner, 'drafter': _drafter_runner}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Trace per-node timings of a graph (LLM graphs use the fake model).")
+    parser.add_argument('graph', choices=sorted(RUNNERS))
+    parser.add_argument('--invocations', type=int, default=20)
+    parser.add_argument('--memory', action='store_true', help="Record allocations with tracemalloc")
+    parser.add_argument('--chrome', help="Write a Chrome trace to this file")
+    parser.add_argument('--otel', help="Write OTLP/JSON spans to this file")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app, run = RUNNERS[args.graph]()
+    tracer = GraphTracer(trace_memory=args.memory)
+    traced = instrument(app, tracer)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.invocations):
+                run(traced, i)
+    finally:
+        tracer.close()
+    print(tracer.format_summary(args.top))
+    if args.chrome:
+        tracer.to_chrome_trace(args.chrome)
+        print(f"Chrome trace written to '{args.chrome}'")
+    if args.otel:
+        tracer.to_otel_json(args.otel)
+        print(f"OTLP/JSON spans written to '{args.otel}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
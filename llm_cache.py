@@ -0,0 +1,254 @@
+"""
+Response caching for chat models.
+
+CachedChatModel wraps a (tool-bound) chat model with an exact-match response cache stored in
+SQLite. The key is a hash of the normalized message list (see model_provider.normalize_messages),
+the JSON schemas of the bound tools and the wrapped model's identity, so any change in history,
+prompt or tools is a miss. The store is bounded by total response size and evicts the least
+recently used responses first.
+
+Independently of exact hits, every request's stable prefix (the leading system messages plus the
+tool schemas) is fingerprinted. Prefixes that repeat are reported, and an on_stable_prefix hook is
+called once a prefix has been seen `prefix_threshold` times so a provider-specific integration
+(e.g. Gemini cached contents) can register it for server-side context caching. Counts are kept
+for the MAX_TRACKED_PREFIXES most recently seen prefixes.
+"""
+from typing import Any, Callable, List, Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from model_provider import normalize_messages
+from tool_cache import LRUCache
+
+DEFAULT_CACHE_PATH = 'llm_cache.sqlite'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Distinct prompt prefixes counted at once; the least recently seen are forgotten
+MAX_TRACKED_PREFIXES = 1024
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token) for responses without usage metadata.
+    """
+    return max(1, len(text) // 4) if text else 0
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+    calls = getattr(message, 'tool_calls', None)
+    return content + (json.dumps(calls, default=str) if calls else '')
+
+
+def tool_schemas(tools) -> List[dict]:
+    """
+    JSON schemas of the tools, as sent to the provider.
+    """
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    return [convert_to_openai_tool(t) for t in tools or []]
+
+
+def prefix_fingerprint(messages: List[BaseMessage], schemas: List[dict] = ()) -> str:
+    """
+    Hash of the leading system messages and tool schemas, i.e. the part of the prompt that
+    stays the same from turn to turn.
+    """
+    prefix = []
+    for message in messages:
+        if message.type != 'system':
+            break
+        prefix.append(message.content)
+    payload = json.dumps({"system": prefix, "tools": list(schemas)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SqliteResponseCache:
+    """
+    SQLite table of responses keyed by request hash, evicting least recently used entries
+    once the stored responses exceed max_bytes.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+            " input_tokens INTEGER NOT NULL, output_tokens INTEGER NOT NULL,"
+            " created REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        """
+        Return (message, input_tokens, output_tokens) for key, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, input_tokens, output_tokens FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                               (time.time(), key))
+            self._conn.commit()
+        # Drop the stored message id so add_messages treats every hit as a new message.
+        message = messages_from_dict([json.loads(row[0])])[0].model_copy(update={"id": None})
+        return message, row[1], row[2]
+
+    def put(self, key: str, message: AIMessage, input_tokens: int, output_tokens: int) -> None:
+        payload = json.dumps(message_to_dict(message))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, input_tokens, output_tokens, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, payload, len(payload), input_tokens, output_tokens, now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% so that a full cache does not evict on every insert.
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            doomed.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+class CachedChatModel(BaseChatModel):
+    """
+    Chat model wrapper serving exact repeats of a request from a SqliteResponseCache.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Any
+    store: Any
+    schemas: List[dict] = []
+    prefix_threshold: int = 2
+    on_stable_prefix: Optional[Callable[[str, List[BaseMessage]], None]] = None
+    _stats: dict = PrivateAttr(default_factory=lambda: {
+        "hits": 0, "misses": 0, "saved_input_tokens": 0, "saved_output_tokens": 0, "prefix_repeats": 0})
+    _prefix_counts: LRUCache = PrivateAttr(default_factory=lambda: LRUCache(MAX_TRACKED_PREFIXES))
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def wrap(cls, model, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES, **kwargs) -> "CachedChatModel":
+        return cls(inner=model, store=SqliteResponseCache(path, max_bytes), **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "cached-chat-model"
+
+    def bind_tools(self, tools, **kwargs) -> "CachedChatModel":
+        bound = self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs),
+                                        "schemas": tool_schemas(tools)})
+        # Share counters with the unbound wrapper so stats cover every binding.
+        bound._stats, bound._prefix_counts, bound._lock = self._stats, self._prefix_counts, self._lock
+        return bound
+
+    def _identity(self) -> str:
+        inner = getattr(self.inner, 'bound', self.inner)
+        return f"{type(inner).__name__}:{getattr(inner, 'model', getattr(inner, 'model_name', ''))}"
+
+    def cache_key(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs) -> str:
+        """
+        Exact-match key: normalized messages, tool schemas, wrapped model identity, and the
+        stop sequences and other call options, which change the answer as well.
+        """
+        payload = json.dumps({"model": self._identity(), "messages": normalize_messages(messages),
+                              "tools": self.schemas, "stop": stop, "options": kwargs},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _track_prefix(self, messages: List[BaseMessage]) -> None:
+        fingerprint = prefix_fingerprint(messages, self.schemas)
+        with self._lock:
+            seen = self._prefix_counts.get(fingerprint, 0) + 1
+            self._prefix_counts.put(fingerprint, seen)
+            if seen > 1:
+                self._stats["prefix_repeats"] += 1
+        if seen == self.prefix_threshold and self.on_stable_prefix:
+            self.on_stable_prefix(fingerprint, [m for m in messages if m.type == 'system'])
+
+    def _lookup(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: dict) -> tuple:
+        self._track_prefix(messages)
+        key = self.cache_key(messages, stop, **kwargs)
+        cached = self.store.get(key)
+        with self._lock:
+            if cached is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["hits"] += 1
+                self._stats["saved_input_tokens"] += cached[1]
+                self._stats["saved_output_tokens"] += cached[2]
+        return key, cached
+
+    def _store(self, key: str, messages: List[BaseMessage], response: AIMessage) -> None:
+        usage = getattr(response, 'usage_metadata', None) or {}
+        input_tokens = usage.get('input_tokens') or sum(estimate_tokens(_message_text(m)) for m in messages)
+        output_tokens = usage.get('output_tokens') or estimate_tokens(_message_text(response))
+        self.store.put(key, response, input_tokens, output_tokens)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs) -> ChatResult:
+        key, cached = self._lookup(messages, stop, kwargs)
+        if cached is not None:
+            return ChatResult(generations=[ChatGeneration(message=cached[0])])
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._store(key, messages, response)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs) -> ChatResult:
+        key, cached = self._lookup(messages, stop, kwargs)
+        if cached is not None:
+            return ChatResult(generations=[ChatGeneration(message=cached[0])])
+        response = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self._store(key, messages, response)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def cache_stats(self) -> dict:
+        """
+        Return hits, misses, hit rate, tokens saved by exact hits, repeated prompt prefixes
+        and the current store size.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["distinct_prefixes"] = self._prefix_counts.stats()["size"]
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        stats["store_bytes"] = self.store.size_bytes()
+        return stats
+
+
+def format_cache_stats(stats: dict) -> str:
+    return (f"LLM cache: {stats['hits']} hits / {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%}), saved {stats['saved_input_tokens']} prompt + "
+            f"{stats['saved_output_tokens']} completion tokens, "
+            f"{stats['prefix_repeats']} repeated prompt prefixes")
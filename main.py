@@ -1,13 +1,30 @@
-from typing import Dict, TypedDict, List
-from langgraph.graph import StateGraph, START, END
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Annotated, Dict, TypedDict, List
 from collections import defaultdict
-from IPython.display import display, Image
+import argparse
 import json
+import operator
+import os
 import random
+from compact_state import CompactAgentState, StateBatch
+from expressions import compile_expression, is_pass_through
+from graph_dependencies import format_parallel_report, parallelize_config
+from graph_optimizer import format_report, optimize_graph_config
+from graph_registry import GraphRegistry
+from graph_validator import compile_graph_config
+
+# langgraph, numpy and the rendering stack are imported inside the functions that need them,
+# so importing this module to reuse adder/router_node & co. stays cheap (see benchmarks.py import-budget).
+if TYPE_CHECKING:
+    import numpy as np
+    from langgraph.graph import StateGraph
 
 # Define a state schema for StateGraph
+# List channels are reducer-annotated: nodes return only the items they add and LangGraph
+# concatenates them, so no node ever mutates a list it was given.
 class AgentStateTest(TypedDict):
-    messages: List[str]= []
+    messages: Annotated[List[str], operator.add] = []
     values: List[int]
     operations: List[str]
     name: str
@@ -24,7 +41,7 @@ class AgentState(TypedDict):
     number4: int
     final_number: int
     final_number2: int
-    messages: List[str] = []  # This is NOT a default value!
+    messages: Annotated[List[str], operator.add] = []  # This is NOT a default value!
     
 class AgentStateV(TypedDict):
     """
@@ -32,33 +49,23 @@ class AgentStateV(TypedDict):
     This is used to define the state of the agent in the graph.
     """
     name: str
-    number: List[int]
+    number: Annotated[List[int], operator.add]
     counter: int
 
 def greeting_node2(state: AgentStateV) -> AgentStateV:
     """
     A simple greeting node that initializes the state with a welcome message.
     """
-    if 'name' not in state:
-        state['name'] = "User"
-    
-    if 'number' not in state:
-        state['number'] = []
+    name = state.get('name', "User")
     
-    state['name'] = f"Hello {state['name']}! How can I assist you today?"
-    state["counter"] = 0
-    
-    return state
+    return {"name": f"Hello {name}! How can I assist you today?", "counter": 0}
     
 def random_node(state: AgentStateV) -> AgentStateV:
     """
     A node that randomly genmerates a number from 1-10.
     """
    
-    state['number'].append(random.randint(0, 10))
-    state['counter'] += 1
-    
-    return state
+    return {"number": [random.randint(0, 10)], "counter": state['counter'] + 1}
 
 def should_continue(state: AgentStateV) -> AgentStateV:    
     """
@@ -70,10 +77,14 @@ def should_continue(state: AgentStateV) -> AgentStateV:
     else:
         return "exit"
 
-def run_graph_exerciseV(state: AgentStateV) -> AgentStateV:
+def build_graph_exerciseV(checkpointer=None):
     """
-    Run a simple graph exercise with the given state.
+    Build and compile the exercise V loop graph (greeting -> random, looping until counter reaches 5).
+
+    :param checkpointer: Optional checkpoint saver (see checkpoint_store)
     """
+    from langgraph.graph import StateGraph, START, END
+
     graph = StateGraph(AgentStateV)
     
     # Define nodes
@@ -92,79 +103,63 @@ def run_graph_exerciseV(state: AgentStateV) -> AgentStateV:
     )
 
     graph.add_edge(START, "greeting")
-    app = graph.compile()
-    create_graph_png(app, 'Exercise5_visualization.png') 
+    return graph.compile(checkpointer=checkpointer)
+
+def run_graph_exerciseV(state: AgentStateV, render: bool = True) -> AgentStateV:
+    """
+    Run a simple graph exercise with the given state.
+    Set render=False to skip writing the graph visualization.
+    """
+    app = build_graph_exerciseV()
+    if render:
+        create_graph_image(app, 'Exercise5_visualization.svg')
     # Invoke the graph
     result = app.invoke(state)
     
     return result
 
+# Message templates shared by the per-record nodes and the batch path so both
+# produce byte-identical messages.
+ADD_MESSAGE = "Adding {} and {} gives {}."
+SUBTRACT_MESSAGE = "Subtracting {} from {} gives {}."
+
 def adder(state: AgentState) -> AgentState:
     """
     A simple adder node that adds two numbers and updates the state.
     """
-    if 'messages' not in state:
-        state['messages'] = []
-    
-    if 'number1' not in state or 'number2' not in state:
-        raise ValueError("State must contain 'number1' and 'number2'.")
-    
-    state['final_number'] = state['number1'] + state['number2']
-    state['messages'].append(f"Adding {state['number1']} and {state['number2']} gives {state['final_number']}.")
-    return state
+    final_number = state['number1'] + state['number2']
+    return {"final_number": final_number,
+            "messages": [ADD_MESSAGE.format(state['number1'], state['number2'], final_number)]}
 
 def subtractor(state: AgentState) -> AgentState:
     """
     A simple subtractor node that subtracts two numbers and updates the state.
     """
-    if 'messages' not in state:
-        state['messages'] = []
-    
-    if 'number1' not in state or 'number2' not in state:
-        raise ValueError("State must contain 'number1' and 'number2'.")
-    
-    state['final_number'] = state['number1'] - state['number2']
-    state['messages'].append(f"Subtracting {state['number2']} from {state['number1']} gives {state['final_number']}.")
-    return state
+    final_number = state['number1'] - state['number2']
+    return {"final_number": final_number,
+            "messages": [SUBTRACT_MESSAGE.format(state['number2'], state['number1'], final_number)]}
 
 def adder2(state: AgentState) -> AgentState:
     """
     A simple adder node that adds two numbers and updates the state.
     """
-    if 'messages' not in state:
-        state['messages'] = []
-    
-    if 'number3' not in state or 'number4' not in state:
-        raise ValueError("State must contain 'number3' and 'number4'.")
-    
-    state['final_number2'] = state['number3'] + state['number4']
-    state['messages'].append(f"Adding {state['number3']} and {state['number4']} gives {state['final_number']}.")
-    return state
+    final_number2 = state['number3'] + state['number4']
+    # The message reports final_number (the first result), as it always has
+    return {"final_number2": final_number2,
+            "messages": [ADD_MESSAGE.format(state['number3'], state['number4'], state['final_number'])]}
 
 def subtractor2(state: AgentState) -> AgentState:
     """
     A simple subtractor node that subtracts two numbers and updates the state.
     """
-    if 'messages' not in state:
-        state['messages'] = []
-    
-    if 'number3' not in state or 'number4' not in state:
-        raise ValueError("State must contain 'number3' and 'number4'.")
-    
-    state['final_number2'] = state['number3'] - state['number4']
-    state['messages'].append(f"Subtracting {state['number3']} from {state['number4']} gives {state['final_number2']}.")
-    return state
+    final_number2 = state['number3'] - state['number4']
+    return {"final_number2": final_number2,
+            "messages": [SUBTRACT_MESSAGE.format(state['number3'], state['number4'], final_number2)]}
 
 def decide_next_node(state: AgentState) -> AgentState:
     """
     A decision node that determines the next step based on the operation.
     """
-    if 'messages' not in state:
-        state['messages'] = []
-    
-    if 'operation' not in state:
-        raise ValueError("State must contain 'operation'.")
-    
     if state['operation'] == '+':
         # return adder(state)
         return "addition_operation"
@@ -178,12 +173,6 @@ def decide_next_node2(state: AgentState) -> AgentState:
     """
     A decision node that determines the next step based on the operation.
     """
-    if 'messages' not in state:
-        state['messages'] = []
-    
-    if 'operation' not in state:
-        raise ValueError("State must contain 'operation'.")
-    
     if state['operation2'] == '+':
         # return adder(state)
         return "addition_operation2"
@@ -197,20 +186,17 @@ def greeting_node(state: AgentStateTest) -> AgentStateTest:
     """
     A simple greeting node that initializes the state with a welcome message.
     """
-    state['messages'].append(f"Hello {state['name']}! How can I assist you today?")
-    return state
+    return {"messages": [f"Hello {state['name']}! How can I assist you today?"]}
 
 def process_values(state: AgentStateTest) -> AgentStateTest:
     """
     A node that processes a list of values and appends the result to the messages.
     """
     if not state['values']:
-        state['messages'].append("No values provided.")
-        return state
+        return {"messages": ["No values provided."]}
     operations_message = ''    
     if not state['operations']:
-        state['messages'].append("No operations specified.")
-        return state
+        return {"messages": ["No operations specified."]}
     elif '+' in state['operations']:
         total = sum(state['values'])
         operations_message = "sum of the values "
@@ -226,46 +212,44 @@ def process_values(state: AgentStateTest) -> AgentStateTest:
         total = state['values'][0]
         for value in state['values'][1:]:
             if value == 0:
-                state['messages'].append("ivision by zero is not allowed.")
-                return state
+                return {"messages": ["ivision by zero is not allowed."]}
             total /= value
         operations_message = "division of the values "
 
-    state['result'] = f"Hi {state['name']}. The {operations_message} is: {total}. "
-    state['messages'].append(state['result'])
-    return state
+    result = f"Hi {state['name']}. The {operations_message} is: {total}. "
+    return {"result": result, "messages": [result]}
+
+def no_update(state: dict) -> dict:
+    """
+    Node that leaves the state unchanged; used for pass-through nodes such as routers.
+    """
+    return {}
 
+# The config is checked once at load time and each input state once at the graph boundary
+# (graph_validator); the routers still reject unknown operators, so a graph run without that
+# boundary check cannot route '*' to a subtraction.
 def router_node(state: AgentState) -> str:
     """
     A router node that determines which operation to perform based on the operation in state.
     Returns the key for the next node.
     """
-    if 'messages' not in state:
-        state['messages'] = []
-    
-    if 'operation' not in state:
-        raise ValueError("State must contain 'operation'.")
-    
     if state['operation'] == '+':
         return "addition_operation"
-    elif state['operation'] == '-':
+    if state['operation'] == '-':
         return "subtraction_operation"
-  
+    raise ValueError(f"Unknown operation {state['operation']!r}. Use '+' or '-'.")
+
 
 def router_node2(state: AgentState) -> str:
     """
     A router node that determines which operation to perform based on the operation in state.
     Returns the key for the next node.
     """
-    if 'messages' not in state:
-        state['messages'] = []
-
-    if 'operation2' not in state:
-        raise ValueError("State must contain 'operation2'.")
     if state['operation2'] == '+':
         return "addition_operation2"
-    elif state['operation2'] == '-':
+    if state['operation2'] == '-':
         return "subtraction_operation2"
+    raise ValueError(f"Unknown operation2 {state['operation2']!r}. Use '+' or '-'.")
 
 
 
@@ -274,22 +258,32 @@ def post_processing(state: AgentStateTest) -> AgentStateTest:
     A node that processes the final state and appends a closing message.
     """
     if not state['messages']:
-        state['messages'].append("No messages to display.")
-        return state
-    state['messages'].append(f"You have these skills {state['skills']}.")
-    # state['messages'].append(f"Thank you {state['name']}! Your request has been processed.")
-    return state
+        return {"messages": ["No messages to display."]}
+    # return {"messages": [f"Thank you {state['name']}! Your request has been processed."]}
+    return {"messages": [f"You have these skills {state['skills']}."]}
 
 def create_graph_png(app: StateGraph,
                      fname:str='graph_visualization.png') -> None:
     """
     Create a PNG visualization of the graph.
+    This renders through the remote mermaid.ink service; use create_graph_image to render offline.
     """
     graph_png = app.get_graph().draw_mermaid_png()
     with open(fname, "wb") as f:
         f.write(graph_png)
     print(f"Graph saved as '{fname}'")
 
+def create_graph_image(app: StateGraph,
+                       fname: str = 'graph_visualization.svg') -> None:
+    """
+    Create an SVG (or .mmd/.dot) visualization of the graph locally, with no network access.
+    Unchanged graphs are served from the topology cache instead of being re-rendered.
+    """
+    from graph_render import render_graph
+
+    render_graph(app, fname)
+    print(f"Graph saved as '{fname}'")
+
 def print_graph_result_manual(result: AgentStateTest) -> None:
     """
     Print the graph in a human-readable format.
@@ -306,18 +300,28 @@ def build_graph_from_config(config: dict, state_schema=AgentStateTest) -> StateG
     """
     Build a complete StateGraph from configuration.
     
-    :param config: Dictionary containing nodes, entry_point, and finish_point(s)
+    :param config: Dictionary containing nodes, entry_point (or entry_router and
+                   entry_conditional_edges, or parallel entry_points), and finish_point(s)
     :param state_schema: The state schema to use (defaults to AgentStateTest)
     :return: Configured StateGraph
     """
+    from langgraph.graph import StateGraph, START, END
+
     graph = StateGraph(state_schema)
     
-    # Add all nodes
+    # Add all nodes (deferred nodes, like the join of a parallelized config, run once all branches are done)
     for node_name, node_info in config["nodes"].items():
-        graph.add_node(node_name, node_info["function"])
-    
-    # Set entry point
-    graph.set_entry_point(config["entry_point"])
+        graph.add_node(node_name, node_info["function"], defer=node_info.get("defer", False))
+    
+    # Set entry point (a fused router from graph_optimizer routes straight from START,
+    # a parallelized config from graph_dependencies fans out to several entry points)
+    if "entry_conditional_edges" in config:
+        graph.add_conditional_edges(START, config["entry_router"], config["entry_conditional_edges"])
+    elif "entry_points" in config:
+        for entry_point in config["entry_points"]:
+            graph.add_edge(START, entry_point)
+    else:
+        graph.set_entry_point(config["entry_point"])
     
     # Add regular edges and conditional edges
     for node_name, node_info in config["nodes"].items():
@@ -371,7 +375,32 @@ def load_arithmetic_config_from_json(json_file_path: str, function_mapping_file:
             function_mapping_config = json_config["function_mapping"]
         else:
             raise ValueError("No function mapping found. Either provide a separate function_mapping_file or include function_mapping in the main config.")
-    
+
+    validate_arithmetic_config(json_config, function_mapping_config)
+    return resolve_arithmetic_config(json_config, function_mapping_config)
+
+
+def validate_arithmetic_config(json_config: dict, function_mapping_config: dict):
+    """
+    Check a graph nodes config against this module's functions once, at load time.
+
+    :param json_config: Parsed graph nodes JSON
+    :param function_mapping_config: Parsed "function_mapping" section
+    :return: graph_validator.InputValidator for the config's input states
+    :raises graph_validator.ConfigValidationError: listing every problem found
+    """
+    return compile_graph_config(json_config, function_mapping_config, globals())
+
+
+def resolve_arithmetic_config(json_config: dict, function_mapping_config: dict) -> dict:
+    """
+    Convert an already-parsed graph nodes config and function mapping into a configuration
+    dictionary with actual function references.
+
+    :param json_config: Parsed graph nodes JSON (nodes, entry_point, finish_points)
+    :param function_mapping_config: Parsed "function_mapping" section
+    :return: Configuration dictionary with actual function references
+    """
     # Build function mapping dynamically from config
     function_mapping = {}
     
@@ -380,8 +409,8 @@ def load_arithmetic_config_from_json(json_file_path: str, function_mapping_file:
     
     for func_name, func_config in function_mapping_config.items():
         if func_config["type"] == "lambda":
-            # Evaluate lambda expression safely
-            function_mapping[func_name] = eval(func_config["expression"])
+            # Compile through the restricted expression engine (cached by expression string)
+            function_mapping[func_name] = compile_expression(func_config["expression"])
         elif func_config["type"] == "function_reference":
             # Get function from module globals
             module_func_name = func_config["module_function"]
@@ -405,6 +434,18 @@ def load_arithmetic_config_from_json(json_file_path: str, function_mapping_file:
             "function": function_mapping[node_info["function_name"]],
             "edges_to": node_info["edges_to"]
         }
+
+        # Mark identity nodes so optimizer passes can elide them. They run as no_update:
+        # returning the whole state would re-apply the reducers (e.g. double the messages).
+        if is_pass_through(node_config["function"]):
+            node_config["function"] = no_update
+            node_config["pass_through"] = True
+        if function_mapping_config[node_info["function_name"]].get("pure"):
+            node_config["pure"] = True
+        # Declared read/write sets override the ones graph_dependencies infers from the source
+        for key in ("reads", "writes"):
+            if key in function_mapping_config[node_info["function_name"]]:
+                node_config[key] = function_mapping_config[node_info["function_name"]][key]
         
         # Add conditional edges if present
         if "conditional_edges" in node_info:
@@ -413,6 +454,8 @@ def load_arithmetic_config_from_json(json_file_path: str, function_mapping_file:
         # Add router function if present
         if "router_function_name" in node_info:
             node_config["router_function"] = function_mapping[node_info["router_function_name"]]
+            if "reads" in function_mapping_config[node_info["router_function_name"]]:
+                node_config["router_reads"] = function_mapping_config[node_info["router_function_name"]]["reads"]
         
         config["nodes"][node_name] = node_config
     
@@ -426,40 +469,252 @@ def create_graph_from_json_config(json_file_path: str, state_schema, function_ma
     :param json_file_path: Path to the JSON configuration file
     :param state_schema: The state schema to use (e.g., AgentState)
     :param function_mapping_file: Optional path to separate function mapping JSON file
-    :return: Compiled StateGraph ready for execution
+    :return: Compiled StateGraph ready for execution (shared with other callers using the same config)
+    """
+    return graph_registry.get(json_file_path, state_schema, function_mapping_file)
+
+
+# Compiled apps keyed by config content; see graph_registry.GraphRegistry
+graph_registry = GraphRegistry(resolve_arithmetic_config, build_graph_from_config,
+                               optimize_config=optimize_graph_config,
+                               parallelize_config=parallelize_config,
+                               validate_config=validate_arithmetic_config)
+
+
+BATCH_INPUT_FIELDS = ('operation', 'operation2', 'number1', 'number2', 'number3', 'number4')
+
+def _operation_masks(operations: np.ndarray, field: str) -> tuple:
+    """
+    Vectorized equivalent of router_node/router_node2: one boolean mask per branch.
     """
-    config = load_arithmetic_config_from_json(json_file_path, function_mapping_file)
-    graph = build_graph_from_config(config, state_schema)
-    return graph.compile()
+    import numpy as np
 
+    add_mask = operations == '+'
+    sub_mask = operations == '-'
+    unknown = np.flatnonzero(~(add_mask | sub_mask))
+    if unknown.size:
+        raise ValueError(f"Unknown {field} at records {unknown.tolist()[:10]}. Use '+' or '-'.")
+    return add_mask, sub_mask
+
+def _validate_records(states, columnar: bool, validate_input) -> None:
+    """
+    Run validate_input on each record of a list or columnar batch, naming the failing record.
+    """
+    from graph_validator import StateValidationError
+
+    if columnar:
+        # Plain Python values, so numpy integers are checked like the ints app3.invoke receives
+        values = {name: column.tolist() if hasattr(column, 'tolist') else list(column)
+                  for name, column in states.items()}
+        count = max((len(column) for column in values.values()), default=0)
+        records = ({name: column[i] if i < len(column) else None for name, column in values.items()}
+                   for i in range(count))
+    else:
+        records = states
+    for i, record in enumerate(records):
+        try:
+            validate_input(record)
+        except StateValidationError as exc:
+            raise StateValidationError(f"Record {i}: {exc}") from None
+
+
+# Operands below this magnitude have int64 sums and differences
+_INT64_SAFE = 2 ** 62
+
+def _number_columns(columns: dict, fields: tuple) -> list:
+    """
+    Operand columns for exact arithmetic: int64 arrays when every value is an int whose sums and
+    differences fit, otherwise object arrays of the Python values, computed as app3.invoke does.
+    """
+    import numpy as np
+
+    arrays = [np.asarray(columns[f]) for f in fields]
+    if all(a.dtype.kind == 'i' and (a.size == 0 or (a.min() > -_INT64_SAFE and a.max() < _INT64_SAFE))
+           for a in arrays):
+        return arrays
+    values = [columns[f].tolist() if hasattr(columns[f], 'tolist') else list(columns[f]) for f in fields]
+    objects = []
+    for column in values:
+        array = np.empty(len(column), dtype=object)
+        array[:] = column
+        objects.append(array)
+    return objects
+
+def _masked(add_mask: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    a + b where add_mask is set and a - b elsewhere, computing each row's branch only.
+    """
+    import numpy as np
+
+    result = np.empty(len(a), dtype=np.result_type(a, b))
+    sub_mask = ~add_mask
+    result[add_mask] = a[add_mask] + b[add_mask]
+    result[sub_mask] = a[sub_mask] - b[sub_mask]
+    return result
+
+def invoke_batch(states, validate_input):
+    """
+    Run the config-driven arithmetic graph (router -> adder/subtractor -> router2 -> adder2/subtractor2)
+    over a whole batch at once instead of one app3.invoke per record.
 
+    :param states: Either a list of AgentState dicts (or compact states), a columnar dict mapping
+                   number1..number4, operation and operation2 (and optionally messages) to
+                   equal-length arrays, or a compact_state.StateBatch
+    :param validate_input: Boundary check run on every record before any arithmetic, normally the
+                           input validator of the app the batch stands in for (app.validate_input
+                           of a ValidatedGraph, so records are accepted and rejected exactly as by
+                           app.invoke); raises StateValidationError. None if the app has none.
+    :return: A list of result states for list input, a columnar dict with final_number,
+             final_number2 and messages added for columnar input, or a StateBatch for a
+             StateBatch. Values match app3.invoke per record.
+    """
+    import numpy as np
+
+    if isinstance(states, StateBatch):
+        return StateBatch(states.schema, invoke_batch(states.columns, validate_input))
+
+    columnar = isinstance(states, dict)
+    if validate_input is not None:
+        _validate_records(states, columnar, validate_input)
+    if columnar:
+        columns = states
+    else:
+        columns = {}
+        for field in BATCH_INPUT_FIELDS:
+            if not all(field in state for state in states):
+                raise ValueError(f"State must contain '{field}'.")
+            columns[field] = [state[field] for state in states]
+        columns['messages'] = [state.get('messages', []) for state in states]
+
+    missing = [field for field in BATCH_INPUT_FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f"Batch must contain columns {missing}.")
+
+    number1, number2, number3, number4 = _number_columns(columns, ('number1', 'number2', 'number3', 'number4'))
+    add_mask, _ = _operation_masks(np.asarray(columns['operation']), 'operation')
+    add_mask2, _ = _operation_masks(np.asarray(columns['operation2']), 'operation2')
+
+    # adder/subtractor and adder2/subtractor2 as masked array arithmetic
+    final_number = _masked(add_mask, number1, number2)
+    final_number2 = _masked(add_mask2, number3, number4)
+
+    # Messages are strings, so they are formatted per record from plain Python scalars
+    # to get exactly the same text as the per-record nodes.
+    n1, n2, n3, n4 = number1.tolist(), number2.tolist(), number3.tolist(), number4.tolist()
+    f1, f2 = final_number.tolist(), final_number2.tolist()
+    previous = columns.get('messages')
+    if previous is None:
+        previous = [[] for _ in f1]
+    messages = []
+    for i, prior in enumerate(previous):
+        if add_mask[i]:
+            first = ADD_MESSAGE.format(n1[i], n2[i], f1[i])
+        else:
+            first = SUBTRACT_MESSAGE.format(n2[i], n1[i], f1[i])
+        if add_mask2[i]:
+            second = ADD_MESSAGE.format(n3[i], n4[i], f1[i])
+        else:
+            second = SUBTRACT_MESSAGE.format(n3[i], n4[i], f2[i])
+        messages.append(list(prior) + [first, second])
+
+    if columnar:
+        result = dict(columns)
+        result['final_number'] = final_number
+        result['final_number2'] = final_number2
+        result['messages'] = messages
+        return result
+
+    return [
+        {**state, 'final_number': f1[i], 'final_number2': f2[i], 'messages': messages[i]}
+        for i, state in enumerate(states)
+    ]
+
+
+
+DEFAULT_CONFIG_FILE = 'config.json'
+
+def resolve_config_paths(config_file: str = DEFAULT_CONFIG_FILE) -> tuple:
+    """
+    Read the top-level config file and return (graph_nodes_file, function_mapping_file).
+
+    :param config_file: Path to the top-level config (config.json)
+    :return: Paths to the graph nodes JSON and the separate function mapping JSON
+    """
+    with open(config_file, 'r') as f:
+        config = json.load(f)
+
+    # config_path is relative to the directory holding config.json
+    json_path = os.path.join(os.path.dirname(config_file), config.get('config_path'))
+    graph_nodes_config_file = json_path + config.get('graph_nodes', 'graph_nodes.json')
+    function_mapping_file = json_path + config.get('function_mapping', 'function_mapping.json')  # Only needed if you have a separate function mapping file
+    return graph_nodes_config_file, function_mapping_file
+
+def load_app3(config_file: str = DEFAULT_CONFIG_FILE, optimize: bool = False, compact: bool = False,
+              parallel: bool = False):
+    """
+    Return the compiled config-based arithmetic graph (graph3), compiled on first use.
+
+    :param config_file: Path to the top-level config (config.json)
+    :param optimize: Run graph_optimizer passes (router fusion, chain merging) before building
+    :param compact: Use the slotted compact_state.CompactAgentState instead of the AgentState dict
+    :param parallel: Run independent stages as parallel branches (graph_dependencies); the config
+                     is kept sequential when the analysis finds a dependency
+    :return: Compiled StateGraph for AgentState
+    """
+    return load_app3_with_report(config_file, optimize=optimize, compact=compact, parallel=parallel)[0]
+
+def load_app3_with_report(config_file: str = DEFAULT_CONFIG_FILE, optimize: bool = False,
+                          compact: bool = False, parallel: bool = False) -> tuple:
+    """
+    Like load_app3, but return (app, report) where report is the optimize/parallelize report
+    of that app's build (None when neither is requested).
+    """
+    graph_nodes_config_file, _ = resolve_config_paths(config_file)
+    # The function mapping is integrated in graph_nodes.json; pass function_mapping_file
+    # to graph_registry.get_with_report if you keep it in a separate file.
+    state_schema = CompactAgentState if compact else AgentState
+    return graph_registry.get_with_report(graph_nodes_config_file, state_schema,
+                                          optimize=optimize, parallel=parallel)
+
+def main(argv: List[str] = None) -> None:
+    """
+    Command line entry point: render and run the config-based graph, then exercise V.
+    """
+    parser = argparse.ArgumentParser(description="Run the config-based arithmetic LangGraph examples.")
+    parser.add_argument('--config', default=DEFAULT_CONFIG_FILE, help="Top-level config file (default: config.json)")
+    parser.add_argument('--no-render', action='store_true', help="Skip writing graph visualizations")
+    parser.add_argument('--skip-exercise', action='store_true', help="Only run the config-based graph")
+    parser.add_argument('--optimize', action='store_true', help="Fuse pass-through routers and pure node chains")
+    parser.add_argument('--compact-state', action='store_true', help="Run graph3 on the slotted compact state")
+    parser.add_argument('--parallel', action='store_true', help="Run independent stages as parallel branches")
+    args = parser.parse_args(argv)
 
-# -- New nodes for arithmetic operations loaded from JSON
-with open('config.json', 'r') as f:
-    config = json.load(f)
+    # -- New nodes for arithmetic operations loaded from JSON
+    app3, report = load_app3_with_report(args.config, optimize=args.optimize, compact=args.compact_state,
+                                         parallel=args.parallel)
+    if args.optimize:
+        print(f"Optimized graph3: {format_report(report)}")
+    if args.parallel:
+        print(f"Parallelized graph3: {format_parallel_report(report)}")
+    if not args.no_render:
+        create_graph_image(app3, 'Config_based_arithmetic_operations_visualization.svg')
 
-json_path = config.get('config_path')
-graph_nodes_config_file = json_path + config.get('graph_nodes', 'graph_nodes.json')
-function_mapping_file = json_path + config.get('function_mapping', 'function_mapping.json')  # Only needed if you have a separate function mapping file
-# Load the arithmetic nodes configuration from JSON                                          # If so, then pass function_mapping_file to load function.   
-graph_nodes_config = load_arithmetic_config_from_json(graph_nodes_config_file)        
+    # Test both graphs with the same input
+    test_input = AgentState(operation='+', operation2='+',
+                            number1=10, number2=5,
+                            number3=7, number4=3,
+                            final_number=0, final_number2=0,
+                            messages=[])
 
-# Test the config-based graph creation
-graph3 = build_graph_from_config(graph_nodes_config, AgentState)
-app3 = graph3.compile()
-create_graph_png(app3, 'Config_based_arithmetic_operations_visualization.png')
+    print("\n=== Config-based Graph (graph3) Results ===")
+    result2 = app3.invoke(test_input)
+    print_graph_result_config(result2)
 
-# Test both graphs with the same input
-test_input = AgentState(operation='+', operation2='+',
-                        number1=10, number2=5, 
-                        number3=7, number4=3, 
-                        final_number=0,final_number2=0, 
-                         messages=[])
+    if not args.skip_exercise:
+        ## Now run exercise V
+        result = run_graph_exerciseV(AgentStateV(name="Alice", number=[], counter=-1), render=not args.no_render)
+        print(result)
 
-print("\n=== Config-based Graph (graph3) Results ===")
-result2 = app3.invoke(test_input)
-print_graph_result_config(result2)
 
-## Now run exercise V
-result = run_graph_exerciseV(AgentStateV(name="Alice", number=[], counter=-1))
-print(result)
+if __name__ == "__main__":
+    main()
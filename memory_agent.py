@@ -1,9 +1,13 @@
 from typing import TypedDict, List, Union
+import os
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, START, END
 from dotenv import load_dotenv
+from checkpoint_store import get_checkpointer
+from history import DEFAULT_TOKEN_BUDGET, HistoryManager, create_summarizer, format_history_stats
+from llm_cache import format_cache_stats
+from model_provider import get_chat_model
+from transcript_store import DEFAULT_DIRECTORY, TranscriptStore
 
 load_dotenv()
 
@@ -13,57 +17,100 @@ class AgentState(TypedDict):
     tool_calls: List[str]
     tool_results: List[str]
     
-#llm = ChatOpenAI(model="gpt-4o", temperature=0.0, max_retries=3)
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro")
+# Gemini by default; LLM_PROVIDER=openai switches to ChatOpenAI(model="gpt-4o"), and
+# LLM_MODE=record/replay/fake records, replays or fakes the model (see model_provider).
+llm = None
+
+def get_llm():
+    """
+    Create the chat model on first use.
+    """
+    global llm
+    if llm is None:
+        llm = get_chat_model()
+    return llm
+
+# Only the pinned messages, a rolling summary and the latest turns that fit
+# MEMORY_TOKEN_BUDGET are sent to the model (see history).
+history = None
+
+def get_history() -> HistoryManager:
+    """
+    Create the history manager (and its summarizer model) on first use.
+    """
+    global history
+    if history is None:
+        budget = int(os.environ.get('MEMORY_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET))
+        history = HistoryManager(token_budget=budget, summarizer=create_summarizer())
+    return history
 
 
 def process(state: AgentState) -> AgentState:
     """
     Process the agent state by sending messages to the LLM and updating the state.
     """
-    # Prepare the messages for the LLM
-    messages = state['messages']
+    # Prepare the messages for the LLM: pinned messages, summary and recent window
+    messages = get_history().prepare(state['messages'])
+    print(format_history_stats(get_history().last_turn))
     
     # Send messages to the LLM
-    response = llm.invoke(messages)
+    response = get_llm().invoke(messages)
     
     print(f"LLM Full Response: {response}\n\n")
-    # Update the state with the LLM's response
-    state['messages'].append(AIMessage(content=response.content))
+    # Return the LLM's response as a new state (the caller's message list is left untouched)
+    messages = state['messages'] + [AIMessage(content=response.content)]
     print(f"\nI: {response.content}\n")
-    print(f"CURRENT STATE: {state['messages']}\n")
+    print(f"CURRENT STATE: {messages}\n")
     
-    return state    
-
-def write_history():
-        # Save the conversation history to a file
-    with open("conversation_history.txt", "a") as f:
-        for message in conversation_history:
-            if isinstance(message, HumanMessage):
-                f.write(f"You: {message.content}\n")
-            elif isinstance(message, AIMessage):
-                f.write(f"AI: {message.content}\n")
-        f.write("\n")
+    return {"messages": messages}
 
 graph = StateGraph(AgentState)
 graph.add_node("process", process)
 graph.add_edge(START, "process")
 graph.add_edge("process", END)  # Final state, no processing needed
-agent = graph.compile()
+# CHECKPOINT_DB persists each session's graph state between runs (see checkpoint_store)
+agent = graph.compile(checkpointer=get_checkpointer())
 
-conversation_history = []
+# Every turn is streamed to an append-only transcript as it happens (see transcript_store);
+# MEMORY_SESSION names the session to resume.
+RESUME_MESSAGES = 50
 
-user_input = input("You: ")
-while user_input.lower() != "exit":
-    # Append the user's message to the conversation history
-    conversation_history.append(HumanMessage(content=user_input ))
-    #result = agent.invoke({"messages": conversation_history})
-    result = agent.invoke({"messages": conversation_history})
-    # Append the LLM's response to the conversation history
-    conversation_history.append(AIMessage(content=result['messages'][-1].content))
-    print(f"AI: {result['messages'][-1].content}")
-    user_input = input("You: ")
-    
+def main():
+    session = os.environ.get('MEMORY_SESSION', 'default')
+    store = TranscriptStore(os.environ.get('MEMORY_TRANSCRIPTS', DEFAULT_DIRECTORY))
+    # Only the messages the history manager still needs are kept in memory
+    conversation_history = store.messages(session, last=RESUME_MESSAGES)
+    if conversation_history:
+        print(f"Resumed session '{session}' ({store.message_count(session)} messages)")
+
+    try:
+        user_input = input("You: ")
+        while user_input.lower() != "exit":
+            # Append the user's message to the conversation history; "/pin ..." keeps it in every prompt
+            if user_input.startswith("/pin "):
+                message = get_history().pin(HumanMessage(content=user_input[len("/pin "):]))
+            else:
+                message = HumanMessage(content=user_input )
+            conversation_history.append(message)
+            store.append(session, message)
+            result = agent.invoke({"messages": conversation_history}, {"configurable": {"thread_id": session}})
+            # Append the LLM's response to the conversation history
+            reply = AIMessage(content=result['messages'][-1].content)
+            conversation_history.append(reply)
+            store.append(session, reply)
+            store.end_turn()
+            conversation_history = get_history().compact(conversation_history)
+            print(f"AI: {reply.content}")
+            user_input = input("You: ")
+    finally:
+        store.close()
 
-write_history()
+    if history is not None and history.turns:
+        stats = history.stats()
+        print(f"History: saved {stats['saved_tokens']} of {stats['full_tokens']} prompt tokens "
+              f"({stats['saved_ratio']:.0%}) over {stats['turns']} turns")
+    if hasattr(llm, "cache_stats"):
+        print(format_cache_stats(llm.cache_stats()))
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Pluggable chat model provider for the agents (ReAct.py, Drafter.py, memory_agent.py).
+
+The mode is chosen by argument or the LLM_MODE environment variable:
+
+* live    - the real provider model (Gemini by default, LLM_PROVIDER=openai for ChatOpenAI)
+* record  - the live model, with every request/response appended to a JSONL recording
+* replay  - responses served from a recording with configurable synthetic latency; no network
+* fake    - a scripted fake_llm.FakeChatModel; no network and no recording needed
+
+Any mode can additionally be wrapped in an exact-match response cache (llm_cache) by passing
+cache=<sqlite path> or setting LLM_CACHE.
+
+Recordings are keyed by a hash of the normalized request (message types, contents, tool calls
+and bound tool names, ignoring generated ids), so a replayed conversation gets exactly the
+responses the live model gave for the same conversation.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+MODES = ('live', 'record', 'replay', 'fake')
+DEFAULT_PROVIDER = 'google'
+DEFAULT_MODELS = {'google': 'gemini-2.5-pro', 'openai': 'gpt-4o'}
+# Cheaper models for housekeeping calls such as history summarization
+CHEAP_MODELS = {'google': 'gemini-2.5-flash', 'openai': 'gpt-4o-mini'}
+DEFAULT_RECORDING = 'llm_recording.jsonl'
+
+
+def _tool_names(tools) -> List[str]:
+    return sorted(getattr(t, 'name', None) or getattr(t, '__name__', str(t)) for t in tools or [])
+
+
+def normalize_messages(messages: List[BaseMessage]) -> list:
+    """
+    Reduce messages to what determines the model's answer: type, content, tool call names
+    and arguments. Generated ids are dropped so recordings match across runs.
+    """
+    normalized = []
+    for message in messages:
+        entry = {"type": message.type, "content": message.content}
+        if getattr(message, 'tool_calls', None):
+            entry["tool_calls"] = [{"name": tc["name"], "args": tc["args"]} for tc in message.tool_calls]
+        if message.type == 'tool':
+            entry["name"] = message.name
+        normalized.append(entry)
+    return normalized
+
+
+def request_key(messages: List[BaseMessage], tool_names: List[str] = ()) -> str:
+    """
+    Stable hash of a chat request: normalized messages plus the names of the bound tools.
+    """
+    payload = json.dumps({"messages": normalize_messages(messages), "tools": list(tool_names)},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _model_layers(model) -> list:
+    # A wrapped, tool-bound model: CachedChatModel/RecordingChatModel wrap `inner`, bind_tools bindings wrap `bound`
+    layers = []
+    while model is not None:
+        layers.append(model)
+        model = getattr(model, 'inner', None) or getattr(model, 'bound', None)
+    return layers
+
+
+def model_identity(model) -> str:
+    """
+    Stable description of a chat model: the class and model name of each wrapper layer and the
+    tools bound to it, so caches keyed on requests do not mix answers from different models.
+    """
+    layers = []
+    for layer in _model_layers(model):
+        bound_tools = (getattr(layer, 'kwargs', None) or {}).get('tools') if hasattr(layer, 'bound') else None
+        layers.append({"class": type(layer).__name__,
+                       "model": getattr(layer, 'model', None) or getattr(layer, 'model_name', None),
+                       "tools": bound_tools or getattr(layer, 'schemas', None) or getattr(layer, 'tool_names', None)})
+    return json.dumps(layers, sort_keys=True, default=str)
+
+
+def is_recording(model) -> bool:
+    """
+    True if any layer of the model is a RecordingChatModel (record mode).
+    """
+    return any(isinstance(layer, RecordingChatModel) for layer in _model_layers(model))
+
+
+class RecordingChatModel(BaseChatModel):
+    """
+    Wraps a live chat model and appends each request key and response to a JSONL file.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Any
+    path: str = DEFAULT_RECORDING
+    tool_names: List[str] = []
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording-chat-model"
+
+    def bind_tools(self, tools, **kwargs) -> "RecordingChatModel":
+        return RecordingChatModel(inner=self.inner.bind_tools(tools, **kwargs), path=self.path,
+                                  tool_names=_tool_names(tools))
+
+    def _record(self, messages: List[BaseMessage], response: AIMessage, elapsed: float) -> None:
+        line = json.dumps({"key": request_key(messages, self.tool_names), "elapsed": elapsed,
+                           "response": message_to_dict(response)})
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + "\n")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs) -> ChatResult:
+        start = time.perf_counter()
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._record(messages, response, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs) -> ChatResult:
+        start = time.perf_counter()
+        response = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self._record(messages, response, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+
+def load_recording(path: str) -> Dict[str, list]:
+    """
+    Load a JSONL recording into {request key: [(response message, recorded seconds), ...]}.
+    """
+    recordings: Dict[str, list] = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            message = messages_from_dict([entry["response"]])[0]
+            recordings.setdefault(entry["key"], []).append((message, entry.get("elapsed", 0.0)))
+    return recordings
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Serves recorded responses by request key, sleeping for a synthetic latency first.
+
+    latency/latency_jitter give a fixed delay plus uniform jitter in seconds; with
+    use_recorded_latency the delay recorded for each response is replayed instead,
+    multiplied by latency_scale. Requests that were never recorded raise KeyError.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    recordings: Dict[str, list]
+    tool_names: List[str] = []
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    use_recorded_latency: bool = False
+    latency_scale: float = 1.0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ReplayChatModel":
+        return cls(recordings=load_recording(path), **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat-model"
+
+    def bind_tools(self, tools, **kwargs) -> "ReplayChatModel":
+        return self.model_copy(update={"tool_names": _tool_names(tools)})
+
+    def _lookup(self, messages: List[BaseMessage]) -> tuple:
+        key = request_key(messages, self.tool_names)
+        if key not in self.recordings:
+            raise KeyError(f"No recorded response for request {key[:12]} "
+                           f"(last message: {messages[-1].content!r:.80})")
+        # Identical requests always get the first recorded answer, keeping replays deterministic.
+        message, recorded = self.recordings[key][0]
+        return message, self._delay(recorded)
+
+    def _delay(self, recorded: float) -> float:
+        if self.use_recorded_latency:
+            return recorded * self.latency_scale
+        jitter = random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0
+        return self.latency + jitter
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs) -> ChatResult:
+        message, delay = self._lookup(messages)
+        if delay:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message.model_copy(update={"id": None}))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs) -> ChatResult:
+        message, delay = self._lookup(messages)
+        if delay:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=message.model_copy(update={"id": None}))])
+
+
+def create_live_model(provider: str = None, model_name: str = None) -> BaseChatModel:
+    """
+    Create the real provider chat model (imported lazily so offline modes need no provider package).
+    """
+    provider = provider or os.environ.get('LLM_PROVIDER', DEFAULT_PROVIDER)
+    model_name = model_name or os.environ.get('LLM_MODEL') or DEFAULT_MODELS.get(provider)
+    if provider == 'google':
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model=model_name)
+    if provider == 'openai':
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(model=model_name, temperature=0.0, max_retries=3)
+    raise ValueError(f"Unknown LLM provider '{provider}'. Use 'google' or 'openai'.")
+
+
+def get_chat_model(tools: list = None, mode: str = None, fake_script: Callable = None,
+                   recording_path: str = None, latency: float = None, cache: str = None, **kwargs):
+    """
+    Return a chat model for the requested mode, with tools bound if given.
+
+    :param tools: Tools to bind
+    :param mode: live, record, replay or fake (default: LLM_MODE or live)
+    :param fake_script: Script for fake mode (messages -> AIMessage)
+    :param recording_path: JSONL recording for record/replay (default: LLM_RECORDING)
+    :param latency: Synthetic latency in seconds for replay/fake (default: LLM_REPLAY_LATENCY)
+    :param cache: SQLite path for the response cache (default: LLM_CACHE; unset disables caching)
+    :param kwargs: Extra ReplayChatModel options (latency_jitter, use_recorded_latency, ...)
+                   or provider/model_name for live and record modes
+    :return: Chat model (a Runnable accepting a list of messages)
+    """
+    mode = mode or os.environ.get('LLM_MODE', 'live')
+    recording_path = recording_path or os.environ.get('LLM_RECORDING', DEFAULT_RECORDING)
+    if latency is None:
+        latency = float(os.environ.get('LLM_REPLAY_LATENCY', 0.0))
+
+    # provider/model_name only select the live model; the offline modes ignore them.
+    live_options = {k: kwargs.pop(k) for k in ('provider', 'model_name') if k in kwargs}
+    if mode == 'live':
+        model = create_live_model(**live_options)
+    elif mode == 'record':
+        model = RecordingChatModel(inner=create_live_model(**live_options), path=recording_path)
+    elif mode == 'replay':
+        model = ReplayChatModel.from_file(recording_path, latency=latency, **kwargs)
+    elif mode == 'fake':
+        from fake_llm import FakeChatModel, echo_script
+        model = FakeChatModel(script=fake_script or echo_script, latency=latency)
+    else:
+        raise ValueError(f"Unknown LLM mode '{mode}'. Use one of {', '.join(MODES)}.")
+
+    cache = cache or os.environ.get('LLM_CACHE')
+    if cache:
+        from llm_cache import CachedChatModel
+        model = CachedChatModel.wrap(model, path=cache)
+
+    return model.bind_tools(tools) if tools else model
@@ -0,0 +1,135 @@
+"""
+Multi-process execution of config-driven graphs.
+
+The arithmetic nodes are CPU-bound Python, so threads serialize on the GIL. run_many shards
+the inputs across a process pool instead. Only the config path and the input/output dicts
+cross process boundaries: each worker compiles the graph once from the JSON config in its
+initializer (the config names every function, so nothing unpicklable is sent).
+
+Inputs are consumed lazily in chunks and at most `max_in_flight` chunks are queued at any
+time, so memory stays flat however long the input iterator is.
+
+    from parallel import run_many
+    for result in run_many('config.json', records, workers=8):
+        ...
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Iterable, Iterator, List, Optional
+import itertools
+import json
+import os
+
+DEFAULT_CHUNKSIZE = 256
+
+# The compiled graph of this worker process, set by _init_worker
+_worker_app = None
+
+
+def resolve_graph_nodes_file(config_path: str) -> str:
+    """
+    Accept either a graph nodes JSON (with "nodes") or a top-level config like config.json.
+    """
+    import main
+
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    if "nodes" in config:
+        return config_path
+    graph_nodes_file, _ = main.resolve_config_paths(config_path)
+    return graph_nodes_file
+
+
+def _init_worker(graph_nodes_file: str, optimize: bool, compact: bool) -> None:
+    global _worker_app
+    import main
+
+    state_schema = main.CompactAgentState if compact else main.AgentState
+    _worker_app = main.graph_registry.get(graph_nodes_file, state_schema, optimize=optimize)
+
+
+def _run_chunk(start: int, records: List[dict], return_exceptions: bool, vectorized: bool = False) -> tuple:
+    if vectorized:
+        import main
+
+        try:
+            return start, main.invoke_batch(records, getattr(_worker_app, 'validate_input', None))
+        except ValueError:
+            # One bad record fails the whole vectorized chunk; rerun it per record to isolate it
+            pass
+    results = []
+    for record in records:
+        try:
+            results.append(_worker_app.invoke(record))
+        except Exception as exc:
+            if not return_exceptions:
+                raise
+            results.append(exc)
+    return start, results
+
+
+def _available_cpus() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _chunks(inputs: Iterable[dict], chunksize: int) -> Iterator[tuple]:
+    iterator = iter(inputs)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def run_many(config_path: str, inputs: Iterable[dict], workers: Optional[int] = None,
+             chunksize: int = DEFAULT_CHUNKSIZE, ordered: bool = True, max_in_flight: Optional[int] = None,
+             optimize: bool = False, compact: bool = False, return_exceptions: bool = False,
+             vectorized: bool = False) -> Iterator[Any]:
+    """
+    Invoke the config-driven graph on every input across a process pool.
+
+    :param config_path: Graph nodes JSON, or a top-level config such as config.json
+    :param inputs: Iterable of input state dicts (consumed lazily)
+    :param workers: Number of worker processes (default: CPUs available to this process)
+    :param chunksize: Records sent to a worker at a time
+    :param ordered: Yield results in input order; otherwise yield (index, result) as chunks complete
+    :param max_in_flight: Maximum chunks queued or running (default: 2 per worker)
+    :param optimize: Build the graph with graph_optimizer passes
+    :param compact: Use compact_state.CompactAgentState as the state schema
+    :param return_exceptions: Yield a failing record's exception instead of raising it
+    :param vectorized: Run each chunk with main.invoke_batch (graph3 topology only); a chunk with
+                       a bad record is rerun per record
+    :return: Iterator of result states (or (index, result) pairs when ordered=False)
+    """
+    workers = workers or _available_cpus()
+    max_in_flight = max_in_flight or 2 * workers
+    graph_nodes_file = resolve_graph_nodes_file(config_path)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(graph_nodes_file, optimize, compact)) as pool:
+        chunks = _chunks(inputs, chunksize)
+        pending = {}
+        for start, chunk in itertools.islice(chunks, max_in_flight):
+            pending[start] = pool.submit(_run_chunk, start, chunk, return_exceptions, vectorized)
+
+        if ordered:
+            # Chunks are submitted in input order, so the smallest pending start is next.
+            while pending:
+                start = min(pending)
+                _, results = pending.pop(start).result()
+                for start_next, chunk in itertools.islice(chunks, 1):
+                    pending[start_next] = pool.submit(_run_chunk, start_next, chunk, return_exceptions, vectorized)
+                yield from results
+        else:
+            futures = {future: start for start, future in pending.items()}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    futures.pop(future)
+                    start, results = future.result()
+                    for start_next, chunk in itertools.islice(chunks, 1):
+                        futures[pool.submit(_run_chunk, start_next, chunk, return_exceptions, vectorized)] = start_next
+                    yield from enumerate(results, start)
@@ -0,0 +1,289 @@
+"""
+Streaming file pipeline for the config-driven arithmetic graph (graph3).
+
+Records are read lazily from JSONL or CSV (optionally through mmap), validated against the
+"required_state_fields" of the graph nodes JSON, run through the compiled graph in
+micro-batches and written to the output file batch by batch, so memory stays constant
+however large the input is.
+
+Fields listed in "state_defaults" (the result fields and messages) may be left out of the
+input. The type of each field is taken from the prefix of its description
+("String: ...", "Integer: ...", "List[str]: ..."); CSV values are converted accordingly, and
+"field_values" restricts the allowed values (see graph_validator.InputValidator).
+
+Usage:
+    python pipeline.py input.jsonl output.jsonl [--config config.json] [--batch-size 256]
+                       [--workers 4] [--mmap] [--vectorized] [--errors errors.jsonl]
+"""
+from collections import deque
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import itertools
+import json
+import mmap
+import os
+import sys
+import time
+
+from graph_validator import InputValidator
+
+DEFAULT_BATCH_SIZE = 256
+MAX_ERROR_SAMPLES = 10
+
+def _format_of(path: str) -> str:
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def _lines(path: str, use_mmap: bool) -> Iterator[str]:
+    with open(path, 'rb') as f:
+        if not use_mmap or os.fstat(f.fileno()).st_size == 0:
+            for line in f:
+                yield line.decode('utf-8')
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b''):
+                yield line.decode('utf-8')
+
+
+def read_records(path: str, fmt: str = None, use_mmap: bool = False) -> Iterator[Tuple[int, Any]]:
+    """
+    Lazily read records from a JSONL or CSV file.
+
+    :param path: Input file
+    :param fmt: 'jsonl' or 'csv' (default: from the file extension)
+    :param use_mmap: Read the file through mmap instead of buffered reads
+    :return: Iterator of (record index, dict); a line that cannot be parsed yields its ValueError
+    """
+    fmt = fmt or _format_of(path)
+    lines = _lines(path, use_mmap)
+    if fmt == 'csv':
+        for index, row in enumerate(csv.DictReader(lines)):
+            yield index, row
+        return
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except ValueError as exc:
+            yield index, ValueError(f"Invalid JSON: {exc}")
+        index += 1
+
+
+def load_input_validator(graph_nodes_file: str) -> InputValidator:
+    """
+    Read the input contract (required_state_fields, state_defaults, field_values) of a graph nodes JSON.
+    """
+    with open(graph_nodes_file, 'r') as f:
+        return InputValidator(json.load(f))
+
+
+def _coerce(name: str, value: Any, expected: Optional[type]) -> Any:
+    if expected is None or (isinstance(value, expected) and not isinstance(value, bool)):
+        return value
+    if isinstance(value, str):
+        # CSV cells are always strings
+        if expected is int:
+            try:
+                return int(value)
+            except ValueError:
+                pass
+        elif expected is list:
+            try:
+                parsed = json.loads(value) if value else []
+            except ValueError:
+                parsed = None
+            if isinstance(parsed, list):
+                return parsed
+    raise ValueError(f"Field '{name}' must be {expected.__name__}, got {value!r}.")
+
+
+def validate_record(record: Any, validator: InputValidator) -> dict:
+    """
+    Check a record against the graph's input contract and build the input state.
+
+    :param record: Parsed input record
+    :param validator: Input validator from load_input_validator
+    :return: State dict with defaults filled in and values converted to the declared types
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"Record must be an object, got {type(record).__name__}.")
+    state = {}
+    for name, (expected, has_default, default) in validator.spec.items():
+        value = record.get(name)
+        if value is None or value == '':
+            if not has_default:
+                raise ValueError(f"Missing required field '{name}'.")
+            # Copy so records never share a mutable default (e.g. messages)
+            state[name] = json.loads(json.dumps(default))
+            continue
+        state[name] = _coerce(name, value, expected)
+    validator(state)
+    return state
+
+
+def _invoke_each(app, states: List[dict]) -> List[Any]:
+    results = []
+    for state in states:
+        try:
+            results.append(app.invoke(state))
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+def _invoke_vectorized(app, states: List[dict]) -> List[Any]:
+    import main
+
+    try:
+        return main.invoke_batch(states, getattr(app, 'validate_input', None))
+    except ValueError:
+        # One bad record fails the whole vectorized batch; rerun it per record to isolate it
+        return _invoke_each(app, states)
+
+
+class _Writer:
+    """
+    Writes result states as JSONL or CSV (list fields JSON-encoded).
+    """
+
+    def __init__(self, path: str, fields: List[str]):
+        self.fmt = _format_of(path)
+        self.file = open(path, 'w', newline='')
+        self.fields = fields
+        self.csv = None
+        if self.fmt == 'csv':
+            self.csv = csv.DictWriter(self.file, fieldnames=fields, extrasaction='ignore')
+            self.csv.writeheader()
+
+    def write(self, state: dict) -> None:
+        if self.csv is None:
+            self.file.write(json.dumps(state) + '\n')
+            return
+        self.csv.writerow({k: json.dumps(v) if isinstance(v, list) else v for k, v in state.items()})
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def run_pipeline(input_path: str, output_path: str, config_file: str = 'config.json',
+                 batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 1, use_mmap: bool = False,
+                 vectorized: bool = False, errors_path: str = None, optimize: bool = False) -> dict:
+    """
+    Validate, run and write every record of input_path with constant memory.
+
+    :param input_path: JSONL or CSV input
+    :param output_path: JSONL or CSV output (format from the extension), in input order
+    :param config_file: Top-level config or graph nodes JSON
+    :param batch_size: Records per micro-batch (and per run_many chunk)
+    :param workers: More than 1 runs the batches on a parallel.run_many process pool
+    :param use_mmap: Read the input through mmap
+    :param vectorized: Run each micro-batch with main.invoke_batch (graph3 topology only)
+    :param errors_path: Optional JSONL file receiving {"index", "stage", "error", "record"}
+    :param optimize: Build the graph with graph_optimizer passes
+    :return: Report with counts, throughput and the first error messages
+    """
+    import main
+    from parallel import resolve_graph_nodes_file, run_many
+
+    graph_nodes_file = resolve_graph_nodes_file(config_file)
+    validator = load_input_validator(graph_nodes_file)
+    report = {"records": 0, "succeeded": 0, "invalid": 0, "failed": 0, "error_samples": []}
+    writer = _Writer(output_path, list(validator.spec))
+    errors = open(errors_path, 'w') if errors_path else None
+
+    def record_error(index, stage, exc, record):
+        report[stage] += 1
+        # Graph failures can carry bare messages (a KeyError from an unknown branch), so name the type
+        message = str(exc) if stage == "invalid" else f"{type(exc).__name__}: {exc}"
+        if len(report["error_samples"]) < MAX_ERROR_SAMPLES:
+            report["error_samples"].append(f"record {index}: {message}")
+        if errors is not None:
+            errors.write(json.dumps({"index": index, "stage": stage, "error": message, "record": record},
+                                    default=str) + '\n')
+
+    def valid_states():
+        # Yields (index, state) for valid records; invalid ones are reported and skipped
+        for index, record in read_records(input_path, use_mmap=use_mmap):
+            report["records"] += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                yield index, validate_record(record, validator)
+            except ValueError as exc:
+                record_error(index, "invalid", exc, None if isinstance(record, Exception) else record)
+
+    def handle(index, state, result):
+        if isinstance(result, Exception):
+            record_error(index, "failed", result, state)
+        else:
+            writer.write(result)
+            report["succeeded"] += 1
+
+    start = time.perf_counter()
+    try:
+        if workers > 1:
+            # run_many reads ahead by at most its in-flight chunks, so the pending
+            # (index, state) pairs stay bounded as well.
+            pending = deque()
+            def states():
+                for index, state in valid_states():
+                    pending.append((index, state))
+                    yield state
+            for result in run_many(config_file, states(), workers=workers, chunksize=batch_size,
+                                   optimize=optimize, return_exceptions=True, vectorized=vectorized):
+                handle(*pending.popleft(), result)
+        else:
+            app = main.graph_registry.get(graph_nodes_file, main.AgentState, optimize=optimize)
+            invoke = _invoke_vectorized if vectorized else _invoke_each
+            for batch in _batches(valid_states(), batch_size):
+                states = [state for _, state in batch]
+                for (index, state), result in zip(batch, invoke(app, states)):
+                    handle(index, state, result)
+                writer.file.flush()
+    finally:
+        writer.close()
+        if errors is not None:
+            errors.close()
+
+    elapsed = time.perf_counter() - start
+    report["elapsed_s"] = elapsed
+    report["records_per_s"] = report["records"] / elapsed if elapsed else 0.0
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stream JSONL/CSV records through the config-based arithmetic graph.")
+    parser.add_argument('input', help="Input .jsonl or .csv")
+    parser.add_argument('output', help="Output .jsonl or .csv")
+    parser.add_argument('--config', default='config.json', help="Top-level config or graph nodes JSON")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (parallel.run_many)")
+    parser.add_argument('--mmap', action='store_true', help="Read the input through mmap")
+    parser.add_argument('--vectorized', action='store_true', help="Run micro-batches with main.invoke_batch")
+    parser.add_argument('--optimize', action='store_true', help="Fuse pass-through routers and pure node chains")
+    parser.add_argument('--errors', help="Write rejected and failed records to this JSONL file")
+    args = parser.parse_args(argv)
+
+    report = run_pipeline(args.input, args.output, args.config, args.batch_size, args.workers,
+                          args.mmap, args.vectorized, args.errors, args.optimize)
+    print(f"{report['records']} records in {report['elapsed_s']:.2f} s ({report['records_per_s']:.0f} records/s)")
+    print(f"succeeded {report['succeeded']}, invalid {report['invalid']}, failed {report['failed']}")
+    for sample in report["error_samples"]:
+        print(f"  {sample}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The modules live at the repository root
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def repo_root(monkeypatch):
+    """
+    Run the test from the repository root, where config.json and its relative paths resolve.
+    """
+    monkeypatch.chdir(ROOT)
+    return ROOT
@@ -0,0 +1,85 @@
+import pytest
+
+from document_buffer import PatchError, PieceTable, apply_edits, prompt_view, split_lines
+
+
+def _edit(text, *operations):
+    buffer = PieceTable(text)
+    apply_edits(buffer, operations)
+    return buffer.text()
+
+
+def test_lines_split_on_newline_only():
+    text = "one\ftwo\nthree\rfour five\nsix"
+    buffer = PieceTable(text)
+    assert buffer.lines() == ["one\ftwo", "three\rfour five", "six"]
+    assert len(buffer.lines()) == buffer.line_count()
+    assert split_lines("") == [] and split_lines("a\n") == ["a"]
+
+
+def test_line_numbers_shown_match_the_lines_edited():
+    text = "a\fb\nc\rd\ne\n"
+    view = prompt_view(PieceTable(text))
+    assert "    2| c\rd" in view
+    assert _edit(text, {"op": "replace", "start_line": 2, "text": "C\n"}) == "a\fb\nC\ne\n"
+
+
+def test_hunk_matches_lines_with_other_line_breaks():
+    text = "a\fb\nc\nd\n"
+    patch = "@@ -2,1 +2,1 @@\n-c\n+C\n"
+    assert _edit(text, {"op": "diff", "patch": patch}) == "a\fb\nC\nd\n"
+
+
+def test_diff_honors_no_newline_at_end_of_file():
+    text = "one\ntwo"
+    patch = "@@ -2 +2 @@\n-two\n\\ No newline at end of file\n+TWO\n\\ No newline at end of file\n"
+    assert _edit(text, {"op": "diff", "patch": patch}) == "one\nTWO"
+
+
+def test_diff_can_add_the_final_newline():
+    patch = "@@ -2 +2 @@\n-two\n\\ No newline at end of file\n+two\n"
+    assert _edit("one\ntwo", {"op": "diff", "patch": patch}) == "one\ntwo\n"
+
+
+def test_diff_can_remove_the_final_newline():
+    patch = "@@ -2 +2 @@\n-two\n+two\n\\ No newline at end of file\n"
+    assert _edit("one\ntwo\n", {"op": "diff", "patch": patch}) == "one\ntwo"
+
+
+def test_replace_without_text_is_rejected():
+    buffer = PieceTable("a\nb\n")
+    with pytest.raises(PatchError):
+        apply_edits(buffer, [{"op": "replace", "start_line": 1}])
+    assert buffer.text() == "a\nb\n"
+
+
+def test_operations_refer_to_the_original_line_numbers():
+    text = "a\nb\nc\nd\ne\n"
+    result = _edit(text,
+                   {"op": "delete", "start_line": 2},
+                   {"op": "insert", "after_line": 0, "text": "top\n"},
+                   {"op": "replace", "start_line": 4, "end_line": 5, "text": "D\nE\nF\n"},
+                   {"op": "diff", "patch": "@@ -3,1 +3,1 @@\n-c\n+C\n"})
+    assert result == "top\na\nC\nD\nE\nF\n"
+
+
+def test_diff_hunk_with_context_moves_to_the_matching_lines():
+    patch = "@@ -1,3 +1,3 @@\n b\n-c\n+C\n d\n"
+    assert _edit("a\nb\nc\nd\n", {"op": "diff", "patch": patch}) == "a\nb\nC\nd\n"
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "replace", "start_line": 1, "end_line": 2, "text": "x\n"},
+     {"op": "delete", "start_line": 2}],
+    [{"op": "delete", "start_line": 4}],
+    [{"op": "insert", "after_line": 9, "text": "x\n"}],
+    [{"op": "diff", "patch": "@@ -2,1 +2,1 @@\n-nope\n+x\n"}],
+    [{"op": "diff", "patch": "-b\n+x\n"}],
+    [{"op": "move", "start_line": 1}],
+    [{"op": "replace", "start_line": 1, "text": "A\n"}, {"op": "delete", "start_line": 7}],
+])
+def test_invalid_operations_leave_the_buffer_unchanged(operations):
+    buffer = PieceTable("a\nb\nc\n")
+    with pytest.raises(PatchError):
+        apply_edits(buffer, operations)
+    assert buffer.text() == "a\nb\nc\n"
@@ -0,0 +1,103 @@
+import re
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.types import Command
+
+import Drafter
+from fake_llm import FakeChatModel, drafter_script
+
+
+def _turn_then_reply(*calls):
+    """
+    Script issuing all `calls` in one AI message, then a plain reply once they have run.
+    """
+    def script(messages):
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content="Done.")
+        return AIMessage(content="", tool_calls=[
+            {"name": name, "args": args, "id": f"call_{i}", "type": "tool_call"}
+            for i, (name, args) in enumerate(calls)])
+    return script
+
+
+def _run(script, **state):
+    app = Drafter.build_app(FakeChatModel(script=script))
+    config = {"configurable": {"thread_id": "test"}}
+    return app.invoke({"messages": [HumanMessage(content="Go.")], **state}, config)
+
+
+def test_two_edits_in_one_turn_apply_in_order():
+    script = _turn_then_reply(
+        ("edit", {"operations": [{"op": "replace", "start_line": 1, "text": "A\n"}]}),
+        ("edit", {"operations": [{"op": "insert", "after_line": 3, "text": "d\n"}]}))
+    result = _run(script, document_content="a\nb\nc\n")
+    assert result["document_content"] == "A\nb\nc\nd\n"
+
+
+def test_update_and_edit_in_one_turn():
+    script = _turn_then_reply(
+        ("update", {"content": "one\ntwo\n"}),
+        ("edit", {"operations": [{"op": "delete", "start_line": 2}]}))
+    result = _run(script)
+    assert result["document_content"] == "one\n"
+
+
+def test_update_and_save_in_one_turn_saves_the_new_document(tmp_path):
+    path = tmp_path / "note.txt"
+    script = _turn_then_reply(("update", {"content": "hello\n"}), ("save", {"filename": str(path)}))
+    result = _run(script)
+    assert path.read_text() == "hello\n"
+    assert result["document_content"] == "hello\n"
+    assert "__interrupt__" not in result
+
+
+def test_edits_across_turns_and_save(tmp_path):
+    path = tmp_path / "report.txt"
+    lines = [f"Line {n}." for n in range(1, 201)]
+    instruction = re.compile(r"Replace line (\d+) with: (.*)")
+
+    def script(messages):
+        # Edit the line named in the latest request; save when asked to
+        text = next(m.content for m in reversed(messages) if isinstance(m, HumanMessage))
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content="Done.")
+        match = instruction.match(text)
+        if match:
+            operation = {"op": "replace", "start_line": int(match.group(1)), "text": match.group(2)}
+            return AIMessage(content="", tool_calls=[{"name": "edit", "args": {"operations": [operation]},
+                                                      "id": f"call_{len(messages)}", "type": "tool_call"}])
+        return AIMessage(content="", tool_calls=[{"name": "save", "args": {"filename": str(path)},
+                                                  "id": "call_save", "type": "tool_call"}])
+
+    app = Drafter.build_app(FakeChatModel(script=script))
+    config = {"configurable": {"thread_id": "edits"}}
+    targets = [150, 3, 77, 200]
+    result = app.invoke({"messages": [HumanMessage(content=f"Replace line {targets[0]} with: New {targets[0]}.")],
+                         "document_content": "\n".join(lines) + "\n"}, config)
+    for n in targets[1:]:
+        result = app.invoke(Command(resume=f"Replace line {n} with: New {n}."), config)
+    result = app.invoke(Command(resume="Save it."), config)
+
+    for n in targets:
+        lines[n - 1] = f"New {n}."
+    expected = "\n".join(lines) + "\n"
+    assert result["document_content"] == expected
+    assert path.read_text() == expected
+
+
+def test_rejected_edit_leaves_the_document_unchanged():
+    script = _turn_then_reply(
+        ("edit", {"operations": [{"op": "replace", "start_line": 1, "end_line": 2, "text": "x\n"},
+                                 {"op": "delete", "start_line": 2}]}))
+    result = _run(script, document_content="a\nb\nc\n")
+    assert result["document_content"] == "a\nb\nc\n"
+    reply = next(m for m in result["messages"] if isinstance(m, ToolMessage))
+    assert reply.content.startswith("Edits rejected, the document is unchanged: Edits overlap")
+
+
+def test_scripted_session_does_not_write_to_the_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = Drafter.build_app(FakeChatModel(script=drafter_script))
+    result = Drafter.run_scripted_session(app, "scripted", ["Write a note.", "Looks good."])
+    assert result["document_content"] == "Draft: Write a note."
+    assert list(tmp_path.iterdir()) == []
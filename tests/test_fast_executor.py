@@ -0,0 +1,17 @@
+import random
+
+import pytest
+
+import main
+from fast_executor import check_equivalence, load_fast_app3
+
+
+@pytest.mark.parametrize("optimize", [False, True])
+def test_fast_executor_matches_app3(repo_root, optimize):
+    # Random inputs, invalid operators included: both sides must fail on the same ones
+    rng = random.Random(42)
+    states = [dict(operation=rng.choice('+-*'), operation2=rng.choice('+-'),
+                   number1=rng.randint(-99, 99), number2=rng.randint(-99, 99),
+                   number3=rng.randint(-99, 99), number4=rng.randint(-99, 99), messages=[])
+              for _ in range(1000)]
+    assert check_equivalence(load_fast_app3(optimize=optimize), main.load_app3(), states) == []
@@ -0,0 +1,14 @@
+import main
+
+
+def test_cached_app_keeps_its_own_report(repo_root):
+    optimized, optimize_report = main.load_app3_with_report(optimize=True)
+    _, parallel_report = main.load_app3_with_report(parallel=True)
+    assert optimize_report is not None and parallel_report is not None
+    assert optimize_report is not parallel_report
+
+    # A cache hit after another graph was built returns the report of the cached build
+    again, report = main.load_app3_with_report(optimize=True)
+    assert again is optimized
+    assert report is optimize_report
+    assert main.load_app3_with_report()[1] is None
@@ -0,0 +1,41 @@
+from langchain_core.messages import AIMessage, HumanMessage, message_to_dict, messages_from_dict
+
+from history import HistoryManager
+from transcript_store import TranscriptStore
+
+
+def _conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages += [HumanMessage(content=f"question {i} " * 20), AIMessage(content=f"answer {i} " * 20)]
+    return messages
+
+
+def test_pin_survives_serialization_and_a_new_manager():
+    note = HistoryManager().pin(HumanMessage(content="My name is Ada."))
+    messages = [note] + _conversation(30)
+    restored = messages_from_dict([message_to_dict(m) for m in messages])
+
+    # A fresh manager, as after a restart, still keeps the pinned message in every prompt
+    history = HistoryManager(token_budget=300)
+    prompt = history.prepare(restored)
+    assert prompt[0].content == "My name is Ada."
+    assert history.is_pinned(restored[0]) and not history.is_pinned(restored[1])
+
+
+def test_pin_survives_the_transcript_store(tmp_path):
+    with TranscriptStore(str(tmp_path)) as store:
+        store.append("s", HistoryManager().pin(HumanMessage(content="Remember this.")))
+        store.append("s", AIMessage(content="Noted."))
+    with TranscriptStore(str(tmp_path)) as store:
+        resumed = store.messages("s")
+    history = HistoryManager()
+    assert [history.is_pinned(m) for m in resumed] == [True, False]
+
+
+def test_compact_keeps_pinned_messages():
+    history = HistoryManager(token_budget=300)
+    messages = [history.pin(HumanMessage(content="keep"))] + _conversation(30)
+    history.prepare(messages)
+    compacted = history.compact(messages)
+    assert compacted[0].content == "keep" and len(compacted) < len(messages)
@@ -0,0 +1,7 @@
+from benchmarks import DEFAULT_IMPORT_BUDGET, measure_import_time
+
+
+def test_import_main_is_light(repo_root):
+    result = measure_import_time('main', runs=3)
+    assert result["heavy_modules"] == []
+    assert result["median"] <= DEFAULT_IMPORT_BUDGET
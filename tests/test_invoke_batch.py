@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import main
+from graph_validator import StateValidationError
+
+
+@pytest.fixture
+def app3(repo_root):
+    return main.load_app3()
+
+
+def _state(number1, number2, number3, number4, operation='+', operation2='-'):
+    return {'operation': operation, 'operation2': operation2,
+            'number1': number1, 'number2': number2, 'number3': number3, 'number4': number4}
+
+
+def _expected(app3, states):
+    results = [app3.invoke(dict(state)) for state in states]
+    return [(r['final_number'], r['final_number2'], r['messages']) for r in results]
+
+
+CASES = {
+    "small": [_state(1, 2, 5, 3), _state(7, 3, 1, 1, '-', '+'), _state(-4, 9, 0, -2, '-', '-')],
+    # Sums past int64 must not wrap
+    "large": [_state(2 ** 62, 2 ** 62, -2 ** 63, 1), _state(2 ** 63 - 1, 1, 2 ** 63, -5, '-', '+')],
+    # int64 overflow mixed with negatives must not turn every value into a float
+    "mixed": [_state(2 ** 63, 1, 3, 4), _state(-1, 1, -7, 2, "-", "-")],
+    "huge": [_state(10 ** 30, -10 ** 30, 0, 0), _state(3, 4, 5, 6)],
+}
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_list_batch_matches_invoke(app3, case):
+    states = CASES[case]
+    results = main.invoke_batch(states, app3.validate_input)
+    assert [(r['final_number'], r['final_number2'], r['messages']) for r in results] == _expected(app3, states)
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_columnar_batch_matches_invoke(app3, case):
+    states = CASES[case]
+    columns = {field: [state[field] for state in states] for field in main.BATCH_INPUT_FIELDS}
+    result = main.invoke_batch(columns, app3.validate_input)
+    batch = list(zip(np.asarray(result['final_number']).tolist(), np.asarray(result['final_number2']).tolist(),
+                     result['messages']))
+    assert batch == _expected(app3, states)
+
+
+def test_invalid_record_is_rejected_like_invoke(app3):
+    bad = _state('7', 1, 2, 3)
+    with pytest.raises(StateValidationError):
+        app3.invoke(dict(bad))
+    with pytest.raises(StateValidationError, match="Record 1"):
+        main.invoke_batch([_state(1, 2, 3, 4), bad], app3.validate_input)
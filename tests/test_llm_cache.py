@@ -0,0 +1,37 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+import llm_cache
+from fake_llm import FakeChatModel
+
+
+def _counting_model(tmp_path):
+    calls = []
+
+    def script(messages):
+        calls.append(messages)
+        return AIMessage(content=f"reply {len(calls)}")
+    return llm_cache.CachedChatModel.wrap(FakeChatModel(script=script), path=str(tmp_path / "cache.db")), calls
+
+
+def test_stop_sequences_are_part_of_the_key(tmp_path):
+    model, calls = _counting_model(tmp_path)
+    assert model.invoke("hi").content == model.invoke("hi").content
+    assert model.invoke("hi", stop=["x"]).content != model.invoke("hi").content
+    assert len(calls) == 2 and model.cache_stats()["hits"] == 2
+
+
+def test_prefix_counts_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "MAX_TRACKED_PREFIXES", 8)
+    model, _ = _counting_model(tmp_path)
+    for i in range(50):
+        model.invoke([SystemMessage(content=f"prompt {i}"), HumanMessage(content="hi")])
+    assert model.cache_stats()["distinct_prefixes"] == 8
+
+
+def test_repeated_prefix_reaches_the_hook(tmp_path):
+    seen = []
+    model, _ = _counting_model(tmp_path)
+    model.on_stable_prefix = lambda fingerprint, system: seen.append(system[0].content)
+    for question in ("a", "b", "c"):
+        model.invoke([SystemMessage(content="shared"), HumanMessage(content=question)])
+    assert seen == ["shared"]
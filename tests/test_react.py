@@ -0,0 +1,40 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+import ReAct
+from fake_llm import FakeChatModel, react_script
+from llm_cache import tool_schemas
+
+
+def _operand_types(tool_list):
+    return {schema["function"]["name"]: schema["function"]["parameters"]["properties"]["a"]
+            for schema in tool_schemas(tool_list)}
+
+
+def test_sync_app_tools_take_ints_only():
+    assert all(prop == {"type": "integer"} for prop in _operand_types(ReAct.tools).values())
+
+
+def test_reference_tools_document_result_references():
+    for prop in _operand_types(ReAct.create_reference_tools()).values():
+        assert {"type": "string"} in prop["anyOf"] and "$N" in prop["description"]
+
+
+def test_sync_app_runs_scripted_turns():
+    app = ReAct.build_app(FakeChatModel(script=react_script), cache_turns=False)
+    result = app.invoke({"messages": [("user", "Add 40 + 12")]})
+    assert result["messages"][-1].content == "Results: add=52"
+
+
+def test_async_app_resolves_result_references():
+    def script(history):
+        if not isinstance(history[-1], ToolMessage):
+            return AIMessage(content="", tool_calls=[
+                {"name": "add", "args": {"a": 4, "b": 21}, "id": "call_add", "type": "tool_call"},
+                {"name": "subtract", "args": {"a": "$1", "b": 5}, "id": "call_sub", "type": "tool_call"}])
+        return AIMessage(content=", ".join(m.content for m in history if isinstance(m, ToolMessage)))
+
+    app = ReAct.build_async_app(FakeChatModel(script=script), cache_turns=False)
+    result = asyncio.run(app.ainvoke({"messages": [("user", "Add 4 + 21, then subtract 5.")]}))
+    assert result["messages"][-1].content == "25, 20"
@@ -0,0 +1,22 @@
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("router, field", [
+    (main.router_node, 'operation'), (main.router_node2, 'operation2'),
+    (main.decide_next_node, 'operation'), (main.decide_next_node2, 'operation2'),
+])
+def test_routers_reject_unknown_operators(router, field):
+    assert router({field: '+'}).startswith("addition_operation")
+    assert router({field: '-'}).startswith("subtraction_operation")
+    with pytest.raises(ValueError):
+        router({field: '*'})
+
+
+def test_unvalidated_graph_does_not_subtract_for_unknown_operator(repo_root):
+    # The compiled graph without the ValidatedGraph boundary check
+    app = main.load_app3().app
+    state = {'operation': '*', 'operation2': '+', 'number1': 6, 'number2': 7, 'number3': 1, 'number4': 2}
+    with pytest.raises(ValueError, match="Unknown operation"):
+        app.invoke(state)
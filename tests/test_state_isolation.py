@@ -0,0 +1,23 @@
+import contextlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("name, shared_input, field", [
+    ("graph3", dict(operation='+', operation2='-', number1=10, number2=5, number3=7, number4=3,
+                    final_number=0, final_number2=0, messages=[]), 'messages'),
+    ("exerciseV", dict(name="Alice", number=[], counter=-1), 'number'),
+])
+def test_concurrent_invocations_share_no_lists(repo_root, name, shared_input, field):
+    # Every invocation starts from the same input dict
+    app = main.load_app3() if name == "graph3" else main.build_graph_exerciseV()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: app.invoke(shared_input), range(200)))
+    assert shared_input[field] == []
+    ids = {id(result[field]) for result in results}
+    assert len(ids) == len(results)
+    assert id(shared_input[field]) not in ids
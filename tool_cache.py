@@ -0,0 +1,171 @@
+"""
+Memoization for pure tools and deterministic assistant turns.
+
+memoize_tool caches a tool function's results keyed by its canonicalized arguments; put it
+under @tool so the tool schema is still derived from the original signature:
+
+    @tool
+    @memoize_tool(maxsize=4096, ttl=600)
+    def add(a: int, b: int) -> int:
+        ...
+
+TurnCache stores the model's reply to a conversation whose last turn only called memoized
+tools. Such a turn is fully determined by the conversation so far, so replaying the same
+conversation can skip the follow-up model round-trip.
+"""
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Iterable, List, Optional
+import inspect
+import json
+import threading
+import time
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live and hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        :param maxsize: Maximum number of entries
+        :param ttl: Seconds an entry stays valid (None for no expiry)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._data[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """
+        Return hit/miss/eviction counters, hit rate and current size.
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0, "size": len(self._data)}
+
+
+def canonical_key(value: Any) -> str:
+    """
+    Canonical text form of an argument structure: dict keys sorted, tuples treated as lists.
+    """
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=repr)
+
+
+def memoize_tool(maxsize: int = 1024, ttl: Optional[float] = None) -> Callable:
+    """
+    Decorator caching a pure function's results by its canonicalized arguments.
+    The wrapped function exposes the cache as `.cache` and is marked `.pure = True`.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        cache = LRUCache(maxsize, ttl)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = canonical_key(bound.arguments)
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(*args, **kwargs)
+                cache.put(key, result)
+            return result
+
+        wrapper.cache = cache
+        wrapper.pure = True
+        return wrapper
+    return decorator
+
+
+def is_memoized(tool) -> bool:
+    """
+    True for tools (or functions) wrapped with memoize_tool.
+    """
+    return getattr(getattr(tool, 'func', tool), 'pure', False)
+
+
+def tool_cache_stats(tools: Iterable) -> dict:
+    """
+    Return {tool name: cache stats} for the memoized tools among `tools`.
+    """
+    return {t.name: t.func.cache.stats() for t in tools if is_memoized(t)}
+
+
+class TurnCache:
+    """
+    Cache of model replies for conversations whose last turn only called memoized tools.
+    """
+
+    def __init__(self, pure_tool_names: Iterable[str], maxsize: int = 1024, ttl: Optional[float] = None,
+                 scope: str = ""):
+        """
+        :param pure_tool_names: Names of the memoized tools
+        :param maxsize: Maximum number of cached replies
+        :param ttl: Seconds a reply stays valid (None for no expiry)
+        :param scope: What else determines the reply (model identity, tool schemas); part of every key
+        """
+        self.pure_tool_names = set(pure_tool_names)
+        self.scope = scope
+        self.cache = LRUCache(maxsize, ttl)
+
+    def is_deterministic(self, messages: List) -> bool:
+        """
+        True if the conversation ends with tool results whose calls all went to memoized tools.
+        """
+        if not messages or getattr(messages[-1], 'type', None) != 'tool':
+            return False
+        for message in reversed(messages):
+            if getattr(message, 'type', None) == 'ai':
+                calls = getattr(message, 'tool_calls', None) or []
+                return bool(calls) and all(c["name"] in self.pure_tool_names for c in calls)
+        return False
+
+    def _key(self, messages: List) -> str:
+        from model_provider import request_key
+        # The scope is hashed along with the messages, in place of the bound tool names
+        return request_key(messages, [self.scope])
+
+    def get(self, messages: List):
+        """
+        Return the cached reply for this conversation, or None.
+        """
+        if not self.is_deterministic(messages):
+            return None
+        reply = self.cache.get(self._key(messages))
+        return reply.model_copy(update={"id": None}) if reply is not None else None
+
+    def put(self, messages: List, reply) -> None:
+        if self.is_deterministic(messages):
+            self.cache.put(self._key(messages), reply)
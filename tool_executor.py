@@ -0,0 +1,138 @@
+"""
+Async tool execution node that runs independent tool calls concurrently.
+
+A model turn often contains several tool calls that do not depend on each other (e.g. two
+`add` calls and a `subtract`). ConcurrentToolExecutor starts all of them at once, bounded by
+a semaphore, so the turn takes as long as its slowest call instead of the sum of all calls.
+
+A call only waits for another call if it consumes that call's result. Earlier calls of the
+same turn are referenced by their 1-based position, which the model knows (tool call ids are
+often assigned after the model has answered), or by their tool call id:
+
+- an argument whose whole value is "$N" (or "$<tool_call_id>") is replaced by that call's result;
+- "{$N}" (or "{<tool_call_id>}") inside a string argument is replaced by the result's text.
+
+RESULT_REFERENCE_PROMPT tells the model about this; tools must accept a string for arguments
+that can take a reference (see ReAct.py).
+"""
+from typing import Any, Dict, List
+import asyncio
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+
+RESULT_REFERENCE_PROMPT = ("Tool calls you make in one turn run concurrently. To pass the result of an earlier "
+                           "call of the same turn to another call, use \"$N\" as the argument value, where N is "
+                           "the position (1, 2, ...) of the earlier call in your list of tool calls.")
+
+
+def _reference_names(tool_calls: List[dict], position: int) -> Dict[str, str]:
+    """
+    Return {reference name: tool_call_id} of the calls before position: their ids and 1-based positions.
+    """
+    names = {}
+    for index, call in enumerate(tool_calls[:position], 1):
+        names[call["id"]] = call["id"]
+        names[str(index)] = call["id"]
+    return names
+
+
+def _references(value: str, names: Dict[str, str]) -> set:
+    if value.startswith("$") and value[1:] in names:
+        return {names[value[1:]]}
+    # Bare "{N}" is ordinary text; positions are only references as "{$N}"
+    return {call_id for name, call_id in names.items()
+            if f"{{${name}}}" in value or (name == call_id and f"{{{name}}}" in value)}
+
+
+def call_dependencies(tool_calls: List[dict]) -> Dict[str, set]:
+    """
+    Return {tool_call_id: ids of earlier calls whose results it consumes}.
+    """
+    dependencies = {}
+    for position, call in enumerate(tool_calls):
+        names = _reference_names(tool_calls, position)
+        needed = set()
+        for value in call["args"].values():
+            if isinstance(value, str):
+                needed |= _references(value, names)
+        dependencies[call["id"]] = needed
+    return dependencies
+
+
+def _resolve_args(args: dict, names: Dict[str, str], results: Dict[str, Any]) -> dict:
+    resolved = {}
+    for key, value in args.items():
+        if isinstance(value, str):
+            if value.startswith("$") and names.get(value[1:]) in results:
+                value = results[names[value[1:]]]
+            else:
+                for name, call_id in names.items():
+                    if call_id in results:
+                        value = value.replace(f"{{${name}}}", str(results[call_id]))
+                        if name == call_id:
+                            value = value.replace(f"{{{name}}}", str(results[call_id]))
+        resolved[key] = value
+    return resolved
+
+
+class ConcurrentToolExecutor:
+    """
+    Graph node executing the last AIMessage's tool calls concurrently (see module docstring).
+    Returns ToolMessages in the order the calls were made.
+    """
+
+    def __init__(self, tools: list, max_concurrency: int = 8):
+        """
+        :param tools: LangChain tools available to the model
+        :param max_concurrency: Maximum number of tool calls running at the same time
+        """
+        self.tools_by_name = {t.name: t for t in tools}
+        self.max_concurrency = max_concurrency
+
+    async def _run_call(self, call: dict, args: dict, semaphore: asyncio.Semaphore) -> Any:
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            raise ValueError(f"Unknown tool '{call['name']}'. Available: {', '.join(self.tools_by_name)}")
+        async with semaphore:
+            return await tool.ainvoke(args)
+
+    async def execute(self, tool_calls: List[dict]) -> List[ToolMessage]:
+        """
+        Run the tool calls, serializing only calls that consume earlier results.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        dependencies = call_dependencies(tool_calls)
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run(position, call):
+            needed = dependencies[call["id"]]
+            if needed:
+                await asyncio.gather(*(tasks[d] for d in needed), return_exceptions=True)
+                failed = sorted(d for d in needed if d not in results)
+                if failed:
+                    raise ValueError(f"Depends on failed tool calls {failed}")
+            args = _resolve_args(call["args"], _reference_names(tool_calls, position), results)
+            result = await self._run_call(call, args, semaphore)
+            results[call["id"]] = result
+            return result
+
+        for position, call in enumerate(tool_calls):
+            tasks[call["id"]] = asyncio.ensure_future(run(position, call))
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        messages = []
+        for call, outcome in zip(tool_calls, outcomes):
+            if isinstance(outcome, Exception):
+                messages.append(ToolMessage(content=f"Error: {outcome!r}\n Please fix your mistakes.",
+                                            name=call["name"], tool_call_id=call["id"], status="error"))
+            else:
+                messages.append(ToolMessage(content=str(outcome), name=call["name"], tool_call_id=call["id"]))
+        return messages
+
+    async def __call__(self, state: dict) -> dict:
+        last_message = state["messages"][-1]
+        if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+            return {"messages": []}
+        return {"messages": await self.execute(last_message.tool_calls)}
@@ -0,0 +1,337 @@
+"""
+Append-only, crash-safe transcript store for chat sessions.
+
+Every message is appended as one JSON line to the active segment file
+(<directory>/segment-<n>.jsonl) as soon as it happens. Writes are buffered and made durable
+in batches: the segment is fsync'ed once `batch_size` records are pending or `sync_interval`
+seconds have passed at the next append, so a crash loses at most one batch rather than the
+whole session. Callers that go idle after a turn (a REPL waiting for input) call end_turn()
+so the turn's last records do not wait in the buffer for the next append.
+Segments are rotated at `segment_bytes`.
+
+Each record stores the location (segment, offset) of the previous record of the same session,
+and index.json keeps the location of every session's last record. Resuming a session is a
+dictionary lookup plus one seek per message read; the index is rewritten at every sync and
+only the segment bytes written after it are rescanned when a store is reopened after a crash.
+Segments are read through mmap.
+
+compact() rewrites the sealed segments into one, dropping the records of deleted sessions.
+"""
+from typing import Dict, Iterator, List, Optional
+import argparse
+import json
+import mmap
+import os
+import time
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+DEFAULT_DIRECTORY = 'transcripts'
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024
+INDEX_FILE = 'index.json'
+
+
+def _segment_name(number: int) -> str:
+    return f"segment-{number:06d}.jsonl"
+
+
+def _segment_number(name: str) -> int:
+    return int(name[len("segment-"):-len(".jsonl")])
+
+
+def _write_json_atomic(path: str, payload: dict) -> None:
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class TranscriptStore:
+    """
+    Segmented JSONL transcript of many sessions (see module docstring).
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 batch_size: int = 32, sync_interval: float = 1.0):
+        """
+        :param directory: Directory holding the segments and index
+        :param segment_bytes: Size at which the active segment is sealed and a new one started
+        :param batch_size: Pending records that force a sync
+        :param sync_interval: Seconds after which pending records are synced (0 syncs every append)
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.sessions: Dict[str, dict] = {}
+        self.syncs = 0
+        self._segments: List[str] = []
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    # -- opening and recovery -------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _open(self) -> None:
+        index_path = self._path(INDEX_FILE)
+        index = {"segments": {}, "sessions": {}}
+        if os.path.exists(index_path):
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+        indexed = index["segments"]
+
+        # A compaction that crashed before its index was written leaves a .tmp segment behind;
+        # one that crashed after it is finished here.
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name.endswith(".jsonl.tmp"):
+                final = name[:-len(".tmp")]
+                if final in indexed and not os.path.exists(self._path(final)):
+                    os.replace(self._path(name), self._path(final))
+                else:
+                    os.remove(self._path(name))
+
+        on_disk = sorted((n for n in os.listdir(self.directory)
+                          if n.startswith("segment-") and n.endswith(".jsonl")), key=_segment_number)
+        newest_indexed = max((_segment_number(n) for n in indexed), default=0)
+        self._segments = []
+        for name in on_disk:
+            if name not in indexed and _segment_number(name) < newest_indexed:
+                os.remove(self._path(name))    # replaced by a finished compaction
+            else:
+                self._segments.append(name)
+
+        self.sessions = index["sessions"]
+        # Only bytes written after the last index sync need to be scanned.
+        for name in self._segments:
+            self._scan(name, indexed.get(name, 0))
+
+        if not self._segments:
+            self._segments.append(_segment_name(1))
+        self._active = open(self._path(self._segments[-1]), 'ab')
+
+    def _scan(self, name: str, start: int) -> None:
+        with open(self._path(name), 'r+b') as f:
+            f.seek(start)
+            offset = start
+            for line in iter(f.readline, b""):
+                if not line.endswith(b"\n"):
+                    # Torn write at the crash point: drop it.
+                    f.truncate(offset)
+                    break
+                record = json.loads(line)
+                self.sessions[record["s"]] = {"segment": name, "offset": offset, "seq": record["n"]}
+                offset += len(line)
+
+    # -- writing --------------------------------------------------------------
+
+    def append(self, session: str, message: BaseMessage) -> int:
+        """
+        Append a message to a session and return its sequence number in the session.
+        """
+        tail = self.sessions.get(session)
+        seq = tail["seq"] + 1 if tail else 0
+        record = {"s": session, "n": seq, "t": time.time(),
+                  "p": [tail["segment"], tail["offset"]] if tail else None,
+                  "m": message_to_dict(message)}
+        line = (json.dumps(record, separators=(',', ':')) + "\n").encode()
+        name = self._segments[-1]
+        offset = self._active.tell()
+        self._active.write(line)
+        self.sessions[session] = {"segment": name, "offset": offset, "seq": seq}
+        self._pending += 1
+        if (self._pending >= self.batch_size
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+        if offset + len(line) >= self.segment_bytes:
+            self._rotate()
+        return seq
+
+    def sync(self) -> None:
+        """
+        Make every appended record durable and write the index.
+        """
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._write_index()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self.syncs += 1
+
+    def end_turn(self) -> None:
+        """
+        Sync the records still pending at the end of a turn; the interval check in append()
+        only runs when the next record arrives, which may be long after the session went idle.
+        """
+        if self._pending:
+            self.sync()
+
+    def _write_index(self, sizes: Optional[Dict[str, int]] = None) -> None:
+        segments = sizes or {name: os.path.getsize(self._path(name)) for name in self._segments}
+        _write_json_atomic(self._path(INDEX_FILE), {"segments": segments, "sessions": self.sessions})
+
+    def _rotate(self) -> None:
+        self.sync()
+        self._active.close()
+        self._segments.append(_segment_name(_segment_number(self._segments[-1]) + 1))
+        self._active = open(self._path(self._segments[-1]), 'ab')
+        self._write_index()
+
+    def delete_session(self, session: str) -> None:
+        """
+        Forget a session; its records are dropped by the next compact().
+        """
+        if self.sessions.pop(session, None) is not None:
+            self.sync()
+
+    def close(self) -> None:
+        self.sync()
+        self._active.close()
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+    def __enter__(self) -> "TranscriptStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # -- reading --------------------------------------------------------------
+
+    def _map(self, name: str) -> Optional[mmap.mmap]:
+        if name == self._segments[-1]:
+            # The active segment grows: flush the write buffer and map its current size.
+            self._active.flush()
+            mapped = self._maps.pop(name, None)
+            if mapped is not None:
+                mapped.close()
+        elif name in self._maps:
+            return self._maps[name]
+        with open(self._path(name), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[name] = mapped
+        return mapped
+
+    def _record_at(self, name: str, offset: int) -> dict:
+        mapped = self._map(name)
+        end = mapped.find(b"\n", offset)
+        return json.loads(mapped[offset:end])
+
+    def _walk(self, session: str) -> Iterator[dict]:
+        for _, record in self._chain(session):
+            yield record
+
+    def _locations(self, session: str) -> Iterator[tuple]:
+        for location, _ in self._chain(session):
+            yield location
+
+    def _chain(self, session: str) -> Iterator[tuple]:
+        # Newest to oldest, following each record's pointer to the session's previous record.
+        tail = self.sessions.get(session)
+        location = (tail["segment"], tail["offset"]) if tail else None
+        while location is not None:
+            record = self._record_at(*location)
+            yield location, record
+            location = tuple(record["p"]) if record["p"] is not None else None
+
+    def messages(self, session: str, last: Optional[int] = None) -> List[BaseMessage]:
+        """
+        Return the session's messages in order; with `last`, only the newest `last` messages.
+        """
+        records = []
+        for record in self._walk(session):
+            if last is not None and len(records) >= last:
+                break
+            records.append(record["m"])
+        return messages_from_dict(records[::-1])
+
+    def message_count(self, session: str) -> int:
+        tail = self.sessions.get(session)
+        return tail["seq"] + 1 if tail else 0
+
+    # -- compaction -----------------------------------------------------------
+
+    def compact(self) -> dict:
+        """
+        Rewrite all sealed segments into one, keeping only records still reachable from a
+        session's last record. The active segment is sealed first so every record's
+        previous-record pointer can be remapped. Returns bytes before and after.
+        """
+        self._rotate()
+        live = set()
+        for session in self.sessions:
+            for location in self._locations(session):
+                live.add(location)
+        old = self._segments[:-1]
+        before = sum(os.path.getsize(self._path(n)) for n in old)
+        target = _segment_name(_segment_number(self._segments[-1]) + 1)
+        new_active = _segment_name(_segment_number(target) + 1)
+        moved = {}
+        with open(self._path(target) + '.tmp', 'wb') as out:
+            for name in old:
+                mapped = self._map(name)
+                offset = 0
+                while mapped is not None and offset < len(mapped):
+                    end = mapped.find(b"\n", offset) + 1
+                    record = json.loads(mapped[offset:end])
+                    if (name, offset) in live:
+                        if record["p"] is not None:
+                            record["p"] = list(moved[tuple(record["p"])])
+                        moved[(name, offset)] = (target, out.tell())
+                        out.write((json.dumps(record, separators=(',', ':')) + "\n").encode())
+                    offset = end
+            out.flush()
+            os.fsync(out.fileno())
+
+        for tail in self.sessions.values():
+            tail["segment"], tail["offset"] = moved[(tail["segment"], tail["offset"])]
+        for name in old + [self._segments[-1]]:
+            mapped = self._maps.pop(name, None)
+            if mapped is not None:
+                mapped.close()
+        self._active.close()
+        # The index naming the new segment is the commit point (see _open).
+        self._segments = [target, new_active]
+        self._active = open(self._path(new_active), 'ab')
+        self._write_index({target: os.path.getsize(self._path(target) + '.tmp'), new_active: 0})
+        os.replace(self._path(target) + '.tmp', self._path(target))
+        for name in old:
+            os.remove(self._path(name))
+        empty_sealed = _segment_name(_segment_number(target) - 1)
+        if os.path.exists(self._path(empty_sealed)):
+            os.remove(self._path(empty_sealed))
+        return {"bytes_before": before, "bytes_after": os.path.getsize(self._path(target))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or compact a transcript store.")
+    parser.add_argument("command", choices=["sessions", "show", "compact"])
+    parser.add_argument("--dir", default=DEFAULT_DIRECTORY, help="Transcript directory")
+    parser.add_argument("--session", default="default", help="Session to show")
+    parser.add_argument("--last", type=int, default=None, help="Only show the newest N messages")
+    args = parser.parse_args(argv)
+
+    with TranscriptStore(args.dir) as store:
+        if args.command == "sessions":
+            for session in sorted(store.sessions):
+                print(f"{session}: {store.message_count(session)} messages")
+        elif args.command == "show":
+            for message in store.messages(args.session, last=args.last):
+                speaker = {"human": "You", "ai": "AI"}.get(message.type, message.type)
+                print(f"{speaker}: {message.content}")
+        else:
+            result = store.compact()
+            print(f"Compacted {result['bytes_before']} -> {result['bytes_after']} bytes")
+
+
+if __name__ == "__main__":
+    main()